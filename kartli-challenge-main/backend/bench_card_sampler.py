@@ -0,0 +1,43 @@
+"""Throughput of the in-memory card sampler: raw alias draws and full hands.
+
+Runs on the bundled SAMPLE_CARDS catalog, no database needed:
+    python bench_card_sampler.py [draws] [hands] [players]
+"""
+import sys
+import time
+
+import server
+
+
+def catalog() -> list:
+    cards = []
+    for deck_type, deck in server.SAMPLE_CARDS.items():
+        for i, card in enumerate(deck):
+            cards.append({"card_id": f"{deck_type}_{i}", "deck_type": deck_type, **card})
+    return cards
+
+
+def main():
+    draws = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    hands = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    players = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    sampler = server.CardSampler(catalog())
+    table = sampler.table(server.NORMAL_DECKS, 3)
+
+    started = time.perf_counter()
+    for _ in range(draws):
+        table.draw()
+    raw = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(hands):
+        sampler.draw_hand(f"user_{i % players}", 1 + i % 2, 2)
+    dealt = time.perf_counter() - started
+
+    print(f"{len(sampler.cards)} cards, {players} players")
+    print(f"alias draws  {draws / raw:>12,.0f} /s")
+    print(f"hands        {hands / dealt:>12,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Index size and read latency of game chat: one document per message vs buckets.
+
+Writes the same synthetic chat (mostly short system lines) both ways into a
+scratch database next to DB_NAME, then times the latest page and an ?after=
+poll on each layout. Needs MONGO_URL; the scratch database is dropped after:
+    python bench_chat_buckets.py [games] [messages_per_game] [reads]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import database
+import server
+from chat_buckets import CHAT_BUCKET_SIZE, CHAT_ORDER, chat_bucket_docs, load_chat, page_chat_rows
+
+SYSTEM_LINES = ["El {n} başladı", "pas geçti", "görevi tamamladı", "cezayı kabul etti", "oylama bitti"]
+ROW_ORDER_DESC = [("created_at", -1), ("message_id", -1)]
+
+
+def game_chat(game_id: str, count: int) -> list:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for i in range(count):
+        system = random.random() < 0.8
+        messages.append({
+            "message_id": f"msg_{uuid.uuid4().hex[:12]}",
+            "game_id": game_id,
+            "user_id": f"user_{i % 6}",
+            "content": random.choice(SYSTEM_LINES).format(n=1 + i // 40) if system else "hadi bakalım, sıra sende!",
+            "message_type": "system" if system else "text",
+            "submission_id": None,
+            "created_at": start + timedelta(seconds=i * 7),
+            "version": i + 1
+        })
+    return messages
+
+
+async def storage(collection) -> dict:
+    stats = await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(1)
+    storage_stats = stats[0]["storageStats"]
+    return {"docs": storage_stats["count"], "data": storage_stats["size"], "index": storage_stats["totalIndexSize"]}
+
+
+async def rows_latest(scratch, game_id: str, limit: int):
+    page = await scratch.chat_messages.find({"game_id": game_id}, {"_id": 0}).sort(ROW_ORDER_DESC).limit(limit).to_list(limit)
+    page.reverse()
+    return page
+
+
+async def rows_after(scratch, game_id: str, cursor_id: str, limit: int):
+    cursor = await scratch.chat_messages.find_one({"game_id": game_id, "message_id": cursor_id}, {"_id": 0, "created_at": 1, "message_id": 1})
+    query = {"game_id": game_id, "$or": [
+        {"created_at": {"$gt": cursor["created_at"]}},
+        {"created_at": cursor["created_at"], "message_id": {"$gt": cursor["message_id"]}}
+    ]}
+    return await scratch.chat_messages.find(query, {"_id": 0}).sort(CHAT_ORDER).limit(limit).to_list(limit)
+
+
+async def buckets_latest(scratch, game_id: str, limit: int):
+    return page_chat_rows(await load_chat(game_id, limit), None, None, limit)
+
+
+async def buckets_after(scratch, game_id: str, cursor_id: str, limit: int):
+    rows = await load_chat(game_id, limit, cursor_id, newer=True)
+    return page_chat_rows(rows, cursor_id, None, limit)
+
+
+async def timed(read, reads: int) -> str:
+    samples = []
+    for _ in range(reads):
+        started = time.perf_counter()
+        await read()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return f"p50 {statistics.median(samples):.2f} ms, p95 {samples[int(len(samples) * 0.95) - 1]:.2f} ms"
+
+
+async def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_game = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    reads = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    if database.db is None:
+        raise SystemExit("MONGO_URL and DB_NAME must be set")
+    scratch = database.client[f"{database.db.name}_bench_chat"]
+    await database.client.drop_database(scratch.name)
+    database.db = scratch
+    limit = server.CHAT_PAGE_SIZE
+
+    try:
+        await scratch.chat_messages.create_index([("game_id", 1), ("created_at", 1), ("message_id", 1)])
+        await scratch.chat_buckets.create_index([("game_id", 1), ("bucket", 1)], unique=True)
+        chats = {}
+        for g in range(games):
+            game_id = f"game_bench_{g}"
+            chats[game_id] = game_chat(game_id, per_game)
+            await scratch.chat_messages.insert_many([dict(m) for m in chats[game_id]])
+            await scratch.chat_buckets.insert_many(chat_bucket_docs(game_id, chats[game_id]))
+
+        print(f"{games} games x {per_game} messages, {CHAT_BUCKET_SIZE} per bucket, pages of {limit}")
+        for name in ("chat_messages", "chat_buckets"):
+            s = await storage(scratch[name])
+            print(f"{name:14} {s['docs']:>8} docs  data {s['data'] / 1e6:7.2f} MB  indexes {s['index'] / 1e6:7.2f} MB")
+
+        ids = list(chats)
+        # a poller a few messages behind the head of the newest bucket
+        cursor = {game_id: chats[game_id][-3]["message_id"] for game_id in ids}
+        assert [m["message_id"] for m in await buckets_latest(scratch, ids[0], limit)] == \
+            [m["message_id"] for m in await rows_latest(scratch, ids[0], limit)]
+        for label, rows_read, buckets_read in (
+            ("latest page", lambda g: rows_latest(scratch, g, limit), lambda g: buckets_latest(scratch, g, limit)),
+            ("?after= poll", lambda g: rows_after(scratch, g, cursor[g], limit), lambda g: buckets_after(scratch, g, cursor[g], limit)),
+        ):
+            print(f"{label:13} rows    {await timed(lambda: rows_read(random.choice(ids)), reads)}")
+            print(f"{label:13} buckets {await timed(lambda: buckets_read(random.choice(ids)), reads)}")
+    finally:
+        await database.client.drop_database(scratch.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
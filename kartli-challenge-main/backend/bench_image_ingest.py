@@ -0,0 +1,54 @@
+"""Throughput of the image ingest stage (decode, EXIF, resize, WebP), per core.
+
+Transcodes synthetic 12 MP phone-camera JPEGs into the proof views, first in
+this process and then on a process pool with one worker per core:
+    python bench_image_ingest.py [images] [workers]
+"""
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+import imaging
+import server
+
+
+def phone_jpeg(width=4032, height=3024) -> bytes:
+    # noise keeps the JPEG about as large and slow to decode as a real photo
+    bands = [Image.effect_noise((width // 16, height // 16), 40 + 20 * i).resize((width, height)) for i in range(3)]
+    image = Image.merge("RGB", bands)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # portrait shot, stored rotated
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=90, exif=exif.tobytes())
+    return out.getvalue()
+
+
+def main():
+    images = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    data = phone_jpeg()
+    sizes = {name: server.IMAGE_SIZES[name] for name in server.IMAGE_VARIANTS["proof"]}
+    out_bytes = sum(len(v["data"]) for v in imaging.transcode_image(data, sizes).values())
+    print(f"input {len(data) / 1e6:.1f} MB JPEG -> {out_bytes / 1e3:.0f} KB of WebP views {sorted(sizes)}")
+
+    started = time.perf_counter()
+    for _ in range(images):
+        imaging.transcode_image(data, sizes)
+    serial = images / (time.perf_counter() - started)
+    print(f"1 core: {serial:.1f} images/s ({1000 / serial:.0f} ms/image)")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        list(pool.map(imaging.transcode_image, [data] * workers, [sizes] * workers))  # warm up
+        started = time.perf_counter()
+        list(pool.map(imaging.transcode_image, [data] * images, [sizes] * images))
+        pooled = images / (time.perf_counter() - started)
+    print(f"{workers} workers: {pooled:.1f} images/s ({pooled / workers:.1f} per core)")
+
+
+if __name__ == "__main__":
+    main()
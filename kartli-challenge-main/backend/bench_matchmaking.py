@@ -0,0 +1,33 @@
+"""Match formation speed of the in-memory quick play queue.
+
+Queues players spread over the three difficulty levels and forms every match
+in one pass, no database needed:
+    python bench_matchmaking.py [players] [game_size]
+"""
+import sys
+import time
+
+from matchmaking import MatchmakingQueue
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    game_size = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    queue = MatchmakingQueue(game_size=game_size, min_players=2, max_wait_seconds=30)
+
+    started = time.perf_counter()
+    for i in range(players):
+        queue.enqueue(f"user_{i}", 1 + i % 3, now=i / 1000)
+    queued = time.perf_counter() - started
+    batches = queue.form_matches(now=players / 1000)
+    elapsed = time.perf_counter() - started
+
+    matched = sum(len(b) for b in batches)
+    assert all(len({t.difficulty_level for t in b}) == 1 for b in batches)
+    print(f"{players} players -> {len(batches)} games, {players - matched} left queued")
+    print(f"enqueue  {queued * 1000:8.1f} ms")
+    print(f"total    {elapsed * 1000:8.1f} ms  ({players / elapsed:,.0f} players/s)")
+
+
+if __name__ == "__main__":
+    main()
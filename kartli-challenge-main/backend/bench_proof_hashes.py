@@ -0,0 +1,98 @@
+"""Near-duplicate proof lookup: the in-memory scan and the path a play takes.
+
+First times PerceptualHashIndex.query over [hashes] random dHashes (no
+database). With MONGO_URL set it then writes [rows] proof_hashes for one
+group into a scratch database next to DB_NAME and times
+find_near_duplicate_proofs cold (whole history read) and warm (cached scope,
+only new rows read); the scratch database is dropped after:
+    python bench_proof_hashes.py [hashes] [rows] [plays]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import server
+
+
+def bench_scan(count: int, runs: int = 10):
+    rng = np.random.default_rng(9)
+    hashes = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, count, dtype=np.int64)
+    index = server.PerceptualHashIndex(hashes, range(len(hashes)))
+    target = count // 2
+    query = int(hashes[target].view(np.uint64))
+
+    index.query(query)
+    started = time.perf_counter()
+    for _ in range(runs):
+        hits = index.query(query)
+    elapsed = (time.perf_counter() - started) / runs
+    assert hits[0] == (target, 0)
+    print(f"scan      {count:>9,} hashes  {elapsed * 1000:8.2f} ms per query")
+
+
+def proof_rows(group_id: str, count: int, start: datetime) -> list:
+    rng = np.random.default_rng(5)
+    values = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, count, dtype=np.int64)
+    return [{
+        "submission_id": f"sub_{uuid.uuid4().hex[:12]}",
+        "game_id": f"game_bench_{i // 50}",
+        "group_id": group_id,
+        "user_id": f"user_{i % 8}",
+        "dhash": int(value),
+        "created_at": start + timedelta(milliseconds=i)
+    } for i, value in enumerate(values)]
+
+
+async def timed_play(group_id: str) -> float:
+    started = time.perf_counter()
+    await server.find_near_duplicate_proofs(123456789, group_id, "user_bench")
+    return (time.perf_counter() - started) * 1000
+
+
+async def bench_lookup(count: int, plays: int):
+    database = server.client[f"{server.db.name}_bench_proof_hashes"]
+    await server.client.drop_database(database.name)
+    server.db = database
+    group_id = "grp_bench"
+    try:
+        await database.proof_hashes.create_index([("group_id", 1), ("created_at", -1)])
+        await database.proof_hashes.create_index([("user_id", 1), ("created_at", -1)])
+        start = datetime.now(timezone.utc) - timedelta(days=1)
+        rows = proof_rows(group_id, count, start)
+        for i in range(0, len(rows), 10_000):
+            await database.proof_hashes.insert_many(rows[i:i + 10_000])
+
+        cold = []
+        for _ in range(min(plays, 20)):
+            server._proof_hash_scopes.clear()
+            cold.append(await timed_play(group_id))
+        warm = []
+        for i in range(plays):
+            # one new proof in the group between plays, as in a running game
+            row = {k: v for k, v in rows[i].items() if k != "_id"}
+            await database.proof_hashes.insert_one({**row, "submission_id": f"sub_new_{i}", "created_at": datetime.now(timezone.utc)})
+            warm.append(await timed_play(group_id))
+        print(f"lookup    {count:>9,} rows    cold p50 {statistics.median(cold):8.2f} ms")
+        print(f"lookup    {count:>9,} rows    warm p50 {statistics.median(warm):8.2f} ms")
+    finally:
+        await server.client.drop_database(database.name)
+
+
+def main():
+    hashes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else server.PROOF_HASH_HISTORY_LIMIT
+    plays = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    bench_scan(hashes)
+    if server.db is None:
+        print("lookup    skipped (MONGO_URL and DB_NAME not set)")
+        return
+    asyncio.run(bench_lookup(rows, plays))
+
+
+if __name__ == "__main__":
+    main()
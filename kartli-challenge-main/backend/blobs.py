@@ -0,0 +1,271 @@
+"""Content-addressed image storage.
+
+Images live outside the documents, addressed by the SHA-256 of their bytes:
+submissions keep proof_sha, users keep picture = /api/blobs/<sha>. Proof
+blobs are marked private and never served by hash. Metadata (content type,
+size) is in the blobs collection; the bytes are in GridFS or, with
+BLOB_BACKEND=local, in files under BLOB_DIR.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+import database
+
+BLOB_BACKEND = os.environ.get("BLOB_BACKEND", "gridfs")
+BLOB_DIR = os.environ.get("BLOB_DIR", str(Path(__file__).parent / "blobs"))
+BLOB_URL_PREFIX = "/api/blobs/"
+BLOB_CHUNK_SIZE = 256 * 1024
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# The only types images are stored and served as; a client-declared
+# text/html or image/svg+xml would otherwise run script from our origin
+IMAGE_MEDIA_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/avif"}
+
+
+def decode_data_uri(data: str):
+    """("image/jpeg", bytes) from a data: URI or bare base64 string"""
+    media_type = "image/jpeg"
+    if data.startswith("data:"):
+        header, _, data = data.partition(",")
+        media_type = header[5:].split(";")[0].strip().lower() or media_type
+    return media_type, base64.b64decode(data, validate=True)
+
+
+def served_media_type(media_type: Optional[str]) -> str:
+    """Stored or legacy media types outside the whitelist go out as plain bytes"""
+    return media_type if media_type in IMAGE_MEDIA_TYPES else "application/octet-stream"
+
+
+class LocalBlobStore:
+    """Blobs as files under root/ab/cd/<sha>, written via a temp file and rename"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha[2:4] / sha
+
+    def _write(self, sha: str, data: bytes):
+        path = self.path(sha)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{sha}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    async def put(self, sha: str, data: bytes):
+        await asyncio.to_thread(self._write, sha, data)
+
+    async def get(self, sha: str) -> Optional[bytes]:
+        path = self.path(sha)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def exists(self, sha: str) -> bool:
+        return await asyncio.to_thread(self.path(sha).exists)
+
+    async def delete(self, sha: str):
+        await asyncio.to_thread(self.path(sha).unlink, True)
+
+    async def stream(self, sha: str, start: int, end: int):
+        """Chunks of bytes start..end (inclusive), or None if the blob is missing"""
+        try:
+            f = await asyncio.to_thread(open, self.path(sha), "rb")
+        except FileNotFoundError:
+            return None
+
+        async def chunks():
+            try:
+                await asyncio.to_thread(f.seek, start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await asyncio.to_thread(f.read, min(BLOB_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            finally:
+                f.close()
+        return chunks()
+
+
+class GridFSBlobStore:
+    """Blobs in a GridFS bucket; the file _id is the hash, so a blob is stored once"""
+
+    def __init__(self, database, bucket_name: str = "blob_data"):
+        self.files = database[f"{bucket_name}.files"]
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name)
+
+    async def put(self, sha: str, data: bytes):
+        if await self.exists(sha):
+            return
+        try:
+            await self.bucket.upload_from_stream_with_id(sha, sha, data)
+        except DuplicateKeyError:
+            pass  # stored concurrently by another request
+
+    async def get(self, sha: str) -> Optional[bytes]:
+        try:
+            stream = await self.bucket.open_download_stream(sha)
+        except NoFile:
+            return None
+        return await stream.read()
+
+    async def exists(self, sha: str) -> bool:
+        return await self.files.find_one({"_id": sha}, {"_id": 1}) is not None
+
+    async def delete(self, sha: str):
+        try:
+            await self.bucket.delete(sha)
+        except NoFile:
+            pass
+
+    async def stream(self, sha: str, start: int, end: int):
+        """Chunks of bytes start..end (inclusive), or None if the blob is missing"""
+        try:
+            grid_out = await self.bucket.open_download_stream(sha)
+        except NoFile:
+            return None
+
+        async def chunks():
+            grid_out.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await grid_out.read(min(BLOB_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        return chunks()
+
+blob_store = None
+
+
+def get_blob_store():
+    """The configured blob backend (created on first use)"""
+    global blob_store
+    if blob_store is None:
+        blob_store = LocalBlobStore(BLOB_DIR) if BLOB_BACKEND == "local" else GridFSBlobStore(database.db)
+    return blob_store
+
+
+def blob_url(sha: str) -> str:
+    return f"{BLOB_URL_PREFIX}{sha}"
+
+
+def blob_sha_from_url(url: Optional[str]) -> Optional[str]:
+    if url and url.startswith(BLOB_URL_PREFIX):
+        return url[len(BLOB_URL_PREFIX):]
+    return None
+
+
+async def store_blob(data: bytes, content_type: str, **meta) -> str:
+    """Store bytes once under their SHA-256; returns the hash"""
+    if content_type not in IMAGE_MEDIA_TYPES:
+        raise ValueError(f"Not an image type: {content_type}")
+    sha = hashlib.sha256(data).hexdigest()
+    await get_blob_store().put(sha, data)
+    await database.db.blobs.update_one(
+        {"sha256": sha},
+        {"$setOnInsert": {
+            "sha256": sha,
+            "content_type": content_type,
+            "size": len(data),
+            "backend": BLOB_BACKEND,
+            "created_at": datetime.now(timezone.utc),
+            **meta
+        }},
+        upsert=True
+    )
+    return sha
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """(start, end) of a single `bytes=` range, None to send the whole blob.
+
+    Raises ValueError when the range lies outside the blob (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None  # multipart ranges are answered with the full body
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+async def blob_response(request: Request, sha: str, headers: Dict[str, str], private: bool = True) -> Response:
+    """The blob's bytes with Range support; local files go out as a FileResponse.
+
+    private=False (the public /blobs route) refuses blobs stored as private.
+    """
+    meta = await database.db.blobs.find_one({"sha256": sha}, {"_id": 0, "content_type": 1, "size": 1, "private": 1})
+    if not meta or (meta.get("private") and not private):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    media_type = served_media_type(meta.get("content_type"))
+    size = meta["size"]
+    headers = {**headers, "Accept-Ranges": "bytes", "X-Content-Type-Options": "nosniff"}
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == headers.get("ETag"):
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    store = get_blob_store()
+    if byte_range is None:
+        if isinstance(store, LocalBlobStore):
+            # Served straight from disk (zero-copy where the server supports pathsend)
+            try:
+                stat_result = await asyncio.to_thread(os.stat, store.path(sha))
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="Blob not found")
+            return FileResponse(store.path(sha), media_type=media_type, headers=headers, stat_result=stat_result)
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    chunks = await store.stream(sha, start, end)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
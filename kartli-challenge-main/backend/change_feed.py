@@ -0,0 +1,239 @@
+"""Cross-process change feed.
+
+The event broker (realtime.py) and the caches in server.py only see this
+process's writes. With several workers or instances, each process follows a
+MongoDB change stream over the shared collections, republishes other
+processes' writes on its own broker and drops the cache entries they
+invalidate. The resume token is checkpointed in change_feed_state under the
+consumer's name, so a restarted consumer with the same name picks up where it
+stopped. Give each process a stable CHANGE_FEED_CONSUMER; when it is unset,
+each process leases the first free "<hostname>-<n>" slot instead (renewed at
+every checkpoint, released on shutdown), so a restarted worker takes a slot
+and its checkpoint back rather than starting under a new name. Change streams
+need a replica set; on a standalone mongod the feed falls back to polling.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+import database
+
+CHANGE_FEED_MODE = os.environ.get("CHANGE_FEED", "auto")  # auto | stream | poll | off
+CHANGE_FEED_CONSUMER = os.environ.get("CHANGE_FEED_CONSUMER")  # unset = lease a per-host slot
+CHANGE_FEED_SLOTS = int(os.environ.get("CHANGE_FEED_SLOTS", "64"))
+CHANGE_FEED_LEASE_SECONDS = float(os.environ.get("CHANGE_FEED_LEASE_SECONDS", "30"))
+CHANGE_FEED_POLL_SECONDS = float(os.environ.get("CHANGE_FEED_POLL_SECONDS", "2"))
+CHANGE_FEED_CHECKPOINT_SECONDS = float(os.environ.get("CHANGE_FEED_CHECKPOINT_SECONDS", "5"))
+CHANGE_FEED_COLLECTIONS = ("games", "submissions", "chat_buckets", "notifications", "users")
+# Large or private fields never needed to republish a change
+CHANGE_FEED_UNSET = [
+    "fullDocument.photo_base64", "fullDocument.hand_counters", "fullDocument.ready_players",
+    "fullDocument.email", "fullDocument.password_hash"
+]
+CHANGE_FEED_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": list(CHANGE_FEED_COLLECTIONS)},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+    }},
+    {"$unset": CHANGE_FEED_UNSET},
+    # A chat $push carries its message in updatedFields; the looked-up bucket
+    # (up to CHAT_BUCKET_SIZE messages) would only inflate every event
+    {"$set": {"fullDocument.messages": {"$cond": [
+        {"$and": [{"$eq": ["$ns.coll", "chat_buckets"]}, {"$eq": ["$operationType", "update"]}]},
+        "$$REMOVE",
+        "$fullDocument.messages"
+    ]}}}
+]
+# Resume token no longer usable (history lost / invalid token)
+CHANGE_STREAM_RESTART = {260, 280, 286}
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """Follows other processes' writes, from a change stream or by polling.
+
+    Subclasses say what a change means for this process: apply, poll_once
+    and invalidate_all.
+    """
+
+    def __init__(self, consumer: Optional[str] = CHANGE_FEED_CONSUMER):
+        self.consumer = consumer
+        self.holder = f"{socket.gethostname()}-{os.getpid()}"
+        self.leased = False
+        self.mode = "off"
+        self.token = None
+        self.checkpointed_token = None
+        self.events = 0
+        self.published = 0
+        self.skipped_local = 0
+        self.checkpoints = 0
+        self.errors = 0
+
+    # --- applying a change (shared by both modes) ---
+
+    async def apply(self, collection: str, operation: str, doc: Optional[dict], updated: Optional[dict] = None):
+        """Republish one changed document (both modes feed this)"""
+        raise NotImplementedError
+
+    # --- change stream ---
+
+    async def load_token(self):
+        state = await database.db.change_feed_state.find_one({"_id": self.consumer})
+        self.token = self.checkpointed_token = state.get("resume_token") if state else None
+
+    async def claim_slot(self):
+        """Lease the first "<hostname>-<n>" consumer name no live process holds"""
+        host = socket.gethostname()
+        for slot in range(CHANGE_FEED_SLOTS):
+            now = datetime.now(timezone.utc)
+            try:
+                # Matches a free or expired slot (or our own); a held one makes
+                # the upsert collide on _id
+                await database.db.change_feed_state.update_one(
+                    {"_id": f"{host}-{slot}", "$or": [{"holder": self.holder}, {"lease_until": {"$not": {"$gt": now}}}]},
+                    {"$set": {"holder": self.holder, "lease_until": now + timedelta(seconds=CHANGE_FEED_LEASE_SECONDS)}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                continue
+            self.consumer, self.leased = f"{host}-{slot}", True
+            return
+        raise RuntimeError(f"All {CHANGE_FEED_SLOTS} change feed slots on {host} are leased")
+
+    async def release(self):
+        """Give the slot back at shutdown, so the next process can take it at once"""
+        if self.leased:
+            await database.db.change_feed_state.update_one(
+                {"_id": self.consumer, "holder": self.holder},
+                {"$set": {"lease_until": datetime.now(timezone.utc)}}
+            )
+            self.leased = False
+
+    async def checkpoint(self):
+        now = datetime.now(timezone.utc)
+        fields = {}
+        if self.token is not None and self.token != self.checkpointed_token:
+            fields.update({"resume_token": self.token, "updated_at": now})
+        if self.leased:
+            fields["lease_until"] = now + timedelta(seconds=CHANGE_FEED_LEASE_SECONDS)
+        if not fields:
+            return
+        query = {"_id": self.consumer}
+        if self.leased:
+            query["holder"] = self.holder
+        result = await database.db.change_feed_state.update_one(query, {"$set": fields}, upsert=not self.leased)
+        if self.leased and not result.matched_count:
+            # The lease ran out and another process took the slot; move to a free one
+            logger.warning("Change feed slot %s was taken over; leasing another", self.consumer)
+            await self.claim_slot()
+            self.checkpointed_token = None
+            return await self.checkpoint()
+        if "resume_token" in fields:
+            self.checkpointed_token = self.token
+            self.checkpoints += 1
+
+    async def stream(self):
+        """Follow the change stream until it fails; raises on errors"""
+        loop = asyncio.get_running_loop()
+        last_checkpoint = loop.time()
+        async with database.db.watch(CHANGE_FEED_PIPELINE, full_document="updateLookup", resume_after=self.token, max_await_time_ms=1000) as changes:
+            self.mode = "stream"
+            while changes.alive:
+                change = await changes.try_next()
+                if change is not None:
+                    try:
+                        await self.apply(
+                            change["ns"]["coll"],
+                            change["operationType"],
+                            change.get("fullDocument"),
+                            (change.get("updateDescription") or {}).get("updatedFields")
+                        )
+                    except Exception:
+                        self.errors += 1
+                        logger.exception("Applying change on %s failed", change["ns"]["coll"])
+                # Advances on idle batches too, so a quiet consumer still checkpoints
+                self.token = changes.resume_token
+                if loop.time() - last_checkpoint >= CHANGE_FEED_CHECKPOINT_SECONDS:
+                    await self.checkpoint()
+                    last_checkpoint = loop.time()
+
+    # --- polling fallback ---
+
+    async def poll(self):
+        """Version and timestamp polling for deployments without change streams"""
+        self.mode = "poll"
+        versions: Dict[str, tuple] = {}
+        since = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(CHANGE_FEED_POLL_SECONDS)
+            until = datetime.now(timezone.utc)
+            try:
+                await self.poll_once(versions, since, until)
+                since = until
+            except Exception:
+                self.errors += 1
+                logger.exception("Change feed poll failed")
+
+    async def poll_once(self, versions: Dict[str, tuple], since: datetime, until: datetime):
+        """Republish what changed in (since, until]; `versions` is kept across polls"""
+        raise NotImplementedError
+
+    async def run(self):
+        if CHANGE_FEED_MODE == "off":
+            return
+        if CHANGE_FEED_MODE != "poll":
+            if self.consumer is None:
+                await self.claim_slot()
+            await self.load_token()
+            while True:
+                try:
+                    await self.stream()
+                except OperationFailure as e:
+                    if e.code in CHANGE_STREAM_RESTART:
+                        # Token too old or invalid: start from now; anything cached may be stale
+                        logger.warning("Change stream cannot resume (%s); restarting from now", e.code)
+                        self.token = None
+                        self.invalidate_all()
+                    elif self.mode != "stream" and CHANGE_FEED_MODE == "auto":
+                        logger.warning("Change streams unavailable (%s); polling every %ss", e, CHANGE_FEED_POLL_SECONDS)
+                        break
+                    else:
+                        logger.exception("Change stream failed")
+                    self.errors += 1
+                except Exception as e:
+                    if self.mode != "stream" and CHANGE_FEED_MODE == "auto":
+                        # Never got a stream open (e.g. a test double without change streams)
+                        logger.warning("Change streams unavailable (%r); polling every %ss", e, CHANGE_FEED_POLL_SECONDS)
+                        break
+                    logger.exception("Change stream interrupted; resuming")
+                    self.errors += 1
+                finally:
+                    try:
+                        await self.checkpoint()
+                    except PyMongoError:
+                        pass
+                await asyncio.sleep(1)
+            # Polling keeps no resume token
+            await self.release()
+        await self.poll()
+
+    def invalidate_all(self):
+        """Drop everything cached from changes: some may have been missed"""
+
+    def stats(self) -> dict:
+        return {
+            "consumer": self.consumer,
+            "leased": self.leased,
+            "mode": self.mode,
+            "events": self.events,
+            "published": self.published,
+            "skipped_local": self.skipped_local,
+            "checkpoints": self.checkpoints,
+            "errors": self.errors
+        }
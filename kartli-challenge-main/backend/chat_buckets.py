@@ -0,0 +1,172 @@
+"""Game chat stored with the bucket pattern.
+
+Up to CHAT_BUCKET_SIZE messages share one (game_id, bucket) document and
+are appended with $push. A game's chat costs one index entry per bucket
+instead of one per message (most of them short system lines), and the latest
+page comes from the newest bucket(s) in one read.
+"""
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+import database
+
+# Total order for pages: created_at can tie, message_id breaks the tie
+CHAT_ORDER = [("created_at", 1), ("message_id", 1)]
+
+CHAT_BUCKET_SIZE = int(os.environ.get("CHAT_BUCKET_SIZE", "100"))
+CHAT_BUCKET_HEADS_SIZE = 4096
+
+# newest bucket number per game, so appends skip the lookup; oldest first
+chat_bucket_heads: "OrderedDict[str, int]" = OrderedDict()
+
+
+def chat_key(message: dict) -> tuple:
+    return message["created_at"], message["message_id"]
+
+
+def chat_bucket_messages(bucket: dict) -> List[dict]:
+    """A bucket's messages with game_id put back (it is stored once per bucket)"""
+    return [{**m, "game_id": bucket["game_id"]} for m in bucket.get("messages", [])]
+
+
+def chat_bucket_docs(game_id: str, messages: List[dict], first_bucket: int = 0) -> List[dict]:
+    """Chronological messages packed CHAT_BUCKET_SIZE to a bucket document"""
+    docs = []
+    for start in range(0, len(messages), CHAT_BUCKET_SIZE):
+        chunk = [{k: v for k, v in m.items() if k not in ("_id", "game_id")} for m in messages[start:start + CHAT_BUCKET_SIZE]]
+        docs.append({
+            "game_id": game_id,
+            "bucket": first_bucket + start // CHAT_BUCKET_SIZE,
+            "count": len(chunk),
+            "version": max(int(m.get("version", 0) or 0) for m in chunk),
+            "messages": chunk
+        })
+    return docs
+
+
+async def append_chat_message(message: dict) -> int:
+    """$push a message onto its game's newest bucket, opening the next one when full; returns the bucket"""
+    game_id = message["game_id"]
+    head = chat_bucket_heads.get(game_id)
+    if head is None:
+        newest = await database.db.chat_buckets.find_one({"game_id": game_id}, {"_id": 0, "bucket": 1}, sort=[("bucket", -1)])
+        # Migrated history is numbered below 0 and never appended to
+        head = max(newest["bucket"], 0) if newest else 0
+    stored = {k: v for k, v in message.items() if k != "game_id"}
+    while True:
+        try:
+            await database.db.chat_buckets.update_one(
+                {"game_id": game_id, "bucket": head, "count": {"$lt": CHAT_BUCKET_SIZE}},
+                {"$push": {"messages": stored}, "$inc": {"count": 1}, "$max": {"version": message["version"]}},
+                upsert=True
+            )
+            break
+        except DuplicateKeyError:
+            # The bucket is full (or another process filled it): the upsert hit
+            # the unique (game_id, bucket) index, so move on to the next one
+            head += 1
+    chat_bucket_heads[game_id] = head
+    chat_bucket_heads.move_to_end(game_id)
+    if len(chat_bucket_heads) > CHAT_BUCKET_HEADS_SIZE:
+        chat_bucket_heads.popitem(last=False)
+    return head
+
+
+async def load_chat(
+    game_id: str,
+    limit: Optional[int] = None,
+    cursor_id: Optional[str] = None,
+    newer: bool = False,
+    since: int = 0,
+    until: Optional[int] = None
+) -> Optional[List[dict]]:
+    """Messages covering a chat page, unordered; None if `cursor_id` is not in the game.
+
+    Walks the game's buckets newest first and stops as soon as the page is
+    covered: `limit` messages before the cursor (or the newest ones), or
+    everything after it with `newer`. With `since` / `until`, only messages
+    stamped in that range of game versions.
+    """
+    query = {"game_id": game_id}
+    if since:
+        query["version"] = {"$gt": since}
+    buckets = database.db.chat_buckets.find(query, {"_id": 0, "game_id": 1, "messages": 1}).sort("bucket", -1)
+    if limit:
+        buckets = buckets.batch_size(limit // CHAT_BUCKET_SIZE + 2)
+
+    rows, found, older = [], cursor_id is None, 0
+    async for bucket in buckets:
+        messages = chat_bucket_messages(bucket)
+        if since or until is not None:
+            messages = [
+                m for m in messages
+                if since < int(m.get("version", 0) or 0) and (until is None or int(m.get("version", 0) or 0) <= until)
+            ]
+        rows.extend(messages)
+        if not found:
+            index = next((i for i, m in enumerate(messages) if m["message_id"] == cursor_id), None)
+            if index is None:
+                continue
+            found = True
+            if newer:
+                break
+            older = index
+        else:
+            older += len(messages)
+        if limit and older >= limit:
+            break
+    return rows if found else None
+
+
+def appended_chat_messages(operation: str, bucket: dict, updated: dict) -> List[dict]:
+    """Messages a bucket change added: all of a new bucket, the pushed slots of an update"""
+    if operation == "insert":
+        return chat_bucket_messages(bucket)
+    if operation != "update":
+        return []
+    if "messages" in updated:
+        # The server may report the whole array; only the last slot was pushed
+        pushed = updated["messages"][-1:]
+    else:
+        slots = [(int(k.split(".")[1]), v) for k, v in updated.items() if k.startswith("messages.") and k.count(".") == 1]
+        pushed = [message for _, message in sorted(slots, key=lambda slot: slot[0])]
+    return [{**m, "game_id": bucket["game_id"]} for m in pushed]
+
+
+async def migrate_chat_buckets() -> dict:
+    """Fold one-document-per-message chat_messages rows into buckets (safe to re-run).
+
+    A game's old messages become buckets numbered below 0, so they sort before
+    anything appended since the deploy. Buckets are written newest first and
+    the rows deleted after the oldest one, so an interrupted run either
+    rebuilds the same buckets or only has the delete left.
+    """
+    moved = {"games": 0, "messages": 0, "buckets": 0}
+    for game_id in await database.db.chat_messages.distinct("game_id"):
+        messages = await database.db.chat_messages.find({"game_id": game_id}, {"_id": 0}).sort(CHAT_ORDER).to_list(None)
+        if not messages:
+            continue
+        buckets = []
+        if not await database.db.chat_buckets.find_one({"game_id": game_id, "messages.message_id": messages[0]["message_id"]}, {"_id": 1}):
+            buckets = chat_bucket_docs(game_id, messages, first_bucket=(-len(messages)) // CHAT_BUCKET_SIZE)
+        for bucket in reversed(buckets):
+            await database.db.chat_buckets.replace_one({"game_id": game_id, "bucket": bucket["bucket"]}, bucket, upsert=True)
+        await database.db.chat_messages.delete_many({"game_id": game_id, "message_id": {"$in": [m["message_id"] for m in messages]}})
+        moved["games"] += 1
+        moved["messages"] += len(messages)
+        moved["buckets"] += len(buckets)
+    return moved
+
+
+def page_chat_rows(rows: List[dict], after: Optional[str], before: Optional[str], limit: int) -> Optional[List[dict]]:
+    """A chronological page out of unordered rows; None if the cursor is unknown"""
+    rows = sorted(rows, key=chat_key)
+    if not (after or before):
+        return rows[-limit:]
+    index = next((i for i, m in enumerate(rows) if m["message_id"] == (after or before)), None)
+    if index is None:
+        return None
+    return rows[index + 1:index + 1 + limit] if after else rows[max(index - limit, 0):index]
@@ -0,0 +1,19 @@
+"""The Mongo client and database, shared by server.py and the subsystem modules.
+
+Both are None when MONGO_URL or DB_NAME is unset. Modules other than
+server.py read `database.db` at call time rather than importing the name, so
+a script or test that swaps the database has to set it here as well as on
+server.
+"""
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+mongo_url = os.getenv("MONGO_URL")
+db_name = os.getenv("DB_NAME")
+
+client = None
+db = None
+if mongo_url and db_name:
+    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+    db = client[db_name]
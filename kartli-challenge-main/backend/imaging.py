@@ -0,0 +1,66 @@
+"""Image transcoding for the ingest pool.
+
+Runs in spawned worker processes, so it imports nothing from server.py (no
+Mongo client, no app): only Pillow and numpy.
+"""
+import io
+import os
+from typing import Dict
+
+import numpy as np
+from PIL import Image, ImageOps, features
+
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", "80"))
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", "50000000"))
+
+# format -> (Pillow encoder, media type, encoder options)
+IMAGE_ENCODERS = {
+    "webp": ("WEBP", "image/webp", {"method": 4}),
+    "avif": ("AVIF", "image/avif", {"speed": 6}),
+}
+# AVIF is smaller at the same quality but needs a Pillow built with libavif;
+# without it (or for an unknown name) variants stay WebP
+IMAGE_FORMAT = os.environ.get("IMAGE_FORMAT", "webp").lower()
+if IMAGE_FORMAT not in IMAGE_ENCODERS or not features.check(IMAGE_FORMAT):
+    IMAGE_FORMAT = "webp"
+
+
+def image_dhash(image) -> int:
+    """64-bit dHash: is each pixel of a 9x8 grayscale thumbnail brighter than its left neighbour"""
+    small = np.asarray(image.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def transcode_image(data, sizes: Dict[str, int], quality: int = IMAGE_QUALITY, image_format: str = IMAGE_FORMAT) -> Dict[str, dict]:
+    """decode -> EXIF orientation -> resize -> encode for each size, plus the dHash; runs in a worker process.
+
+    `data` is the encoded image, or the path of a file holding it.
+    """
+    encoder, content_type, options = IMAGE_ENCODERS[image_format]
+    with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data) as source:
+        if source.width * source.height > IMAGE_MAX_PIXELS:
+            raise ValueError("Image is too large")
+        largest = max(sizes.values())
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale when that still covers the largest view
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+    # Largest first so each smaller view is resized from the previous one
+    for name, side in sorted(sizes.items(), key=lambda item: -item[1]):
+        image.thumbnail((side, side), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, encoder, quality=quality, **options)
+        variants[name] = {
+            "data": out.getvalue(),
+            "content_type": content_type,
+            "width": image.width,
+            "height": image.height
+        }
+    # Hash the smallest view: same picture, far fewer pixels to reduce to 9x8
+    dhash = image_dhash(image)
+    for variant in variants.values():
+        variant["dhash"] = dhash
+    return variants
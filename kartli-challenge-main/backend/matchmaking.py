@@ -0,0 +1,163 @@
+"""In-memory quick play matchmaking across groups.
+
+Players queue per difficulty level, oldest first; form_matches takes full
+games of `game_size` out of the queues, or a shorter one once its oldest
+player has waited `max_wait_seconds`. Creating the games is up to the caller,
+which resolves each ticket with the result or requeues its batch.
+"""
+import asyncio
+import heapq
+import os
+import uuid
+from typing import Dict, List, Optional
+
+QUICKPLAY_GAME_SIZE = int(os.environ.get("QUICKPLAY_GAME_SIZE", "4"))
+QUICKPLAY_MIN_PLAYERS = int(os.environ.get("QUICKPLAY_MIN_PLAYERS", "2"))
+QUICKPLAY_MAX_WAIT_SECONDS = float(os.environ.get("QUICKPLAY_MAX_WAIT_SECONDS", "30"))
+QUICKPLAY_RESULT_TTL_SECONDS = 300
+
+
+class QuickPlayTicket:
+    __slots__ = ("ticket_id", "user_id", "difficulty_level", "enqueued_at", "cancelled", "matching", "result", "resolved_at", "done")
+
+    def __init__(self, user_id: str, difficulty_level: int, enqueued_at: float):
+        self.ticket_id = f"qp_{uuid.uuid4().hex[:12]}"
+        self.user_id = user_id
+        self.difficulty_level = difficulty_level
+        self.enqueued_at = enqueued_at
+        self.cancelled = False
+        self.matching = False     # taken out by form_matches, game not created yet
+        self.result: Optional[dict] = None
+        self.resolved_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def view(self, now: float) -> dict:
+        if self.result is not None:
+            return {"ticket_id": self.ticket_id, "status": "matched", **self.result}
+        return {
+            "ticket_id": self.ticket_id,
+            "status": "cancelled" if self.cancelled else "queued",
+            "difficulty_level": self.difficulty_level,
+            "waited_seconds": round(now - self.enqueued_at, 1)
+        }
+
+
+class MatchmakingQueue:
+    """Per-difficulty min-heaps of tickets ordered by enqueue time (cancelled ones are skipped lazily)"""
+
+    def __init__(self, game_size: int, min_players: int, max_wait_seconds: float):
+        self.game_size = game_size
+        # a short game needs someone in it: 0 would match an empty queue
+        self.min_players = max(1, min(min_players, game_size))
+        self.max_wait_seconds = max_wait_seconds
+        self.heaps: Dict[int, list] = {}
+        self.live: Dict[int, int] = {}
+        self.by_user: Dict[str, QuickPlayTicket] = {}
+        self.by_id: Dict[str, QuickPlayTicket] = {}
+        self.matched_total = 0
+        self.games_formed = 0
+        self._order = 0
+
+    def enqueue(self, user_id: str, difficulty_level: int, now: float) -> QuickPlayTicket:
+        """Queue a player; a player already waiting (or being matched) keeps their ticket"""
+        ticket = self.by_user.get(user_id)
+        if ticket and not ticket.cancelled:
+            return ticket
+        ticket = QuickPlayTicket(user_id, difficulty_level, now)
+        self._order += 1
+        heapq.heappush(self.heaps.setdefault(difficulty_level, []), (now, self._order, ticket))
+        self.live[difficulty_level] = self.live.get(difficulty_level, 0) + 1
+        self.by_user[user_id] = ticket
+        self.by_id[ticket.ticket_id] = ticket
+        return ticket
+
+    def cancel(self, user_id: str) -> Optional[QuickPlayTicket]:
+        """Cancel the player's ticket; one whose game is being created is not requeued if that fails"""
+        ticket = self.by_user.pop(user_id, None)
+        if ticket is None or ticket.result is not None:
+            return None
+        ticket.cancelled = True
+        if not ticket.matching:
+            self.live[ticket.difficulty_level] -= 1
+        ticket.done.set()
+        return ticket
+
+    def _pop(self, heap: list) -> QuickPlayTicket:
+        while True:
+            _, _, ticket = heapq.heappop(heap)
+            if not ticket.cancelled:
+                return ticket
+
+    def _oldest(self, heap: list) -> Optional[QuickPlayTicket]:
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def form_matches(self, now: float) -> List[List[QuickPlayTicket]]:
+        """Take every full game out of the queues, plus short ones whose oldest player waited too long"""
+        batches = []
+        for level, heap in self.heaps.items():
+            while self.live[level] >= self.game_size:
+                batches.append([self._pop(heap) for _ in range(self.game_size)])
+                self.live[level] -= self.game_size
+            oldest = self._oldest(heap)
+            if oldest and self.live[level] >= self.min_players and now - oldest.enqueued_at >= self.max_wait_seconds:
+                batches.append([self._pop(heap) for _ in range(self.live[level])])
+                self.live[level] = 0
+        for batch in batches:
+            for ticket in batch:
+                # stays in by_user: enqueue hands it back, cancel can still reach it
+                ticket.matching = True
+        self.matched_total += sum(len(batch) for batch in batches)
+        self.games_formed += len(batches)
+        return batches
+
+    def _release(self, ticket: QuickPlayTicket):
+        ticket.matching = False
+        if self.by_user.get(ticket.user_id) is ticket:
+            del self.by_user[ticket.user_id]
+
+    def resolve(self, ticket: QuickPlayTicket, result: dict, now: float):
+        self._release(ticket)
+        ticket.result = result
+        ticket.resolved_at = now
+        ticket.done.set()
+
+    def drop(self, ticket: QuickPlayTicket):
+        """End a ticket taken out by form_matches without a game (cancelled for the player)"""
+        self._release(ticket)
+        ticket.cancelled = True
+        ticket.resolved_at = None
+        ticket.done.set()
+
+    def requeue(self, batch: List[QuickPlayTicket]):
+        """Put a batch back (at its original position) after game creation failed.
+
+        Tickets cancelled meanwhile stay out, as does one whose player holds
+        another live ticket by now: each player has at most one matchable ticket.
+        """
+        for ticket in batch:
+            ticket.matching = False
+            if ticket.cancelled or self.by_user.get(ticket.user_id, ticket) is not ticket:
+                continue
+            self._order += 1
+            heapq.heappush(self.heaps[ticket.difficulty_level], (ticket.enqueued_at, self._order, ticket))
+            self.live[ticket.difficulty_level] += 1
+            self.by_user[ticket.user_id] = ticket
+
+    def prune(self, now: float):
+        """Forget matched and cancelled tickets older than QUICKPLAY_RESULT_TTL_SECONDS"""
+        expired = [
+            ticket_id for ticket_id, ticket in self.by_id.items()
+            if (ticket.resolved_at is not None and now - ticket.resolved_at > QUICKPLAY_RESULT_TTL_SECONDS)
+            or (ticket.cancelled and now - ticket.enqueued_at > QUICKPLAY_RESULT_TTL_SECONDS)
+        ]
+        for ticket_id in expired:
+            del self.by_id[ticket_id]
+
+    def stats(self) -> dict:
+        return {
+            "queued": {level: count for level, count in self.live.items() if count},
+            "players_matched": self.matched_total,
+            "games_formed": self.games_formed
+        }
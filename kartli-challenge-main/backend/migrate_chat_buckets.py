@@ -0,0 +1,21 @@
+"""Fold one-document-per-message game chat into chat_buckets.
+
+Run from this directory with the backend's .env in place, after deploying the
+bucketed chat; re-running only picks up what is left:
+    python migrate_chat_buckets.py
+"""
+import asyncio
+
+import database
+from chat_buckets import migrate_chat_buckets
+
+
+async def main():
+    if database.db is None:
+        raise SystemExit("MONGO_URL and DB_NAME must be set")
+    moved = await migrate_chat_buckets()
+    print(f"Moved {moved['messages']} messages of {moved['games']} games into {moved['buckets']} buckets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
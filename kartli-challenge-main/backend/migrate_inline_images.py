@@ -0,0 +1,20 @@
+"""Move inline base64 proof photos and avatars into the blob store.
+
+Run from this directory with the backend's .env in place (BLOB_BACKEND and
+BLOB_DIR select where the bytes go); re-running only picks up what is left:
+    python migrate_inline_images.py
+"""
+import asyncio
+
+import server
+
+
+async def main():
+    if server.db is None:
+        raise SystemExit("MONGO_URL and DB_NAME must be set")
+    moved = await server.migrate_inline_images()
+    print(f"Moved {moved['submissions']} proofs and {moved['users']} avatars; skipped {moved['invalid']} invalid images")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
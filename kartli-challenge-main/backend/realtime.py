@@ -0,0 +1,299 @@
+"""In-process pub/sub for game and user events, and the websockets fed by it.
+
+Every write path publishes to a topic ("game:<id>", "user:<id>",
+"spectate:<id>"); sockets, long-polls and background workers subscribe
+instead of querying. Each subscriber has its own bounded queue, so publishing
+never waits and one slow consumer cannot hold up the others; what happens
+when its queue is full is the subscriber's policy. A socket's policy is to
+disconnect: the client reconnects and resyncs from a fresh snapshot.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+
+BROKER_QUEUE_SIZE = int(os.environ.get("BROKER_QUEUE_SIZE", "256"))
+WS_HEARTBEAT_SECONDS = int(os.environ.get("WS_HEARTBEAT_SECONDS", "20"))
+WS_SEND_QUEUE_SIZE = int(os.environ.get("WS_SEND_QUEUE_SIZE", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_event(event_type: str, data: Any) -> str:
+    """Serialize a push event once so it can be shared by every subscriber"""
+    return json.dumps({"type": event_type, "data": data}, default=json_default, ensure_ascii=False)
+
+
+def game_topic(game_id: str) -> str:
+    return f"game:{game_id}"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def spectate_topic(game_id: str) -> str:
+    return f"spectate:{game_id}"
+
+
+class BrokerMessage:
+    """One published event, shared by every subscriber; serialized at most once"""
+
+    __slots__ = ("topic", "type", "data", "_frame")
+
+    def __init__(self, topic: str, event_type: str, data: Any = None, frame: Optional[str] = None):
+        self.topic = topic
+        self.type = event_type
+        self.data = data
+        self._frame = frame
+
+    @property
+    def frame(self) -> str:
+        if self._frame is None:
+            self._frame = encode_event(self.type, self.data)
+        return self._frame
+
+
+class Subscription:
+    """A subscriber's bounded queue over one or more topics.
+
+    When the queue is full, `policy` decides:
+      drop_oldest - discard the oldest queued message (latest state wins)
+      drop_newest - discard the incoming message
+      disconnect  - close the subscription; the consumer resyncs from a snapshot
+    """
+
+    POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+    def __init__(self, broker: "EventBroker", topics: tuple, maxsize: int, policy: str, types: Optional[tuple]):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy}")
+        self.broker = broker
+        self.topics = topics
+        self.policy = policy
+        self.types = frozenset(types) if types else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self.overflowed = False
+
+    def wants(self, event_type: str) -> bool:
+        return self.types is None or event_type in self.types
+
+    def offer(self, message: BrokerMessage) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        self.broker.dropped += 1
+        if self.policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            return True
+        if self.policy == "disconnect":
+            self.overflowed = True
+            self.broker.disconnected += 1
+            self.close()
+        return False
+
+    def get_nowait(self) -> Optional[BrokerMessage]:
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[BrokerMessage]:
+        """Next message; None on timeout or once the subscription is closed"""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        if self.closed:
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.broker._remove(self)
+        # Wake a consumer parked in get(); anything still queued is discarded
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventBroker:
+    """Topic -> subscriptions. A topic ending in ":*" receives every topic with that prefix."""
+
+    def __init__(self):
+        self.topics: Dict[str, set] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def subscribe(self, *topics: str, maxsize: int = BROKER_QUEUE_SIZE, policy: str = "drop_oldest", types: Optional[tuple] = None) -> Subscription:
+        subscription = Subscription(self, topics, maxsize, policy, types)
+        for topic in topics:
+            self.topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _remove(self, subscription: Subscription):
+        for topic in subscription.topics:
+            group = self.topics.get(topic)
+            if group is None:
+                continue
+            group.discard(subscription)
+            if not group:
+                self.topics.pop(topic, None)
+
+    def has_subscribers(self, topic: str, event_type: Optional[str] = None) -> bool:
+        """Subscribers of exactly this topic (not wildcards); lets publishers skip building payloads"""
+        return any(event_type is None or s.wants(event_type) for s in self.topics.get(topic, ()))
+
+    def publish(self, topic: str, event_type: str, data: Any = None, frame: Optional[str] = None) -> int:
+        self.published += 1
+        subscribers = list(self.topics.get(topic, ()))
+        wildcard = self.topics.get(topic.partition(":")[0] + ":*")
+        if wildcard:
+            subscribers.extend(wildcard)
+        if not subscribers:
+            return 0
+        message = BrokerMessage(topic, event_type, data, frame)
+        delivered = 0
+        for subscription in subscribers:
+            if subscription.wants(event_type) and subscription.offer(message):
+                delivered += 1
+        self.delivered += delivered
+        return delivered
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self.topics),
+            "subscriptions": len({s for group in self.topics.values() for s in group}),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected
+        }
+
+
+broker = EventBroker()
+
+
+class LocalWrites:
+    """Bounded memory of writes this process made and already published.
+
+    The change feed sees every process's writes, including ours; it skips the
+    ones listed here so local subscribers do not get them twice.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.keys: "OrderedDict[tuple, None]" = OrderedDict()
+
+    def add(self, *key):
+        self.keys[key] = None
+        self.keys.move_to_end(key)
+        if len(self.keys) > self.size:
+            self.keys.popitem(last=False)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.keys
+
+
+local_writes = LocalWrites()
+
+
+class GameConnection:
+    """One socket and its broker subscription.
+
+    Publishing never awaits the network: frames wait in the subscription's
+    bounded queue and a per-connection sender task drains them. A client that
+    falls WS_SEND_QUEUE_SIZE frames behind is disconnected and expected to
+    reconnect and resync from a fresh snapshot.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, subscription: Subscription):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.subscription = subscription
+        self.last_seen = asyncio.get_running_loop().time()
+
+    def send(self, event_type: str, data: Any = None, frame: Optional[str] = None) -> bool:
+        """Queue a frame for this socket only (snapshots, pongs)"""
+        return self.subscription.offer(BrokerMessage("", event_type, data, frame))
+
+    async def sender(self):
+        """Drain the subscription; send a ping when idle and drop dead peers"""
+        loop = asyncio.get_running_loop()
+        ping = encode_event("ping", None)
+        while True:
+            message = await self.subscription.get(timeout=WS_HEARTBEAT_SECONDS)
+            if message is not None:
+                await self.websocket.send_text(message.frame)
+                continue
+            if self.subscription.overflowed:
+                logger.warning("Dropping slow websocket for user %s on %s", self.user_id, self.subscription.topics[0])
+                await self.websocket.close(code=1013, reason="Client too slow")
+                return
+            if self.subscription.closed:
+                return
+            if loop.time() - self.last_seen > WS_HEARTBEAT_SECONDS * 2:
+                await self.websocket.close(code=1001, reason="Heartbeat timeout")
+                return
+            await self.websocket.send_text(ping)
+
+
+def socket_subscription(*topics: str, types: Optional[tuple] = None) -> Subscription:
+    return broker.subscribe(*topics, maxsize=WS_SEND_QUEUE_SIZE, policy="disconnect", types=types)
+
+
+async def serve_connection(connection: GameConnection, channel: str):
+    """Run the connection's sender and answer pings until either side goes away"""
+    websocket = connection.websocket
+    sender = asyncio.create_task(connection.sender())
+    try:
+        while True:
+            receive = asyncio.create_task(websocket.receive_text())
+            done, _ = await asyncio.wait({receive, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                receive.cancel()
+                break
+            text = receive.result()
+            connection.last_seen = asyncio.get_running_loop().time()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                message = text
+            if message == "ping" or (isinstance(message, dict) and message.get("type") == "ping"):
+                connection.send("pong")
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Websocket error on %s", channel)
+    finally:
+        sender.cancel()
+        if websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
@@ -0,0 +1,19 @@
+"""Recompute every player_stats document from the game history.
+
+Run from this directory with the backend's .env in place:
+    python rebuild_player_stats.py
+"""
+import asyncio
+
+import server
+
+
+async def main():
+    if server.db is None:
+        raise SystemExit("MONGO_URL and DB_NAME must be set")
+    users = await server.rebuild_all_player_stats()
+    print(f"Rebuilt stats for {users} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,38 +1,89 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from bson import Binary, json_util
 from typing import List, Optional, Dict, Any
+from urllib.parse import urlencode
 import uuid
 from datetime import datetime, timezone, timedelta
 import httpx
 import random
 import json
+import asyncio
+import base64
+import secrets
+import io
+import multiprocessing
+import heapq
+import contextvars
+import functools
+import zlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from PIL import Image
 
 ROOT_DIR = Path(__file__).parent
+# before the local modules below, which read their settings at import
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.getenv('MONGO_URL')
-db_name = os.getenv('DB_NAME')
+from blobs import (
+    BLOB_CACHE_CONTROL, IMAGE_MEDIA_TYPES, SHA256_RE, blob_response, blob_url, decode_data_uri, etag_matches,
+    served_media_type, store_blob
+)
+from change_feed import ChangeFeed
+from chat_buckets import (
+    append_chat_message, appended_chat_messages, chat_bucket_heads, chat_key, load_chat, page_chat_rows
+)
+from database import client, db
+from imaging import IMAGE_FORMAT, transcode_image
+from matchmaking import (
+    QUICKPLAY_GAME_SIZE, QUICKPLAY_MAX_WAIT_SECONDS, QUICKPLAY_MIN_PLAYERS, MatchmakingQueue, QuickPlayTicket
+)
+from realtime import (
+    BROKER_QUEUE_SIZE, BrokerMessage, GameConnection, broker, encode_event, game_topic, json_default, local_writes,
+    serve_connection, socket_subscription, spectate_topic, user_topic
+)
+from uploads import (
+    UPLOAD_MAX_BYTES, append_chunks, append_stream, assemble_upload, check_appendable, multipart_file_parser,
+    new_upload, upload_cleanup_loop, upload_path, upload_view
+)
 
-client = None
-db = None
-if mongo_url and db_name:
-    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
-    db = client[db_name]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # startup() and shutdown() are at the end of this file, after everything they run
+    workers = await startup()
+    try:
+        yield
+    finally:
+        await shutdown(workers)
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Operational metrics (live game ids, queue sizes) are internal: only callers
+# sending METRICS_TOKEN in X-Metrics-Token get them; unset = disabled
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+async def require_metrics_token(request: Request):
+    token = request.headers.get("x-metrics-token", "")
+    if not METRICS_TOKEN or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+metrics_router = APIRouter(prefix="/api/metrics", dependencies=[Depends(require_metrics_token)])
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -263,6 +314,7 @@ class PlayCardRequest(BaseModel):
     card_id: str
     action: str  # play, pass, refuse
     photo_base64: Optional[str] = None
+    proof_id: Optional[str] = None  # from POST /uploads; preferred over photo_base64
     note: Optional[str] = None
 
 class VoteRequest(BaseModel):
@@ -307,7 +359,9 @@ async def get_current_user(request: Request) -> User:
     token = await get_session_token(request)
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+    return await get_user_for_session_token(token)
+
+async def get_user_for_session_token(token: str) -> User:
     session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
@@ -412,6 +466,173 @@ async def initialize_decks():
     for deck_type, title in removed:
         await db.cards.delete_many({"deck_type": deck_type, "title": title})
 
+# ==================== CARD SAMPLING ====================
+# Cards are drawn in memory from alias tables (Vose) built per (deck set,
+# max difficulty), weighted by the optional card "weight" field. Each player
+# keeps a bitset of recently drawn cards so challenges do not repeat across
+# consecutive hands and games while the pool allows it.
+
+NORMAL_DECKS = ("beceri", "cevre", "komik", "sosyal")
+PENALTY_DECKS = ("ceza",)
+CARD_RECENT_MEMORY = int(os.environ.get("CARD_RECENT_MEMORY", "12"))
+CARD_RECENT_PLAYERS = 10000
+CARD_DRAW_ATTEMPTS = 32
+
+class AliasTable:
+    """O(1) weighted draws over catalog indices"""
+    __slots__ = ("indices", "weights", "prob", "alias")
+
+    def __init__(self, indices: List[int], weights: List[float]):
+        n = len(indices)
+        self.indices = indices
+        self.weights = weights
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        total = float(sum(weights))
+        if not n or total <= 0:
+            return
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def draw(self, rand=random.random) -> int:
+        u = rand() * len(self.indices)
+        i = int(u)
+        return self.indices[i if u - i < self.prob[i] else self.alias[i]]
+
+class RecentCards:
+    """Bitset of the last `size` distinct catalog indices drawn for a player"""
+    __slots__ = ("bits", "order", "size")
+
+    def __init__(self, size: int):
+        self.bits = 0
+        self.order: deque = deque()
+        self.size = size
+
+    def __contains__(self, index: int) -> bool:
+        return (self.bits >> index) & 1 == 1
+
+    def add(self, index: int):
+        if index in self or self.size <= 0:
+            return
+        if len(self.order) >= self.size:
+            self.bits &= ~(1 << self.order.popleft())
+        self.order.append(index)
+        self.bits |= 1 << index
+
+class CardSampler:
+    def __init__(self, cards: List[dict], recent_size: int = CARD_RECENT_MEMORY):
+        self.cards = cards
+        self.by_id = {card["card_id"]: i for i, card in enumerate(cards)}
+        self.recent_size = recent_size
+        self.recent: "OrderedDict[str, RecentCards]" = OrderedDict()
+        self.tables: Dict[tuple, AliasTable] = {}
+        for level in (1, 2, 3):
+            self.table(NORMAL_DECKS, level)
+        self.table(PENALTY_DECKS)
+
+    def table(self, decks: tuple, max_difficulty: Optional[int] = None) -> AliasTable:
+        key = (tuple(sorted(decks)), max_difficulty)
+        table = self.tables.get(key)
+        if table is None:
+            indices = [
+                i for i, card in enumerate(self.cards)
+                if card.get("deck_type") in decks
+                and (max_difficulty is None or int(card.get("difficulty", 1) or 1) <= max_difficulty)
+            ]
+            weights = [float(self.cards[i].get("weight", 1.0) or 0.0) for i in indices]
+            table = self.tables[key] = AliasTable(indices, weights)
+        return table
+
+    def recent_for(self, user_id: Optional[str]) -> Optional[RecentCards]:
+        if user_id is None:
+            return None
+        recent = self.recent.get(user_id)
+        if recent is None:
+            recent = self.recent[user_id] = RecentCards(self.recent_size)
+            if len(self.recent) > CARD_RECENT_PLAYERS:
+                self.recent.popitem(last=False)
+        else:
+            self.recent.move_to_end(user_id)
+        return recent
+
+    def draw(self, user_id: Optional[str], decks: tuple, max_difficulty: Optional[int] = None,
+             count: int = 1, exclude: tuple = ()) -> List[dict]:
+        """Draw up to `count` distinct cards, avoiding `exclude` (card_ids) and the player's recent cards.
+
+        Recent-card suppression is dropped for a slot when the pool cannot
+        satisfy it within CARD_DRAW_ATTEMPTS tries.
+        """
+        table = self.table(decks, max_difficulty)
+        recent = self.recent_for(user_id)
+        taken = {self.by_id[card_id] for card_id in exclude if card_id in self.by_id}
+        # zero-weight cards are never dealt
+        available = sum(1 for i, w in zip(table.indices, table.weights) if w > 0 and i not in taken)
+        picked = []
+        for _ in range(min(count, available)):
+            choice = None
+            for attempt in range(CARD_DRAW_ATTEMPTS * 2):
+                index = table.draw()
+                if index in taken:
+                    continue
+                if recent is not None and index in recent and attempt < CARD_DRAW_ATTEMPTS:
+                    continue
+                choice = index
+                break
+            if choice is None:
+                choice = self.redraw(table, taken, recent)
+            taken.add(choice)
+            picked.append(choice)
+        if recent is not None:
+            for index in picked:
+                recent.add(index)
+        return [self.cards[i] for i in picked]
+
+    @staticmethod
+    def redraw(table: AliasTable, taken: set, recent: Optional[RecentCards]) -> int:
+        """Weighted draw over the cards still left, when the alias draws kept
+        hitting taken or recent ones; recent cards only if nothing else is left"""
+        left = [(i, w) for i, w in zip(table.indices, table.weights) if w > 0 and i not in taken]
+        fresh = [(i, w) for i, w in left if recent is None or i not in recent]
+        pool = fresh or left
+        return random.choices([i for i, _ in pool], [w for _, w in pool])[0]
+
+    def draw_hand(self, user_id: str, hand_number: int, difficulty_level: int) -> List[dict]:
+        """One player's 3 cards: hands 1-2 are 2 normal + 1 penalty, hand 3 is penalty cards only"""
+        if hand_number == 3:
+            return self.draw(user_id, PENALTY_DECKS, count=3)
+        penalty = self.draw(user_id, PENALTY_DECKS, count=1)
+        cards = self.draw(user_id, NORMAL_DECKS, difficulty_level, count=3 - len(penalty)) + penalty
+        random.shuffle(cards)
+        return cards
+
+card_sampler: Optional[CardSampler] = None
+
+async def get_card_sampler() -> CardSampler:
+    """The sampler over the current card catalog (built on first use and at startup)"""
+    global card_sampler
+    if card_sampler is None:
+        cards = await db.cards.find({}, {"_id": 0}).to_list(None)
+        card_sampler = CardSampler(cards)
+    return card_sampler
+
+async def reload_card_sampler() -> CardSampler:
+    """Rebuild the alias tables from the catalog (catalog indices change, so recent memory resets)"""
+    global card_sampler
+    card_sampler = None
+    return await get_card_sampler()
+
 # ==================== AUTH ENDPOINTS ====================
 
 @api_router.post("/auth/session")
@@ -525,6 +746,62 @@ async def get_leaderboard(current_user: User = Depends(get_current_user)):
     users = await db.users.find({}, {"_id": 0}).sort("weekly_score", -1).limit(50).to_list(50)
     return users
 
+@api_router.get("/users/me/games")
+async def get_my_games(cursor: Optional[str] = None, limit: int = 20, current_user: User = Depends(get_current_user)):
+    """Games the current user joined, newest first (keyset-paginated)"""
+    limit = max(1, min(limit, 100))
+    query = {"user_id": current_user.user_id}
+    if cursor:
+        position = decode_cursor(cursor, "joined_at", "id")
+        try:
+            joined_at = datetime.fromisoformat(position["joined_at"])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["$or"] = [
+            {"joined_at": {"$lt": joined_at}},
+            {"joined_at": joined_at, "player_entry_id": {"$lt": position["id"]}}
+        ]
+
+    # Served by the (user_id, joined_at, player_entry_id) index; finished games
+    # carry their summary, so only unfinished ones need a lookup
+    entries = await db.game_players.find(query, {"_id": 0}).sort(
+        [("joined_at", -1), ("player_entry_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    missing = [e["game_id"] for e in entries if not e.get("summary")]
+    games = {}
+    groups = {}
+    if missing:
+        async for g in db.games.find({"game_id": {"$in": missing}}, {"_id": 0, "game_id": 1, "status": 1, "group_id": 1, "finished_at": 1}):
+            games[g["game_id"]] = g
+        group_ids = list({g["group_id"] for g in games.values()})
+        async for grp in db.groups.find({"group_id": {"$in": group_ids}}, {"_id": 0, "group_id": 1, "name": 1}):
+            groups[grp["group_id"]] = grp["name"]
+
+    items = []
+    for e in entries:
+        summary = e.get("summary")
+        if not summary:
+            game = games.get(e["game_id"], {})
+            summary = {
+                "status": game.get("status"),
+                "group_id": game.get("group_id"),
+                "group_name": groups.get(game.get("group_id")),
+                "final_score": e.get("score", 0) if game.get("status") == "finished" else None,
+                "rank": None,
+                "player_count": None,
+                "finished_at": game.get("finished_at")
+            }
+        items.append({"game_id": e["game_id"], "joined_at": e.get("joined_at"), **summary})
+
+    next_cursor = None
+    if has_more and entries:
+        last = entries[-1]
+        next_cursor = encode_cursor({"joined_at": last["joined_at"].isoformat(), "id": last["player_entry_id"]})
+    return {"games": items, "next_cursor": next_cursor}
+
 # ==================== FRIEND ENDPOINTS ====================
 
 @api_router.post("/friends/request")
@@ -586,10 +863,11 @@ async def get_friend_requests(current_user: User = Depends(get_current_user)):
     }, {"_id": 0}).to_list(100)
     
     # Enrich with user info
+    users = await load_users({req["from_user_id"] for req in requests}, "name", "player_id", "picture")
     for req in requests:
-        from_user = await db.users.find_one({"user_id": req["from_user_id"]}, {"_id": 0})
+        from_user = users.get(req["from_user_id"])
         if from_user:
-            req["from_user"] = {"name": from_user["name"], "player_id": from_user["player_id"], "picture": from_user.get("picture")}
+            req["from_user"] = {"name": from_user["name"], "player_id": from_user["player_id"], "picture": avatar_url(from_user.get("picture"))}
     
     return requests
 
@@ -637,16 +915,17 @@ async def get_friends(current_user: User = Depends(get_current_user)):
         ]
     }, {"_id": 0}).to_list(100)
     
+    friend_ids = [f["user2_id"] if f["user1_id"] == current_user.user_id else f["user1_id"] for f in friendships]
+    users = await load_users(friend_ids, "name", "player_id", "picture", "weekly_score")
     friends = []
-    for f in friendships:
-        friend_id = f["user2_id"] if f["user1_id"] == current_user.user_id else f["user1_id"]
-        friend = await db.users.find_one({"user_id": friend_id}, {"_id": 0})
+    for friend_id in friend_ids:
+        friend = users.get(friend_id)
         if friend:
             friends.append({
                 "user_id": friend["user_id"],
                 "name": friend["name"],
                 "player_id": friend["player_id"],
-                "picture": friend.get("picture"),
+                "picture": avatar_url(friend.get("picture")),
                 "weekly_score": friend.get("weekly_score", 0)
             })
     
@@ -795,15 +1074,16 @@ async def get_group_details(group_id: str, current_user: User = Depends(get_curr
     
     # Get members
     members_data = await db.group_members.find({"group_id": group_id}, {"_id": 0}).to_list(100)
+    users = await load_users([m["user_id"] for m in members_data], "name", "player_id", "picture", "weekly_score")
     members = []
     for m in members_data:
-        user = await db.users.find_one({"user_id": m["user_id"]}, {"_id": 0})
+        user = users.get(m["user_id"])
         if user:
             members.append({
                 "user_id": user["user_id"],
                 "name": user["name"],
                 "player_id": user["player_id"],
-                "picture": user.get("picture"),
+                "picture": avatar_url(user.get("picture")),
                 "is_admin": m.get("is_admin", False),
                 "weekly_score": user.get("weekly_score", 0)
             })
@@ -877,6 +1157,494 @@ async def invite_friend_to_group(request: Request, group_id: str, friend_user_id
     
     return {"message": t("invitation_sent", request)}
 
+# ==================== GAME VERSIONING ====================
+
+STATE_LONG_POLL_MAX_SECONDS = int(os.environ.get("STATE_LONG_POLL_MAX_SECONDS", "30"))
+
+def publish_game_version(game_id: str, version: int):
+    """Announce a new game version; long-polls and the spectator feed listen for it"""
+    local_writes.add("game", game_id, version)
+    broker.publish(game_topic(game_id), "version", {"game_id": game_id, "version": version})
+
+# A version stamped on another document (chat, vote, submission, player) is
+# allocated by bump_game_version(notify=False) and written with that document
+# right after, so a reader can hand out version N while a document stamped
+# below N is still in flight. Readers therefore re-read the last
+# GAME_DELTA_LOOKBACK versions below the client's `since`: a late write shows
+# up with the next delta, and a writer that died after allocating only leaves
+# a gap. Rows can repeat across deltas; clients merge them by id.
+GAME_DELTA_LOOKBACK = int(os.environ.get("GAME_DELTA_LOOKBACK", "8"))
+
+def delta_floor(since: int) -> int:
+    """Lowest version (exclusive) a delta after `since` re-reads"""
+    return max(0, since - GAME_DELTA_LOOKBACK) if since else 0
+
+async def bump_game_version(game_id: str, update: Optional[dict] = None, notify: bool = True) -> int:
+    """Advance the game's version and return it.
+
+    `update` is a Mongo update document applied in the same write; it marks the
+    game fields as changed (state_revision). Callers that stamp other documents
+    with the returned version pass notify=False and call publish_game_version
+    after their write.
+    """
+    game = await bump_game(game_id, update, notify)
+    return game["version"] if game else 0
+
+async def bump_game(game_id: str, update: Optional[dict] = None, notify: bool = True, fields: tuple = ()) -> Optional[dict]:
+    """bump_game_version, returning the game's new version plus `fields` from the same write"""
+    ops = dict(update or {})
+    ops["$inc"] = {**ops.get("$inc", {}), "version": 1}
+    if update:
+        ops["$inc"]["state_revision"] = 1
+    game = await db.games.find_one_and_update(
+        {"game_id": game_id},
+        ops,
+        projection={"_id": 0, "version": 1, **{f: 1 for f in fields}},
+        return_document=ReturnDocument.AFTER
+    )
+    if game and notify:
+        publish_game_version(game_id, game["version"])
+    return game
+
+async def set_player_fields(game_id: str, player_entry_id: str, fields: dict, condition: Optional[dict] = None) -> int:
+    """Update a game_players entry and stamp it with a new game version.
+
+    With `condition` the write only lands while the entry still matches it;
+    returns 0 when it did not.
+    """
+    version = await bump_game_version(game_id, notify=False)
+    result = await db.game_players.update_one(
+        {"player_entry_id": player_entry_id, **(condition or {})},
+        {"$set": {**fields, "version": version}}
+    )
+    publish_game_version(game_id, version)
+    return version if result.matched_count else 0
+
+GAME_CAS_RETRIES = int(os.environ.get("GAME_CAS_RETRIES", "3"))
+
+async def update_game_if(game_id: str, check, game: Optional[dict] = None, notify: bool = True):
+    """Optimistic-concurrency update of the game document.
+
+    `check(game)` validates a game snapshot and returns the Mongo update to
+    apply, or None when there is nothing to do. The write is conditional on the
+    snapshot's state_revision, which only game-field writes advance (chat and
+    votes bump version alone); if another action got there first the game is
+    re-read and checked again, up to GAME_CAS_RETRIES times, before answering 409.
+    With notify=False the caller stamps another document with the new version
+    and calls publish_game_version after that write.
+    Returns (snapshot the update was based on, new version or None).
+    """
+    for attempt in range(GAME_CAS_RETRIES):
+        if game is None:
+            game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
+            if not game:
+                raise HTTPException(status_code=404, detail="Game not found")
+        try:
+            update = check(game)
+        except HTTPException as e:
+            if attempt == 0:
+                raise
+            raise HTTPException(status_code=409, detail=f"Game state changed: {e.detail}")
+        if update is None:
+            return game, None
+
+        ops = dict(update)
+        ops["$inc"] = {**ops.get("$inc", {}), "version": 1, "state_revision": 1}
+        revision_filter = (
+            {"state_revision": game["state_revision"]} if "state_revision" in game
+            else {"state_revision": {"$exists": False}}
+        )
+        updated = await db.games.find_one_and_update(
+            {"game_id": game_id, **revision_filter},
+            ops,
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if updated:
+            version = updated["version"]
+            if notify:
+                publish_game_version(game_id, version)
+            return game, version
+        game = None
+
+    raise HTTPException(status_code=409, detail="Game was updated concurrently, please retry")
+
+def ensure_players_turn(game: dict, user_id: str):
+    """Raise unless it is `user_id`'s turn in a started game within the hand time limit"""
+    if game.get("status") != "started":
+        raise HTTPException(status_code=400, detail="Game not started")
+
+    # Enforce turn order: only current player can act
+    turn_order = game.get("turn_order", [])
+    if turn_order:
+        current_idx = game.get("current_turn_index", 0) or 0
+        current_player_id = turn_order[current_idx % len(turn_order)]
+        if current_player_id != user_id:
+            raise HTTPException(status_code=400, detail="Not your turn")
+
+    # CHECK HAND TIME LIMIT
+    now = datetime.now(timezone.utc)
+    hand_started = game.get("hand_started_at")
+    if hand_started:
+        if hand_started.tzinfo is None:
+            hand_started = hand_started.replace(tzinfo=timezone.utc)
+        hand_elapsed = (now - hand_started).total_seconds()
+        limit_seconds = int(game.get("hand_time_limit_seconds", 60) or 60)
+        if hand_elapsed > limit_seconds:
+            raise HTTPException(status_code=400, detail="Hand time limit exceeded - time to move to next hand")
+
+def advance_turn_update(game: dict) -> dict:
+    """Update document moving the turn to the next player"""
+    turn_order = game.get("turn_order", [])
+    if not turn_order:
+        return {}
+    next_index = ((game.get("current_turn_index", 0) or 0) + 1) % len(turn_order)
+    return {"$set": {"current_turn_index": next_index, "turn_started_at": datetime.now(timezone.utc)}}
+
+async def adjust_hand_counters(game_id: str, hand_number: int, outstanding: int = 0, pending: int = 0) -> Optional[dict]:
+    """Apply deltas to the hand's outstanding-card / pending-submission counters.
+
+    Returns the counters after the write, or None when the game keeps no
+    counters for that hand (games dealt before counters existed).
+    """
+    game = await db.games.find_one_and_update(
+        {"game_id": game_id, "hand_counters.hand": hand_number},
+        {"$inc": {"hand_counters.outstanding": outstanding, "hand_counters.pending": pending}},
+        projection={"_id": 0, "hand_counters": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return game["hand_counters"] if game else None
+
+async def build_game_delta(game_id: str, since: int, recheck: bool = False) -> Optional[dict]:
+    """Everything that changed in a game after `since` (0 = full snapshot).
+
+    Rows stamped in the GAME_DELTA_LOOKBACK versions below `since` are sent
+    again. With `recheck` they are read even when the version has not moved
+    past `since` (a write stamped below it has just landed).
+    """
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
+    if not game:
+        return None
+
+    version = int(game.get("version", 0) or 0)
+    delta = {
+        "game_id": game_id,
+        "since": since,
+        "version": version,
+        "game": None,
+        "players": [],
+        "submissions": [],
+        "votes": [],
+        "chat": []
+    }
+    if since and version <= since and not recheck:
+        return delta
+
+    # Already read; cheaper to send than to track which of its fields changed
+    delta["game"] = game
+
+    floor = delta_floor(since)
+    # Up to the version read above: later ones come with the next delta
+    changed = {"game_id": game_id, "version": {"$gt": floor, "$lte": version}}
+
+    players = await db.game_players.find(changed, {"_id": 0}).to_list(100)
+    if game.get("archived"):
+        archive = await load_game_archive(game_id)
+        submissions = archived_rows(archive, "submissions", floor)[:100]
+        for s in submissions:
+            strip_inline_proof(s)
+            s["proof_url"] = proof_url(s, game_id)
+        votes = archived_rows(archive, "votes", floor)[:1000]
+        chat = sorted(archived_rows(archive, "chat_messages", floor), key=lambda m: m["created_at"])[-100:]
+    else:
+        submissions = await db.submissions.aggregate([
+            {"$match": changed},
+            {"$addFields": {"has_proof": HAS_PROOF_EXPR}},
+            {"$project": PROOF_PAYLOAD_EXCLUDED}
+        ]).to_list(100)
+        for s in submissions:
+            s["proof_url"] = proof_url(s)
+        votes = await db.votes.find(changed, {"_id": 0}).to_list(1000)
+        chat = page_chat_rows(await load_chat(game_id, 100, since=floor, until=version), None, None, 100)
+
+    user_ids = {p["user_id"] for p in players} | {m["user_id"] for m in chat} | {s["user_id"] for s in submissions}
+    users = {}
+    if user_ids:
+        async for u in db.users.find({"user_id": {"$in": list(user_ids)}}, {"_id": 0, "user_id": 1, "name": 1, "picture": 1, "player_id": 1}):
+            users[u["user_id"]] = u
+
+    for p in players:
+        user = users.get(p["user_id"])
+        if user:
+            p.update({"name": user["name"], "picture": avatar_url(user.get("picture")), "player_id": user["player_id"]})
+    for item in chat + submissions:
+        item["user"] = feed_user(users.get(item["user_id"]))
+
+    delta.update({"players": players, "submissions": submissions, "votes": votes, "chat": chat})
+    return delta
+
+async def ensure_game_player(game_id: str, user_id: str):
+    """404 for an unknown game, 403 unless `user_id` plays in it"""
+    if await db.game_players.find_one({"game_id": game_id, "user_id": user_id}, {"_id": 1}):
+        return
+    if not await db.games.find_one({"game_id": game_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Game not found")
+    raise HTTPException(status_code=403, detail="Not in this game")
+
+@api_router.get("/games/{game_id}/state")
+async def get_game_state(game_id: str, since: int = 0, timeout: float = 0, current_user: User = Depends(get_current_user)):
+    """Combined delta of game fields, players, submissions, votes and chat since a version.
+
+    With `timeout` > 0 the request is parked until the game changes or the
+    timeout (capped at STATE_LONG_POLL_MAX_SECONDS) expires.
+    """
+    await ensure_game_player(game_id, current_user.user_id)
+    # Subscribe before reading, so no change can slip in between
+    changed = broker.subscribe(game_topic(game_id), maxsize=1, types=("version",))
+    try:
+        delta = await build_game_delta(game_id, since)
+        if delta is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+
+        if since and delta["version"] <= since and timeout > 0:
+            if await changed.get(timeout=min(float(timeout), STATE_LONG_POLL_MAX_SECONDS)) is None:
+                return delta
+            delta = await build_game_delta(game_id, since, recheck=True)
+    finally:
+        changed.close()
+
+    return delta
+
+# ==================== GAME ACTORS ====================
+
+GAME_ACTOR_IDLE_SECONDS = float(os.environ.get("GAME_ACTOR_IDLE_SECONDS", "30"))
+
+# game_id of the actor the current task is running on (for re-entrant calls)
+_current_game_actor: contextvars.ContextVar = contextvars.ContextVar("current_game_actor", default=None)
+
+class GameActor:
+    """Mailbox plus a single consumer task; runs one game's mutations in order"""
+
+    def __init__(self, game_id: str, registry: "GameActorRegistry"):
+        self.game_id = game_id
+        self.registry = registry
+        self.mailbox: asyncio.Queue = asyncio.Queue()
+        self.processed = 0
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        _current_game_actor.set(self.game_id)
+        try:
+            await self.consume()
+        finally:
+            # Stopped (idle, cancelled at shutdown): later jobs get a fresh
+            # actor and nobody stays waiting on this one
+            self.registry.reap(self)
+            while not self.mailbox.empty():
+                _, future, _ = self.mailbox.get_nowait()
+                if not future.done():
+                    future.set_exception(HTTPException(status_code=503, detail="Game is restarting, please retry"))
+
+    async def consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                job, future, enqueued_at = await asyncio.wait_for(self.mailbox.get(), timeout=GAME_ACTOR_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                if self.mailbox.empty():
+                    self.registry.reap(self)
+                    return
+                continue
+
+            started = loop.time()
+            try:
+                result = await job()
+            except BaseException as e:
+                if not future.done():
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                # a job's own cancellation or error fails only its caller;
+                # stop for our cancellation or interpreter exit
+                if isinstance(e, (KeyboardInterrupt, SystemExit)) or (
+                    isinstance(e, asyncio.CancelledError) and asyncio.current_task().cancelling()
+                ):
+                    raise
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.processed += 1
+                self.registry.record(started - enqueued_at, loop.time() - started)
+
+class GameActorRegistry:
+    """Creates actors on demand and reaps them once idle.
+
+    Mutations for one game run sequentially on its actor while different games
+    proceed in parallel; no locks are held across games.
+    """
+
+    def __init__(self):
+        self.actors: Dict[str, GameActor] = {}
+        self.jobs_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.processing_seconds_total = 0.0
+        self.processing_seconds_max = 0.0
+        self.max_queue_depth = 0
+        self.reaped = 0
+
+    async def run(self, game_id: str, job):
+        """Run `job()` (a coroutine factory) on the game's actor and return its result"""
+        if _current_game_actor.get() == game_id:
+            # already on this game's actor (e.g. play_card -> check_hand_completion)
+            return await job()
+
+        actor = self.actors.get(game_id)
+        if actor is None:
+            actor = self.actors[game_id] = GameActor(game_id, self)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        actor.mailbox.put_nowait((job, future, loop.time()))
+        self.max_queue_depth = max(self.max_queue_depth, actor.mailbox.qsize())
+        return await future
+
+    def reap(self, actor: GameActor):
+        if self.actors.get(actor.game_id) is actor:
+            del self.actors[actor.game_id]
+            self.reaped += 1
+
+    def record(self, waited: float, processing: float):
+        self.jobs_total += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.processing_seconds_total += processing
+        self.processing_seconds_max = max(self.processing_seconds_max, processing)
+
+    def stats(self) -> dict:
+        depths = sorted(((a.mailbox.qsize(), game_id) for game_id, a in self.actors.items()), reverse=True)
+        jobs = self.jobs_total or 1
+        return {
+            "active_actors": len(self.actors),
+            "reaped_actors": self.reaped,
+            "jobs_total": self.jobs_total,
+            "queued_jobs": sum(depth for depth, _ in depths),
+            "max_queue_depth": self.max_queue_depth,
+            "deepest_queues": [{"game_id": game_id, "depth": depth} for depth, game_id in depths[:10] if depth],
+            "wait_ms_avg": round(self.wait_seconds_total / jobs * 1000, 3),
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            "processing_ms_avg": round(self.processing_seconds_total / jobs * 1000, 3),
+            "processing_ms_max": round(self.processing_seconds_max * 1000, 3)
+        }
+
+game_actors = GameActorRegistry()
+
+def game_mutation(func):
+    """Run the decorated endpoint on the actor of its `game_id` argument"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await game_actors.run(kwargs["game_id"], lambda: func(*args, **kwargs))
+    return wrapper
+
+@metrics_router.get("/game-actors")
+async def get_game_actor_metrics():
+    """Queue depth and processing time of the per-game actors"""
+    return game_actors.stats()
+
+# ==================== GAME EXPORT ====================
+# NDJSON streams of past games. Lines are {"type": ..., "data": ...}; after
+# each complete game a "cursor" line carries a token to resume after it.
+# (Registered before /games/{game_id} so "export" is not taken as an id.)
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "100"))
+
+def encode_cursor(position: dict) -> str:
+    """Opaque pagination token for a position (JSON-serializable dict)"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, *keys: str) -> dict:
+    """Position from encode_cursor; 400 if the token is malformed or lacks `keys`"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        if not all(key in position for key in keys):
+            raise ValueError(token)
+        return position
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_export_cursor(game_id: str) -> str:
+    return encode_cursor({"after": game_id})
+
+def decode_export_cursor(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    return str(decode_cursor(token, "after")["after"])
+
+def _export_line(kind: str, data: Any) -> str:
+    return json.dumps({"type": kind, "data": data}, default=json_default, ensure_ascii=False) + "\n"
+
+async def export_game_lines(game_id_cursor):
+    """Yield NDJSON lines for each game id produced by `game_id_cursor` (documents with a game_id)"""
+    async for ref in game_id_cursor:
+        game_id = ref["game_id"]
+        game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
+        if not game:
+            continue
+        yield _export_line("game", game)
+
+        async for player in db.game_players.find({"game_id": game_id}, {"_id": 0}):
+            yield _export_line("player", player)
+
+        if game.get("archived"):
+            archive = await load_game_archive(game_id)
+            for submission in archived_rows(archive, "submissions"):
+                strip_inline_proof(submission)
+                yield _export_line("submission", submission)
+            for penalty in archived_rows(archive, "penalties"):
+                yield _export_line("penalty", penalty)
+        else:
+            # Photos stay out of the export; has_proof tells whether one exists
+            submissions = db.submissions.aggregate([
+                {"$match": {"game_id": game_id}},
+                {"$addFields": {"has_proof": HAS_PROOF_EXPR}},
+                {"$project": PROOF_PAYLOAD_EXCLUDED}
+            ])
+            async for submission in submissions:
+                yield _export_line("submission", submission)
+            async for penalty in db.penalties.find({"game_id": game_id}, {"_id": 0}):
+                yield _export_line("penalty", penalty)
+
+        yield _export_line("cursor", {"cursor": encode_export_cursor(game_id)})
+
+def _ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@api_router.get("/games/export")
+async def export_my_games(cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Stream the current user's games as NDJSON (resume with the last cursor line)"""
+    query = {"user_id": current_user.user_id}
+    after = decode_export_cursor(cursor)
+    if after:
+        query["game_id"] = {"$gt": after}
+    game_ids = db.game_players.find(query, {"_id": 0, "game_id": 1}).sort("game_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    return _ndjson_response(export_game_lines(game_ids))
+
+@api_router.get("/groups/{group_id}/games/export")
+async def export_group_games(group_id: str, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Stream a group's games as NDJSON (resume with the last cursor line)"""
+    membership = await db.group_members.find_one({"group_id": group_id, "user_id": current_user.user_id})
+    if not membership:
+        raise HTTPException(status_code=403, detail="Not a member of this group")
+
+    query = {"group_id": group_id}
+    after = decode_export_cursor(cursor)
+    if after:
+        query["game_id"] = {"$gt": after}
+    game_ids = db.games.find(query, {"_id": 0, "game_id": 1}).sort("game_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    return _ndjson_response(export_game_lines(game_ids))
+
 # ==================== GAME ENDPOINTS ====================
 
 @api_router.post("/games")
@@ -928,7 +1696,10 @@ async def create_game(req: CreateGameRequest, current_user: User = Depends(get_c
         "turn_order": [],         # sıra listesi (user_id'ler)
         "current_turn_index": 0,  # şu an kimin sırası
         "ready_players": [],      # kimler ready dedi
-        "turn_started_at": None   # son turun başlangıç zamanı (datetime)
+        "turn_started_at": None,  # son turun başlangıç zamanı (datetime)
+        # --- DELTA SYNC ---
+        "version": 0,             # her değişiklikte artar
+        "state_revision": 0       # yalnızca oyun alanı yazımlarında artar (CAS için)
     }
     await db.games.insert_one(game)
     
@@ -941,6 +1712,7 @@ async def create_game(req: CreateGameRequest, current_user: User = Depends(get_c
         "swap_used": False,
         "score": 0,
         "joined_at": datetime.now(timezone.utc),
+        "version": 0
     }
     await db.game_players.insert_one(player_entry)
     
@@ -956,7 +1728,7 @@ async def create_game(req: CreateGameRequest, current_user: User = Depends(get_c
             "players": game["players"],
             "turn_order": game["turn_order"],
             "current_turn_index": game["current_turn_index"]
-        }}
+        }, "$inc": {"state_revision": 1}}
     )
     
     # Notify other group members
@@ -1037,7 +1809,19 @@ async def accept_game_invite(request: Request, notification_id: str, current_use
             "is_admin": False
         }
         await db.group_members.insert_one(membership)
+
+    await game_actors.run(game_id, lambda: _join_invited_game(game_id, current_user))
+
+    # Mark notification as read
+    await db.notifications.update_one(
+        {"notification_id": notification_id},
+        {"$set": {"read": True}}
+    )
     
+    await publish_game_state(game_id)
+    return {"message": t("joined_group_game_success", request), "game_id": game_id, "group_id": group_id}
+
+async def _join_invited_game(game_id: str, current_user: User):
     # Check if the game is still in waiting status
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
     if not game:
@@ -1053,7 +1837,12 @@ async def accept_game_invite(request: Request, notification_id: str, current_use
     })
     
     if not existing_player:
-        # Join the game
+        # Join the game (and its turn order, as /join does)
+        version = await bump_game_version(
+            game_id,
+            {"$addToSet": {"players": current_user.user_id, "turn_order": current_user.user_id}},
+            notify=False
+        )
         player_entry = {
             "player_entry_id": f"pe_{uuid.uuid4().hex[:12]}",
             "game_id": game_id,
@@ -1061,19 +1850,14 @@ async def accept_game_invite(request: Request, notification_id: str, current_use
             "pass_used": False,
             "swap_used": False,
             "score": 0,
-            "joined_at": datetime.now(timezone.utc)
+            "joined_at": datetime.now(timezone.utc),
+            "version": version
         }
         await db.game_players.insert_one(player_entry)
-    
-    # Mark notification as read
-    await db.notifications.update_one(
-        {"notification_id": notification_id},
-        {"$set": {"read": True}}
-    )
-    
-    return {"message": t("joined_group_game_success", request), "game_id": game_id, "group_id": group_id}
+        publish_game_version(game_id, version)
 
 @api_router.post("/games/{game_id}/join")
+@game_mutation
 async def join_game(request: Request, game_id: str, current_user: User = Depends(get_current_user)):
     """Join a waiting game - auto-starts at 2+ players, removes from other group games"""
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
@@ -1114,11 +1898,18 @@ async def join_game(request: Request, game_id: str, current_user: User = Depends
         })
         
         # Remove from players and turn_order arrays
-        await db.games.update_one(
-            {"game_id": other_game["game_id"]},
+        await bump_game_version(
+            other_game["game_id"],
             {"$pull": {"players": current_user.user_id, "turn_order": current_user.user_id}}
         )
     
+    # Add to players and turn_order arrays
+    version = await bump_game_version(
+        game_id,
+        {"$addToSet": {"players": current_user.user_id, "turn_order": current_user.user_id}},
+        notify=False
+    )
+
     # ADD PLAYER TO THIS GAME
     player_entry = {
         "player_entry_id": f"pe_{uuid.uuid4().hex[:12]}",
@@ -1127,15 +1918,11 @@ async def join_game(request: Request, game_id: str, current_user: User = Depends
         "pass_used": False,
         "swap_used": False,
         "score": 0,
-        "joined_at": datetime.now(timezone.utc)
+        "joined_at": datetime.now(timezone.utc),
+        "version": version
     }
     await db.game_players.insert_one(player_entry)
-    
-    # Add to players and turn_order arrays
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$addToSet": {"players": current_user.user_id, "turn_order": current_user.user_id}}
-    )
+    publish_game_version(game_id, version)
 
     # Ensure current_turn_index exists
     await db.games.update_one(
@@ -1148,15 +1935,21 @@ async def join_game(request: Request, game_id: str, current_user: User = Depends
     
     # AUTO-START IF 2+ PLAYERS
     if player_count >= 2:
-        await db.games.update_one(
-            {"game_id": game_id},
-            {"$set": {
+        def start_if_waiting(fresh: dict) -> Optional[dict]:
+            # A concurrent join may have started the game already
+            if fresh.get("status") != "waiting":
+                return None
+            return {"$set": {
                 "status": "started",
                 "current_hand": 1,
                 "current_turn_index": 0,
                 "turn_started_at": datetime.now(timezone.utc)
             }}
-        )
+
+        _, started = await update_game_if(game_id, start_if_waiting)
+        if started is None:
+            await publish_game_state(game_id)
+            return {"message": t("joined_game", request)}
         
         # Deal cards for first hand
         await deal_cards_for_hand(game_id, 1)
@@ -1172,11 +1965,14 @@ async def join_game(request: Request, game_id: str, current_user: User = Depends
                 {"game_id": game_id}
             )
         
+        await publish_game_state(game_id)
         return {"message": t("joined_game_auto_started", request)}
     
+    await publish_game_state(game_id)
     return {"message": t("joined_game", request)}
 
 @api_router.post("/games/{game_id}/start")
+@game_mutation
 async def start_game(request: Request, game_id: str, current_user: User = Depends(get_current_user)):
     """Start the game (must have at least 2 players)"""
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
@@ -1195,10 +1991,12 @@ async def start_game(request: Request, game_id: str, current_user: User = Depend
         raise HTTPException(status_code=400, detail="En az 2 oyuncu gerekli!")
     
     # Update game status to 'started' with turn initialization
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$set": {"status": "started", "current_hand": 1, "current_turn_index": 0, "turn_started_at": datetime.now(timezone.utc), "hand_started_at": datetime.now(timezone.utc)}}
-    )
+    def start_if_ready(fresh: dict) -> dict:
+        if fresh["status"] not in ["waiting", "ready"]:
+            raise HTTPException(status_code=400, detail="Game not ready to start")
+        return {"$set": {"status": "started", "current_hand": 1, "current_turn_index": 0, "turn_started_at": datetime.now(timezone.utc), "hand_started_at": datetime.now(timezone.utc)}}
+
+    await update_game_if(game_id, start_if_ready, game)
     
     # Deal cards for first hand
     await deal_cards_for_hand(game_id, 1)
@@ -1214,6 +2012,7 @@ async def start_game(request: Request, game_id: str, current_user: User = Depend
             {"game_id": game_id}
         )
     
+    await publish_game_state(game_id)
     return {"message": t("game_started", request), "hand": 1}
 
 async def deal_cards_for_hand(game_id: str, hand_number: int):
@@ -1221,34 +2020,13 @@ async def deal_cards_for_hand(game_id: str, hand_number: int):
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
     difficulty_level = int((game or {}).get("difficulty_level", 2) or 2)
     players = await db.game_players.find({"game_id": game_id}, {"_id": 0}).to_list(100)
+    sampler = await get_card_sampler()
     
-    # Determine card deck based on hand number
-    if hand_number == 3:
-        # Hand 3: Penalty cards only
-        deck_types = ["ceza"]
-    else:
-        # Hands 1-2: Normal decks + 1 penalty card
-        deck_types = ["komik", "sosyal", "beceri", "cevre"]
-    
-    cards_query = {"deck_type": {"$in": deck_types}}
-    if hand_number != 3:
-        cards_query["difficulty"] = {"$lte": difficulty_level}
-    all_cards = await db.cards.find(cards_query, {"_id": 0}).to_list(1000)
-    penalty_cards = []
-    if hand_number in [1, 2]:
-        penalty_cards = await db.cards.find({"deck_type": "ceza"}, {"_id": 0}).to_list(1000)
-    
+    dealt = {}
     for player in players:
-        # Shuffle and pick 3 random cards
-        random.shuffle(all_cards)
-        if hand_number in [1, 2] and penalty_cards:
-            random.shuffle(penalty_cards)
-            normal_pick = random.sample(all_cards, min(2, len(all_cards)))
-            penalty_pick = random.sample(penalty_cards, 1)
-            player_cards = normal_pick + penalty_pick
-            random.shuffle(player_cards)
-        else:
-            player_cards = random.sample(all_cards, min(3, len(all_cards)))
+        # Hands 1-2: 2 normal cards + 1 penalty card, hand 3: penalty cards only
+        player_cards = sampler.draw_hand(player["user_id"], hand_number, difficulty_level)
+        dealt[player["user_id"]] = [card["card_id"] for card in player_cards]
         
         for card in player_cards:
             hand_card = {
@@ -1262,13 +2040,29 @@ async def deal_cards_for_hand(game_id: str, hand_number: int):
             }
             await db.hand_cards.insert_one(hand_card)
 
+    await db.games.update_one(
+        {"game_id": game_id},
+        {"$set": {"hand_counters": {
+            "hand": hand_number,
+            "outstanding": sum(len(card_ids) for card_ids in dealt.values()),
+            "pending": 0
+        }}}
+    )
+
 @api_router.get("/games/{game_id}")
 async def get_game(game_id: str, current_user: User = Depends(get_current_user)):
     """Get game details"""
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
+    game = await build_game_view(game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    
+    return game
+
+async def build_game_view(game_id: str) -> Optional[dict]:
+    """Game document with players enriched by user info (shared by REST and sockets)"""
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
+    if not game:
+        return None
+
     # Get players with user info
     players_data = await db.game_players.find({"game_id": game_id}, {"_id": 0}).to_list(100)
     players = []
@@ -1307,6 +2101,11 @@ async def get_my_cards(game_id: str, current_user: User = Depends(get_current_us
         "user_id": current_user.user_id,
         "status": "in_hand"
     }, {"_id": 0}).to_list(10)
+    if game.get("archived"):
+        hand_cards = [
+            hc for hc in archived_rows(await load_game_archive(game_id), "hand_cards")
+            if hc["hand_number"] == game["current_hand"] and hc["user_id"] == current_user.user_id and hc["status"] == "in_hand"
+        ][:10]
     
     # Enrich with card details
     cards = []
@@ -1338,6 +2137,7 @@ async def get_my_cards(game_id: str, current_user: User = Depends(get_current_us
 
 
 @api_router.post("/games/{game_id}/select")
+@game_mutation
 async def select_card(request: Request, game_id: str, req: SelectCardRequest, current_user: User = Depends(get_current_user)):
     """Select one of the 3 cards for the current hand"""
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
@@ -1386,6 +2186,7 @@ async def select_card(request: Request, game_id: str, req: SelectCardRequest, cu
     return {"selected_card_id": req.card_id}
 
 @api_router.post("/games/{game_id}/play")
+@game_mutation
 async def play_card(request: Request, game_id: str, req: PlayCardRequest, current_user: User = Depends(get_current_user)):
     """Play a card: play, pass, or refuse"""
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
@@ -1402,26 +2203,13 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
     if not player_entry:
         raise HTTPException(status_code=403, detail="Not in this game")
     
-    # Enforce turn order: only current player can act
-    turn_order = game.get("turn_order", [])
-    if turn_order:
-        current_idx = game.get("current_turn_index", 0) or 0
-        # guard against empty turn_order
-        if len(turn_order) > 0:
-            current_player_id = turn_order[current_idx % len(turn_order)]
-            if current_player_id != current_user.user_id:
-                raise HTTPException(status_code=400, detail="Not your turn")
+    # Enforce turn order and hand time limit
+    ensure_players_turn(game, current_user.user_id)
 
-    # CHECK HAND TIME LIMIT
-    now = datetime.now(timezone.utc)
-    hand_started = game.get("hand_started_at")
-    if hand_started:
-        if hand_started.tzinfo is None:
-            hand_started = hand_started.replace(tzinfo=timezone.utc)
-        hand_elapsed = (now - hand_started).total_seconds()
-        limit_seconds = int(game.get("hand_time_limit_seconds", 60) or 60)
-        if hand_elapsed > limit_seconds:
-            raise HTTPException(status_code=400, detail="Hand time limit exceeded - time to move to next hand")
+    if req.action not in ("play", "pass", "refuse"):
+        raise HTTPException(status_code=400, detail="Invalid action")
+    if req.action == "pass" and player_entry["pass_used"]:
+        raise HTTPException(status_code=400, detail="Pass already used")
     
     # Find the hand card
     hand_card = await db.hand_cards.find_one({
@@ -1444,32 +2232,110 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
     }, {"_id": 0})
     if selected_any and selected_any.get("card_id") != req.card_id:
         raise HTTPException(status_code=400, detail="You must play the selected card")
+
+    # Proof bytes go to the blob store; the submission keeps only the hash
+    proof_sha = proof_variants = None
+    if req.action == "play" and req.proof_id:
+        upload = await db.uploads.find_one(
+            {"upload_id": req.proof_id, "user_id": current_user.user_id, "status": "ready"},
+            {"_id": 0, "variants": 1}
+        )
+        if not upload:
+            raise HTTPException(status_code=400, detail="Proof upload not found or already used")
+        proof_variants = upload["variants"]
+    elif req.action == "play" and req.photo_base64:
+        proof_variants = await ingest_data_uri(req.photo_base64, "proof")
+    proof_dhash = None
+    near_duplicates = []
+    if proof_variants:
+        proof_sha = proof_variants["vote"]
+        blob = await db.blobs.find_one({"sha256": proof_sha}, {"_id": 0, "dhash": 1})
+        proof_dhash = blob.get("dhash") if blob else None
+        if proof_dhash is not None:
+            near_duplicates = await find_near_duplicate_proofs(proof_dhash, game.get("group_id"), current_user.user_id)
+
+    # Claim the turn with a conditional write keyed on the version read above;
+    # a double-tap or a racing timer loses here instead of advancing twice
+    hand_number = game["current_hand"]
+
+    def claim_turn(fresh: dict) -> dict:
+        if fresh.get("current_hand") != hand_number:
+            raise HTTPException(status_code=400, detail="Hand already finished")
+        ensure_players_turn(fresh, current_user.user_id)
+        return advance_turn_update(fresh)
+
+    async def release_upload():
+        await db.uploads.update_one({"upload_id": req.proof_id, "status": "used"}, {"$set": {"status": "ready"}})
+
+    # A pass or a proof upload is claimed before the turn: losing the turn race
+    # hands it back, while losing the claim race must not cost the player the turn
+    if req.action == "pass":
+        claimed = await set_player_fields(
+            game_id, player_entry["player_entry_id"], {"pass_used": True}, {"pass_used": {"$ne": True}}
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Pass already used")
+    elif req.action == "play" and req.proof_id:
+        claimed = await db.uploads.find_one_and_update(
+            {"upload_id": req.proof_id, "user_id": current_user.user_id, "status": "ready"},
+            {"$set": {"status": "used"}},
+            projection={"variants": 1}
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Proof upload not found or already used")
+    try:
+        game, version = await update_game_if(game_id, claim_turn, game, notify=req.action != "play")
+    except HTTPException:
+        if req.action == "pass":
+            await set_player_fields(game_id, player_entry["player_entry_id"], {"pass_used": False})
+        elif req.action == "play" and req.proof_id:
+            await release_upload()
+        raise
     
     if req.action == "play":
         # Create submission
         submission = {
             "submission_id": f"sub_{uuid.uuid4().hex[:12]}",
             "game_id": game_id,
+            "group_id": game.get("group_id"),
             "hand_number": game["current_hand"],
             "user_id": current_user.user_id,
             "card_id": req.card_id,
-            "photo_base64": req.photo_base64,
+            "proof_sha": proof_sha,
+            "proof_variants": proof_variants,
+            "proof_dhash": proof_dhash,
+            "near_duplicates": near_duplicates,
             "note": req.note,
             "status": "pending",
             "created_at": datetime.now(timezone.utc),
+            "has_proof": bool(proof_sha),
             "votes_approve": 0,
-            "votes_reject": 0
+            "votes_reject": 0,
+            "version": version
         }
-        await db.submissions.insert_one(submission)
+        try:
+            await db.submissions.insert_one(submission)
+        except BaseException:
+            if req.proof_id:
+                await release_upload()
+            raise
+        publish_game_version(game_id, version)
+        if proof_dhash is not None:
+            await record_proof_hash(submission)
+        if req.proof_id:
+            await db.uploads.update_one(
+                {"upload_id": req.proof_id},
+                {"$set": {"submission_id": submission["submission_id"]}}
+            )
         
         # Update card status
-        await db.hand_cards.update_one(
+        played = await db.hand_cards.update_one(
             {"hand_card_id": hand_card["hand_card_id"]},
             {"$set": {"status": "played"}}
         )
 
         # Discard any other remaining cards for this player in this hand
-        await db.hand_cards.update_many(
+        discarded = await db.hand_cards.update_many(
             {
                 "game_id": game_id,
                 "hand_number": game["current_hand"],
@@ -1479,6 +2345,12 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
             },
             {"$set": {"status": "discarded", "selected": False}}
         )
+        counters = await adjust_hand_counters(
+            game_id, game["current_hand"],
+            outstanding=-(played.modified_count + discarded.modified_count),
+            pending=1
+        )
+        await bump_player_stats(current_user.user_id, cards_played=1)
         
         # Create chat message
         card = await db.cards.find_one({"card_id": req.card_id}, {"_id": 0})
@@ -1502,36 +2374,22 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
                     {"submission_id": submission["submission_id"], "game_id": game_id}
                 )
         
-        # Advance turn
-        turn_order = game.get("turn_order", [])
-        if turn_order:
-            next_index = (game.get("current_turn_index", 0) + 1) % len(turn_order)
-            await db.games.update_one(
-                {"game_id": game_id},
-                {"$set": {"current_turn_index": next_index, "turn_started_at": datetime.now(timezone.utc)}}
-            )
-        
         # CHECK IF HAND SHOULD AUTO-ADVANCE (2+ players submitted)
-        await check_hand_completion(game_id)
+        await check_hand_completion(game_id, counters)
+
+        publish_submission(submission)
+        await publish_game_state(game_id)
         
         return {"message": t("card_played", request), "submission_id": submission["submission_id"]}
     
     elif req.action == "pass":
-        if player_entry["pass_used"]:
-            raise HTTPException(status_code=400, detail="Pass already used")
-        
-        await db.game_players.update_one(
-            {"player_entry_id": player_entry["player_entry_id"]},
-            {"$set": {"pass_used": True}}
-        )
-        
-        await db.hand_cards.update_one(
+        passed = await db.hand_cards.update_one(
             {"hand_card_id": hand_card["hand_card_id"]},
             {"$set": {"status": "passed"}}
         )
 
         # Discard any other remaining cards for this player in this hand
-        await db.hand_cards.update_many(
+        discarded = await db.hand_cards.update_many(
             {
                 "game_id": game_id,
                 "hand_number": game["current_hand"],
@@ -1540,6 +2398,10 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
             },
             {"$set": {"status": "discarded", "selected": False}}
         )
+        counters = await adjust_hand_counters(
+            game_id, game["current_hand"], outstanding=-(passed.modified_count + discarded.modified_count)
+        )
+        await bump_player_stats(current_user.user_id, passes_used=1)
         
         await create_chat_message(
             game_id,
@@ -1548,23 +2410,15 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
             "system"
         )
         
-        # Advance turn
-        turn_order = game.get("turn_order", [])
-        if turn_order:
-            next_index = (game.get("current_turn_index", 0) + 1) % len(turn_order)
-            await db.games.update_one(
-                {"game_id": game_id},
-                {"$set": {"current_turn_index": next_index, "turn_started_at": datetime.now(timezone.utc)}}
-            )
-
         # Check hand completion (may auto-advance if everyone finished and votes resolved)
-        await check_hand_completion(game_id)
+        await check_hand_completion(game_id, counters)
+        await publish_game_state(game_id)
 
         return {"message": t("passed", request)}
     
     elif req.action == "refuse":
         # Player refuses the card and immediately receives a penalty card
-        penalty_card = await get_random_penalty_card()
+        penalty_card = await get_random_penalty_card(current_user.user_id)
 
         penalty = {
             "penalty_id": f"pen_{uuid.uuid4().hex[:12]}",
@@ -1577,13 +2431,13 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
         await db.penalties.insert_one(penalty)
 
         # Mark the hand card as discarded
-        await db.hand_cards.update_one(
+        refused = await db.hand_cards.update_one(
             {"hand_card_id": hand_card["hand_card_id"]},
             {"$set": {"status": "discarded"}}
         )
 
         # Discard any other remaining cards for this player in this hand
-        await db.hand_cards.update_many(
+        discarded = await db.hand_cards.update_many(
             {
                 "game_id": game_id,
                 "hand_number": game["current_hand"],
@@ -1592,6 +2446,10 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
             },
             {"$set": {"status": "discarded", "selected": False}}
         )
+        counters = await adjust_hand_counters(
+            game_id, game["current_hand"], outstanding=-(refused.modified_count + discarded.modified_count)
+        )
+        await bump_player_stats(current_user.user_id, refusals=1, penalties_received=1)
 
         await create_chat_message(
             game_id,
@@ -1600,24 +2458,14 @@ async def play_card(request: Request, game_id: str, req: PlayCardRequest, curren
             "system"
         )
 
-        # Advance turn after refuse
-        turn_order = game.get("turn_order", [])
-        if turn_order:
-            next_index = (game.get("current_turn_index", 0) + 1) % len(turn_order)
-            await db.games.update_one(
-                {"game_id": game_id},
-                {"$set": {"current_turn_index": next_index, "turn_started_at": datetime.now(timezone.utc)}}
-            )
-
         # Check hand completion
-        await check_hand_completion(game_id)
+        await check_hand_completion(game_id, counters)
+        await publish_game_state(game_id)
 
         return {"message": t("rejected", request), "penalty_card": penalty_card}
 
-    else:
-        raise HTTPException(status_code=400, detail="Invalid action")
-
 @api_router.post("/games/{game_id}/swap")
+@game_mutation
 async def swap_card(request: Request, game_id: str, req: SwapCardRequest, current_user: User = Depends(get_current_user)):
     """Swap a card (one time per game)"""
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
@@ -1647,16 +2495,20 @@ async def swap_card(request: Request, game_id: str, req: SwapCardRequest, curren
     })
     if not hand_card:
         raise HTTPException(status_code=404, detail="Card not in hand")
+
+    # Mark swap as used; only one concurrent request can flip the flag
+    claimed = await set_player_fields(
+        game_id, player_entry["player_entry_id"], {"swap_used": True}, {"swap_used": {"$ne": True}}
+    )
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Swap already used")
     
-    await db.hand_cards.delete_one({"hand_card_id": hand_card["hand_card_id"]})
+    removed = await db.hand_cards.delete_one({"hand_card_id": hand_card["hand_card_id"]})
     
     # Get a new random card
     difficulty_level = int(game.get("difficulty_level", 2) or 2)
-    deck_types = ["komik", "sosyal", "beceri", "cevre"]
-    new_card = await db.cards.aggregate([
-        {"$match": {"deck_type": {"$in": deck_types}, "difficulty": {"$lte": difficulty_level}, "card_id": {"$ne": req.card_id}}},
-        {"$sample": {"size": 1}}
-    ]).to_list(1)
+    sampler = await get_card_sampler()
+    new_card = sampler.draw(current_user.user_id, NORMAL_DECKS, difficulty_level, exclude=(req.card_id,))
     
     if new_card:
         new_hand_card = {
@@ -1668,75 +2520,114 @@ async def swap_card(request: Request, game_id: str, req: SwapCardRequest, curren
             "status": "in_hand"
         }
         await db.hand_cards.insert_one(new_hand_card)
-    
-    # Mark swap as used
-    await db.game_players.update_one(
-        {"player_entry_id": player_entry["player_entry_id"]},
-        {"$set": {"swap_used": True}}
+    await adjust_hand_counters(
+        game_id, game["current_hand"], outstanding=(1 if new_card else 0) - removed.deleted_count
     )
+    await bump_player_stats(current_user.user_id, swaps_used=1)
     
     return {"message": t("card_swapped", request), "new_card": new_card[0] if new_card else None}
 
-async def get_random_penalty_card():
-    """Get a random penalty card"""
-    penalty_cards = await db.cards.aggregate([
-        {"$match": {"deck_type": "ceza"}},
-        {"$sample": {"size": 1}}
-    ]).to_list(1)
+async def get_random_penalty_card(user_id: Optional[str] = None):
+    """Get a random penalty card (avoiding the player's recent cards when user_id is given)"""
+    sampler = await get_card_sampler()
+    penalty_cards = sampler.draw(user_id, PENALTY_DECKS)
     
     if penalty_cards:
-        # remove Mongo internal _id to keep result JSON-serializable
-        penalty_cards[0].pop("_id", None)
-        return penalty_cards[0]
+        # copy: catalog entries are shared by every draw
+        return dict(penalty_cards[0])
     return {"card_id": "default_penalty", "title": "Ceza", "description": "Özür dile!", "deck_type": "ceza"}
 
 
-async def check_hand_completion(game_id: str):
+async def check_hand_completion(game_id: str, counters: Optional[dict] = None):
     """Check whether the current hand is complete (no remaining in-hand cards).
     If complete, advance to next hand or finish the game. Deals cards for next hand.
+
+    `counters` is the hand_counters result of the caller's write; without it
+    (legacy games) the remaining cards and pending submissions are counted.
     """
+    if counters is not None and (counters["outstanding"] > 0 or counters["pending"] > 0):
+        return
+    await game_actors.run(game_id, lambda: _check_hand_completion(game_id, counters))
+
+async def _check_hand_completion(game_id: str, counters: Optional[dict] = None):
     game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
+    if not game or game.get("status") != "started":
         return
 
     current_hand = game.get("current_hand", 1)
 
-    # Count remaining in-hand cards for current hand
-    remaining = await db.hand_cards.count_documents({
-        "game_id": game_id,
-        "hand_number": current_hand,
-        "status": "in_hand"
-    })
+    if counters is not None:
+        # Both counters hit zero on the caller's write; it must be this hand's
+        if counters["hand"] != current_hand:
+            return
+    else:
+        # Count remaining in-hand cards for current hand
+        remaining = await db.hand_cards.count_documents({
+            "game_id": game_id,
+            "hand_number": current_hand,
+            "status": "in_hand"
+        })
 
-    if remaining > 0:
-        return
+        if remaining > 0:
+            return
 
-    # Do not advance while there are pending submissions in this hand
-    pending_subs = await db.submissions.count_documents({
-        "game_id": game_id,
-        "hand_number": current_hand,
-        "status": "pending"
-    })
-    if pending_subs > 0:
-        return
+        # Do not advance while there are pending submissions in this hand
+        pending_subs = await db.submissions.count_documents({
+            "game_id": game_id,
+            "hand_number": current_hand,
+            "status": "pending"
+        })
+        if pending_subs > 0:
+            return
 
     # Advance to next hand
     next_hand = current_hand + 1
     now = datetime.now(timezone.utc)
 
     max_hands = int(game.get("max_hands", 3) or 3)
-    if next_hand > max_hands:
-        # Finish game
-        await db.games.update_one(
-            {"game_id": game_id},
-            {"$set": {"status": "finished", "finished_at": now}}
-        )
+    finishing = next_hand > max_hands
+    if finishing:
+        advance = {"$set": {"status": "finished", "finished_at": now}}
+    else:
+        advance = {"$set": {"current_hand": next_hand, "current_turn_index": 0, "hand_started_at": now, "turn_started_at": now}}
+
+    def still_on_hand(fresh: dict) -> Optional[dict]:
+        # Another completion check may have advanced the hand already
+        if fresh.get("status") != "started" or fresh.get("current_hand", 1) != current_hand:
+            return None
+        return advance
+
+    try:
+        _, version = await update_game_if(game_id, still_on_hand, game)
+    except HTTPException:
+        logger.warning("Hand %s of game %s not advanced: too many concurrent updates", current_hand, game_id)
+        return
+    if version is None:
+        return
 
+    if finishing:
         # Award coins: winner +20, losers +5
         players = await db.game_players.find({"game_id": game_id}, {"_id": 0}).to_list(100)
         if players:
             # determine top score
             top_score = max(p.get("score", 0) for p in players)
+
+            # denormalize the history summary onto each player row (/users/me/games)
+            group = await db.groups.find_one({"group_id": game.get("group_id")}, {"_id": 0, "name": 1})
+            for p in players:
+                score = p.get("score", 0)
+                await db.game_players.update_one(
+                    {"player_entry_id": p["player_entry_id"]},
+                    {"$set": {"summary": {
+                        "status": "finished",
+                        "group_id": game.get("group_id"),
+                        "group_name": group["name"] if group else None,
+                        "final_score": score,
+                        "rank": 1 + sum(1 for other in players if other.get("score", 0) > score),
+                        "player_count": len(players),
+                        "finished_at": now
+                    }}}
+                )
             # award coins and log transactions
             for p in players:
                 user_id = p.get("user_id")
@@ -1748,6 +2639,7 @@ async def check_hand_completion(game_id: str):
                 else:
                     amt = 5
                     reason = "game_participation"
+                await bump_player_stats(user_id, games_played=1, wins=1 if reason == "game_win" else 0)
 
                 # atomic increment
                 await db.users.update_one({"user_id": user_id}, {"$inc": {"coins": amt}})
@@ -1767,12 +2659,6 @@ async def check_hand_completion(game_id: str):
         await create_chat_message(game_id, creator, f"Oyun bitti. El {current_hand} tamamlandı.", "system")
         return
 
-    # Move to next hand and deal cards
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$set": {"current_hand": next_hand, "current_turn_index": 0, "hand_started_at": now, "turn_started_at": now}}
-    )
-
     # Deal cards for next hand
     await deal_cards_for_hand(game_id, next_hand)
 
@@ -1780,218 +2666,706 @@ async def check_hand_completion(game_id: str):
     creator = game.get("created_by") or "system"
     await create_chat_message(game_id, creator, f"El {next_hand} başladı.", "system")
 
-# ==================== VOTING ENDPOINTS ====================
+# ==================== QUICK PLAY ====================
+# The queue itself lives in matchmaking.py; this section creates the games it
+# forms (one bulk write per round) and serves the queue endpoints.
 
-VOTE_TIMEOUT_SECONDS = int(os.environ.get("VOTE_TIMEOUT_SECONDS", "60"))
-MIN_VOTES_REQUIRED = int(os.environ.get("MIN_VOTES_REQUIRED", "1"))
+QUICKPLAY_TICK_SECONDS = float(os.environ.get("QUICKPLAY_TICK_SECONDS", "1"))
+QUICKPLAY_POLL_MAX_SECONDS = 30
 
-async def resolve_submission(submission_id: str) -> Optional[dict]:
-    submission = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
-    if not submission:
-        return None
+class QuickPlayRequest(BaseModel):
+    difficulty_level: int = 2
 
-    if submission.get("status") != "pending":
-        return submission
+quickplay_queue = MatchmakingQueue(QUICKPLAY_GAME_SIZE, QUICKPLAY_MIN_PLAYERS, QUICKPLAY_MAX_WAIT_SECONDS)
+quickplay_wakeup = asyncio.Event()
+
+async def users_in_started_games(user_ids) -> set:
+    """Those of `user_ids` who are playing a started game"""
+    entries = await db.game_players.find({"user_id": {"$in": list(user_ids)}}, {"_id": 0, "game_id": 1, "user_id": 1}).to_list(None)
+    if not entries:
+        return set()
+    started = {
+        g["game_id"] async for g in db.games.find(
+            {"game_id": {"$in": list({e["game_id"] for e in entries})}, "status": "started"}, {"_id": 0, "game_id": 1}
+        )
+    }
+    return {e["user_id"] for e in entries if e["game_id"] in started}
+
+QUICKPLAY_COLLECTIONS = ("games", "game_players", "hand_cards")
+
+async def delete_quickplay_games(game_ids: List[str], user_ids: List[str]):
+    """Remove whatever a failed create_quickplay_games wrote for these games and players"""
+    for name in QUICKPLAY_COLLECTIONS:
+        await db[name].delete_many({"game_id": {"$in": game_ids}})
+    # by user first: (user_id, created_at) is indexed, data.game_id is not
+    await db.notifications.delete_many({"user_id": {"$in": user_ids}, "data.game_id": {"$in": game_ids}})
+
+async def create_quickplay_games(batches: List[List[QuickPlayTicket]], game_ids: Optional[List[str]] = None) -> List[dict]:
+    """Create a started game, players and dealt cards for each batch with bulk writes.
+
+    Quick play games belong to no group (group_id None): players are
+    strangers, and a group per match would only fill their group lists.
+    `game_ids` lets the caller undo a partial failure with delete_quickplay_games.
+    """
+    now = datetime.now(timezone.utc)
+    sampler = await get_card_sampler()
+    games, players, hand_cards, notifications = [], [], [], []
+    results = []
+
+    game_ids = game_ids or [f"game_{uuid.uuid4().hex[:12]}" for _ in batches]
+    for batch, game_id in zip(batches, game_ids):
+        level = batch[0].difficulty_level
+
+        user_ids = [t.user_id for t in batch]
+        dealt = {}
+        for user_id in user_ids:
+            players.append({
+                "player_entry_id": f"pe_{uuid.uuid4().hex[:12]}",
+                "game_id": game_id,
+                "user_id": user_id,
+                "pass_used": False,
+                "swap_used": False,
+                "score": 0,
+                "joined_at": now,
+                "version": 0
+            })
+            cards = sampler.draw_hand(user_id, 1, level)
+            dealt[user_id] = [card["card_id"] for card in cards]
+            for card in cards:
+                hand_cards.append({
+                    "hand_card_id": f"hc_{uuid.uuid4().hex[:12]}",
+                    "game_id": game_id,
+                    "hand_number": 1,
+                    "user_id": user_id,
+                    "card_id": card["card_id"],
+                    "status": "in_hand",
+                    "selected": False
+                })
+            notifications.append({
+                "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
+                "user_id": user_id,
+                "type": "game_started",
+                "title": "Oyun Başladı!",
+                "message": "Hızlı oyun eşleşmesi bulundu. Kartlarınız dağıtıldı!",
+                "data": {"game_id": game_id},
+                "read": False,
+                "created_at": now
+            })
 
-    player_count = await db.game_players.count_documents({"game_id": submission["game_id"]})
-    eligible_voters = max(0, int(player_count) - 1)
+        settings = {"group_id": None, "created_by": user_ids[0], "hand_time_limit_seconds": 60, "max_hands": 3, "difficulty_level": level}
 
+        games.append({
+            "game_id": game_id,
+            **settings,
+            "status": "started",
+            "current_round": 0,
+            "creator_id": user_ids[0],
+            "created_at": now,
+            "finished_at": None,
+            "players": user_ids,
+            "turn_order": user_ids,
+            "current_turn_index": 0,
+            "ready_players": [],
+            "current_hand": 1,
+            "turn_started_at": now,
+            "hand_started_at": now,
+            "version": 0,
+            "state_revision": 0,
+            "hand_counters": {"hand": 1, "outstanding": sum(len(ids) for ids in dealt.values()), "pending": 0},
+            "quick_play": True
+        })
+        results.append({"game_id": game_id})
+
+    if not games:
+        return results
+    await db.games.insert_many(games, ordered=False)
+    await db.game_players.insert_many(players, ordered=False)
+    await db.hand_cards.insert_many(hand_cards, ordered=False)
+    await db.notifications.insert_many(notifications, ordered=False)
+    return results
+
+async def run_matchmaking_round() -> int:
+    """Form and create every available match; returns the number of games created"""
+    loop = asyncio.get_running_loop()
+    batches = quickplay_queue.form_matches(loop.time())
+    if not batches:
+        return 0
+
+    # Players who started another game while queued leave the queue; the rest
+    # of their batch waits for the next round
+    busy = await users_in_started_games({t.user_id for batch in batches for t in batch})
+    if busy:
+        ready = []
+        for batch in batches:
+            if any(t.user_id in busy for t in batch):
+                for ticket in batch:
+                    if ticket.user_id in busy:
+                        quickplay_queue.drop(ticket)
+                quickplay_queue.requeue([t for t in batch if t.user_id not in busy])
+            else:
+                ready.append(batch)
+        batches = ready
+        if not batches:
+            return 0
+
+    game_ids = [f"game_{uuid.uuid4().hex[:12]}" for _ in batches]
+    try:
+        results = await create_quickplay_games(batches, game_ids)
+    except Exception:
+        logger.exception("Creating %s quick play games failed", len(batches))
+        try:
+            # a bulk insert may have landed part of the games: undo it, or
+            # the requeued players would end up in two games
+            await delete_quickplay_games(game_ids, [t.user_id for batch in batches for t in batch])
+        except Exception:
+            logger.exception("Undoing %s partial quick play games failed; dropping their tickets", len(batches))
+            for batch in batches:
+                for ticket in batch:
+                    quickplay_queue.drop(ticket)
+            return 0
+        for batch in batches:
+            quickplay_queue.requeue(batch)
+        return 0
+    now = loop.time()
+    for batch, result in zip(batches, results):
+        for ticket in batch:
+            quickplay_queue.resolve(ticket, result, now)
+    return len(results)
+
+async def matchmaking_loop():
+    while True:
+        try:
+            await asyncio.wait_for(quickplay_wakeup.wait(), timeout=QUICKPLAY_TICK_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        quickplay_wakeup.clear()
+        try:
+            await run_matchmaking_round()
+            quickplay_queue.prune(asyncio.get_running_loop().time())
+        except Exception:
+            logger.exception("Matchmaking round failed")
+
+@api_router.post("/quickplay/queue")
+async def join_quickplay(req: QuickPlayRequest, current_user: User = Depends(get_current_user)):
+    """Queue for a quick play game with strangers at a difficulty level"""
+    if req.difficulty_level < 1 or req.difficulty_level > 3:
+        raise HTTPException(status_code=400, detail="difficulty_level must be between 1 and 3")
+    if await users_in_started_games([current_user.user_id]):
+        raise HTTPException(status_code=409, detail="Already in a game")
+    now = asyncio.get_running_loop().time()
+    ticket = quickplay_queue.enqueue(current_user.user_id, req.difficulty_level, now)
+    if quickplay_queue.live.get(req.difficulty_level, 0) >= quickplay_queue.game_size:
+        quickplay_wakeup.set()
+    return ticket.view(now)
+
+@api_router.get("/quickplay/queue/{ticket_id}")
+async def poll_quickplay(ticket_id: str, timeout: float = 0, current_user: User = Depends(get_current_user)):
+    """Ticket status; with timeout > 0, waits (long-poll) until the ticket is matched"""
+    ticket = quickplay_queue.by_id.get(ticket_id)
+    if not ticket or ticket.user_id != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    if timeout > 0 and not ticket.done.is_set():
+        try:
+            await asyncio.wait_for(ticket.done.wait(), timeout=min(timeout, QUICKPLAY_POLL_MAX_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+    return ticket.view(asyncio.get_running_loop().time())
+
+@api_router.delete("/quickplay/queue")
+async def leave_quickplay(current_user: User = Depends(get_current_user)):
+    """Leave the quick play queue"""
+    ticket = quickplay_queue.cancel(current_user.user_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Not in the queue")
+    return {"ticket_id": ticket.ticket_id, "status": "cancelled"}
+
+@metrics_router.get("/quickplay")
+async def get_quickplay_metrics():
+    """Queue sizes per difficulty level and match totals"""
+    return quickplay_queue.stats()
+
+# ==================== VOTING ENDPOINTS ====================
+
+VOTE_TIMEOUT_SECONDS = int(os.environ.get("VOTE_TIMEOUT_SECONDS", "60"))
+MIN_VOTES_REQUIRED = int(os.environ.get("MIN_VOTES_REQUIRED", "1"))
+# Oy verebilecek oyuncu sayısı (oyuncu sayısı - 1), oyun dokümanının `players`
+# dizisinden; katılma/ayrılma onu versiyon artışıyla aynı yazımda değiştirir
+def game_eligible_voters(game: dict) -> int:
+    return max(0, len(game.get("players") or []) - 1)
+
+async def get_eligible_voters(game_id: str) -> int:
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0, "players": 1})
+    if game and "players" in game:
+        return game_eligible_voters(game)
+    # games from before the players array
+    return max(0, await db.game_players.count_documents({"game_id": game_id}) - 1)
+
+def decide_submission(submission: dict, eligible_voters: int, now: Optional[datetime] = None) -> Optional[str]:
+    """Return "approved"/"rejected" once a pending submission can be resolved, else None"""
     votes_approve = int(submission.get("votes_approve", 0))
     votes_reject = int(submission.get("votes_reject", 0))
     votes_total = votes_approve + votes_reject
-
-    has_proof = bool(submission.get("photo_base64"))
-
-    min_required = min(MIN_VOTES_REQUIRED, eligible_voters) if eligible_voters > 0 else 0
+    has_proof = bool(submission.get("has_proof", submission.get("photo_base64")))
 
     # Tek oy ile karar verilir: 1 onay = kabul, 1 ret = red
     # Video/fotoğraf kanıtı varsa tek onay yeterli
     if has_proof and votes_approve >= 1:
-        should_approve = True
-        should_reject = False
-    elif votes_approve >= 1 and votes_reject == 0:
-        should_approve = True
-        should_reject = False
-    elif votes_reject >= 1 and votes_approve == 0:
-        should_approve = False
-        should_reject = True
-    elif votes_total >= eligible_voters and eligible_voters > 0:
-        should_approve = votes_approve > votes_reject
-        should_reject = not should_approve
-    else:
-        should_approve = False
-        should_reject = False
+        return "approved"
+    if votes_approve >= 1 and votes_reject == 0:
+        return "approved"
+    if votes_reject >= 1 and votes_approve == 0:
+        return "rejected"
+    if votes_total >= eligible_voters and eligible_voters > 0:
+        return "approved" if votes_approve > votes_reject else "rejected"
 
     # Timeout kontrolü
-    if not should_approve and not should_reject:
-        created_at = submission.get("created_at")
-        if created_at and getattr(created_at, "tzinfo", None) is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        now = datetime.now(timezone.utc)
-        timed_out = False
-        if created_at:
-            timed_out = (now - created_at).total_seconds() >= VOTE_TIMEOUT_SECONDS
-
-        if timed_out:
-            if votes_total == 0:
-                # Kanıt varsa timeout'ta otomatik onayla, yoksa reddet
-                if has_proof:
-                    should_approve = True
-                else:
-                    should_reject = True
-            elif votes_approve >= votes_reject:
-                should_approve = True
-            else:
-                should_reject = True
+    created_at = submission.get("created_at")
+    if not created_at:
+        return None
+    if getattr(created_at, "tzinfo", None) is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    if (now - created_at).total_seconds() < VOTE_TIMEOUT_SECONDS:
+        return None
+    if votes_total == 0:
+        # Kanıt varsa timeout'ta otomatik onayla, yoksa reddet
+        return "approved" if has_proof else "rejected"
+    return "approved" if votes_approve >= votes_reject else "rejected"
 
-    if not should_approve and not should_reject:
+async def resolve_submission(submission_id: str) -> Optional[dict]:
+    submission = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "game_id": 1})
+    if not submission:
+        return None
+    return await game_actors.run(submission["game_id"], lambda: _resolve_submission(submission_id))
+
+async def _resolve_submission(submission_id: str) -> Optional[dict]:
+    submission = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "photo_base64": 0})
+    if not submission or submission.get("status") != "pending":
         return submission
 
-    if should_approve:
-        await db.submissions.update_one(
-            {"submission_id": submission_id, "status": "pending"},
-            {"$set": {"status": "approved"}}
-        )
+    status = decide_submission(submission, await get_eligible_voters(submission["game_id"]))
+    if not status:
+        return submission
+    resolved, _ = await apply_submission_resolution(submission, status)
+    return resolved
+
+async def apply_submission_resolution(submission: dict, status: str):
+    """Pay out or penalize a decided submission; returns (resolved submission, penalty card)"""
+    submission_id = submission["submission_id"]
+    game_id = submission["game_id"]
+    version = await bump_game_version(game_id, notify=False)
 
-        card = await db.cards.find_one({"card_id": submission["card_id"]}, {"_id": 0})
+    # Conditional on still being pending: only one resolver pays out or penalizes
+    result = await db.submissions.update_one(
+        {"submission_id": submission_id, "status": "pending"},
+        {"$set": {"status": status, "version": version}}
+    )
+    if not result.modified_count:
+        return await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "photo_base64": 0}), None
+    resolved = {**submission, "status": status, "version": version}
+    counters = await adjust_hand_counters(game_id, submission["hand_number"], pending=-1)
+
+    penalty_card = None
+    if status == "approved":
+        card = await db.cards.find_one({"card_id": submission["card_id"]}, {"_id": 0, "points": 1})
         points = card.get("points", 1) if card else 1
 
         await db.game_players.update_one(
-            {"game_id": submission["game_id"], "user_id": submission["user_id"]},
-            {"$inc": {"score": points}}
+            {"game_id": game_id, "user_id": submission["user_id"]},
+            {"$inc": {"score": points}, "$set": {"version": version}}
         )
+        publish_game_version(game_id, version)
 
         await db.users.update_one(
             {"user_id": submission["user_id"]},
             {"$inc": {"weekly_score": points, "total_score": points}}
         )
+        await bump_player_stats(submission["user_id"], submissions_approved=1)
 
         await create_chat_message(
-            submission["game_id"],
+            game_id,
             submission["user_id"],
             f"Görev onaylandı! +{points} puan",
             "system"
         )
+    else:
+        publish_game_version(game_id, version)
 
-        await check_hand_completion(submission["game_id"])
-        return await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+        penalty_card = await get_random_penalty_card(submission["user_id"])
+        penalty = {
+            "penalty_id": f"pen_{uuid.uuid4().hex[:12]}",
+            "game_id": game_id,
+            "user_id": submission["user_id"],
+            "card_id": penalty_card["card_id"],
+            "reason": "rejected",
+            "created_at": datetime.now(timezone.utc)
+        }
+        await db.penalties.insert_one(penalty)
+        await bump_player_stats(submission["user_id"], submissions_rejected=1, penalties_received=1)
 
-    await db.submissions.update_one(
-        {"submission_id": submission_id, "status": "pending"},
-        {"$set": {"status": "rejected"}}
-    )
+        await create_chat_message(
+            game_id,
+            submission["user_id"],
+            f"Görev reddedildi! Ceza kartı: {penalty_card['title']}",
+            "system"
+        )
 
-    penalty_card = await get_random_penalty_card()
-    penalty = {
-        "penalty_id": f"pen_{uuid.uuid4().hex[:12]}",
-        "game_id": submission["game_id"],
-        "user_id": submission["user_id"],
-        "card_id": penalty_card["card_id"],
-        "reason": "rejected",
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.penalties.insert_one(penalty)
+    await check_hand_completion(game_id, counters)
+    publish_vote_result(resolved)
+    await publish_game_state(game_id)
+    return resolved, penalty_card
 
-    await create_chat_message(
-        submission["game_id"],
-        submission["user_id"],
-        f"Görev reddedildi! Ceza kartı: {penalty_card['title']}",
-        "system"
-    )
+VOTE_SWEEP_INTERVAL_SECONDS = int(os.environ.get("VOTE_SWEEP_INTERVAL_SECONDS", "30"))
 
-    await check_hand_completion(submission["game_id"])
-    return await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+class VoteResolutionWorker:
+    """Resolves submissions whose vote deadline passed, off the request path.
 
-@api_router.get("/games/{game_id}/submissions")
-async def get_game_submissions(game_id: str, current_user: User = Depends(get_current_user)):
-    """Get pending submissions for voting"""
-    pending_ids = await db.submissions.find({
-        "game_id": game_id,
-        "status": "pending"
-    }, {"_id": 0, "submission_id": 1}).to_list(100)
+    New submissions and settled votes arrive as broker events: a "submission"
+    schedules a deadline in the heap, a "vote" that settled a submission drops
+    it. A periodic sweep picks up pending submissions this process did not see
+    being created (or whose events it dropped).
+    """
 
-    for s in pending_ids:
-        sid = s.get("submission_id")
-        if sid:
-            await resolve_submission(sid)
+    def __init__(self):
+        self.deadlines: List[tuple] = []       # (due timestamp, submission_id) min-heap
+        self.due_at: Dict[str, float] = {}    # live deadlines; stale heap rows are skipped
+        self.checked = 0
+        self.resolved = 0
+        self.sweeps = 0
+
+    def push(self, submission_id: str, due: float):
+        if self.due_at.get(submission_id) == due:
+            return
+        self.due_at[submission_id] = due
+        heapq.heappush(self.deadlines, (due, submission_id))
+
+    def schedule(self, submission_id: str, created_at: datetime):
+        if getattr(created_at, "tzinfo", None) is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        self.push(submission_id, created_at.timestamp() + VOTE_TIMEOUT_SECONDS)
+
+    def discard(self, submission_id: str):
+        self.due_at.pop(submission_id, None)
+
+    def handle(self, message: BrokerMessage):
+        data = message.data
+        if data.get("status") != "pending":
+            self.discard(data["submission_id"])
+        elif message.type == "submission" and data.get("created_at"):
+            self.schedule(data["submission_id"], data["created_at"])
+
+    def pop_due(self, now: float) -> List[str]:
+        due = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            at, submission_id = heapq.heappop(self.deadlines)
+            if self.due_at.get(submission_id) == at:
+                del self.due_at[submission_id]
+                due.append(submission_id)
+        return due
+
+    def next_delay(self, now: float) -> float:
+        while self.deadlines and self.due_at.get(self.deadlines[0][1]) != self.deadlines[0][0]:
+            heapq.heappop(self.deadlines)
+        if not self.deadlines:
+            return VOTE_SWEEP_INTERVAL_SECONDS
+        return min(max(0.0, self.deadlines[0][0] - now), VOTE_SWEEP_INTERVAL_SECONDS)
+
+    async def sweep(self):
+        async for s in db.submissions.find({"status": "pending"}, {"_id": 0, "submission_id": 1, "created_at": 1}):
+            if s.get("created_at"):
+                self.schedule(s["submission_id"], s["created_at"])
+        self.sweeps += 1
+
+    async def resolve_due(self, now: float) -> int:
+        resolved = 0
+        for submission_id in self.pop_due(now):
+            self.checked += 1
+            try:
+                submission = await resolve_submission(submission_id)
+            except Exception:
+                logger.exception("Resolving submission %s failed", submission_id)
+                self.push(submission_id, now + 1)
+                continue
+            if submission and submission.get("status") == "pending":
+                # Woken a little early (clock skew between processes); look again shortly
+                self.push(submission_id, now + 1)
+            elif submission:
+                resolved += 1
+        self.resolved += resolved
+        return resolved
+
+    async def run(self):
+        subscription = broker.subscribe("game:*", maxsize=BROKER_QUEUE_SIZE * 16, types=("submission", "vote"))
+        last_sweep = None
+        dropped = 0
+        try:
+            while True:
+                now = datetime.now(timezone.utc).timestamp()
+                if last_sweep is None or now - last_sweep >= VOTE_SWEEP_INTERVAL_SECONDS or subscription.dropped != dropped:
+                    dropped = subscription.dropped
+                    try:
+                        await self.sweep()
+                    except Exception:
+                        logger.exception("Pending submission sweep failed")
+                    last_sweep = now
+                await self.resolve_due(now)
+                message = await subscription.get(timeout=self.next_delay(datetime.now(timezone.utc).timestamp()))
+                while message is not None:
+                    self.handle(message)
+                    message = subscription.get_nowait()
+        finally:
+            subscription.close()
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self.due_at),
+            "heap_size": len(self.deadlines),
+            "checked": self.checked,
+            "resolved": self.resolved,
+            "sweeps": self.sweeps
+        }
 
-    submissions = await db.submissions.find({
-        "game_id": game_id,
-        "status": "pending"
-    }, {"_id": 0}).to_list(100)
-    
-    # Enrich with user and card info
-    for sub in submissions:
-        user = await db.users.find_one({"user_id": sub["user_id"]}, {"_id": 0})
-        card = await db.cards.find_one({"card_id": sub["card_id"]}, {"_id": 0})
-        sub["user"] = {"name": user["name"], "picture": user.get("picture")} if user else None
-        sub["card"] = card
-        
-        # Check if current user already voted
-        vote = await db.votes.find_one({
-            "submission_id": sub["submission_id"],
+vote_worker = VoteResolutionWorker()
+
+PROOF_CACHE_CONTROL = "private, max-age=31536000, immutable"
+FEED_CARD_FIELDS = ("card_id", "title", "description", "deck_type", "points")
+
+def feed_user(user: Optional[dict]) -> Optional[dict]:
+    """Name and avatar for feeds; inline (data:) avatars are left to the profile endpoints"""
+    if not user:
+        return None
+    return {"name": user["name"], "picture": avatar_url(user.get("picture"))}
+
+# has_proof for rows that predate the stored flag (inline photo_base64)
+HAS_PROOF_EXPR = {"$or": [{"$eq": ["$has_proof", True]}, {"$gt": ["$photo_base64", ""]}]}
+
+# Proof blob hashes never reach clients: /api/blobs/<sha> is unauthenticated,
+# proofs are only served through the authenticated proof endpoint
+PROOF_PAYLOAD_EXCLUDED = {"_id": 0, "photo_base64": 0, "proof_sha": 0, "proof_variants": 0}
+
+def strip_inline_proof(submission: dict) -> dict:
+    """Client copy of a submission: has_proof instead of the photo or its blob hashes"""
+    submission["has_proof"] = bool(submission.pop("photo_base64", None) or submission.get("has_proof"))
+    submission.pop("proof_sha", None)
+    submission.pop("proof_variants", None)
+    return submission
+
+def proof_url(submission: dict, game_id: Optional[str] = None, variant: Optional[str] = None) -> Optional[str]:
+    if not submission.get("has_proof", submission.get("photo_base64")):
+        return None
+    params = {}
+    if game_id:
+        # Archived submissions are only found through their game's archive
+        params["game_id"] = game_id
+    if variant:
+        params["variant"] = variant
+    url = f"/api/submissions/{submission['submission_id']}/proof"
+    return f"{url}?{urlencode(params)}" if params else url
+
+def submission_summary(sub: dict, users: dict, cards: dict, my_votes: Optional[dict] = None, archived_game: Optional[str] = None) -> dict:
+    """Compact feed row: tallies and references, never the proof itself"""
+    card = cards.get(sub["card_id"])
+    summary = {
+        "submission_id": sub["submission_id"],
+        "game_id": sub["game_id"],
+        "hand_number": sub.get("hand_number"),
+        "user_id": sub["user_id"],
+        "user": feed_user(users.get(sub["user_id"])),
+        "card_id": sub["card_id"],
+        "card": {k: card.get(k) for k in FEED_CARD_FIELDS} if card else None,
+        "note": sub.get("note"),
+        "status": sub.get("status"),
+        "created_at": sub.get("created_at"),
+        "votes_approve": sub.get("votes_approve", 0),
+        "votes_reject": sub.get("votes_reject", 0),
+        "has_proof": bool(sub.get("has_proof", sub.get("photo_base64"))),
+        "proof_url": proof_url(sub, archived_game),
+        "proof_thumbnail_url": proof_url(sub, archived_game, "chat"),
+        "near_duplicates": sub.get("near_duplicates") or []
+    }
+    if my_votes is not None:
+        summary["my_vote"] = my_votes.get(sub["submission_id"])
+    return summary
+
+async def load_feed_refs(user_ids, card_ids):
+    """users and cards by id for a page of feed rows, one query each"""
+    users, cards = {}, {}
+    if user_ids:
+        async for u in db.users.find({"user_id": {"$in": list(user_ids)}}, {"_id": 0, "user_id": 1, "name": 1, "picture": 1}):
+            users[u["user_id"]] = u
+    if card_ids:
+        projection = {"_id": 0, **{k: 1 for k in FEED_CARD_FIELDS}}
+        async for card in db.cards.find({"card_id": {"$in": list(card_ids)}}, projection):
+            cards[card["card_id"]] = card
+    return users, cards
+
+@api_router.get("/games/{game_id}/submissions")
+async def get_game_submissions(game_id: str, current_user: User = Depends(get_current_user)):
+    """Get pending submissions for voting (proofs via proof_url)"""
+    submissions = await db.submissions.aggregate([
+        {"$match": {"game_id": game_id, "status": "pending"}},
+        {"$limit": 100},
+        {"$addFields": {"has_proof": HAS_PROOF_EXPR}},
+        {"$project": PROOF_PAYLOAD_EXCLUDED}
+    ]).to_list(100)
+    archive = None
+    if not submissions:
+        archive = await load_archived_game(game_id)
+        submissions = [strip_inline_proof(s) for s in archived_rows(archive, "submissions") if s.get("status") == "pending"][:100]
+    if not submissions:
+        return submissions
+
+    users, cards = await load_feed_refs({s["user_id"] for s in submissions}, {s["card_id"] for s in submissions})
+    # Check if current user already voted
+    my_votes = {}
+    if archive:
+        for vote in archived_rows(archive, "votes"):
+            if vote["voter_id"] == current_user.user_id:
+                my_votes[vote["submission_id"]] = vote["vote_type"]
+    else:
+        async for vote in db.votes.find({
+            "submission_id": {"$in": [s["submission_id"] for s in submissions]},
             "voter_id": current_user.user_id
-        })
-        sub["my_vote"] = vote["vote_type"] if vote else None
-    
-    return submissions
+        }, {"_id": 0, "submission_id": 1, "vote_type": 1}):
+            my_votes[vote["submission_id"]] = vote["vote_type"]
+
+    return [submission_summary(s, users, cards, my_votes, archived_game=game_id if archive else None) for s in submissions]
+
+@api_router.get("/submissions/{submission_id}/proof")
+async def get_submission_proof(
+    request: Request, submission_id: str, game_id: Optional[str] = None, variant: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Proof photo of a submission (variant=chat for the thumbnail); immutable,
+    so the client may cache it, shared caches may not"""
+    headers = {"ETag": f'"{submission_id}-{variant}"' if variant else f'"{submission_id}"', "Cache-Control": PROOF_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    submission = await db.submissions.find_one(
+        {"submission_id": submission_id}, {"_id": 0, "proof_sha": 1, "proof_variants": 1, "photo_base64": 1}
+    )
+    if submission is None and game_id:
+        archive = await load_archived_game(game_id)
+        submission = next((s for s in archived_rows(archive, "submissions") if s["submission_id"] == submission_id), None)
+    if submission and submission.get("proof_sha"):
+        # proofs stored before the variants existed have only the full view
+        sha = (submission.get("proof_variants") or {}).get(variant) or submission["proof_sha"]
+        return await blob_response(request, sha, headers)
+    if not submission or not submission.get("photo_base64"):
+        raise HTTPException(status_code=404, detail="Proof not found")
+    try:
+        media_type, content = decode_data_uri(submission["photo_base64"])
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Stored proof is not valid base64")
+    headers["X-Content-Type-Options"] = "nosniff"
+    return Response(content=content, media_type=served_media_type(media_type), headers=headers)
+
+@metrics_router.get("/vote-resolution")
+async def get_vote_resolution_metrics():
+    """Deadline queue size and resolutions done by the background worker"""
+    return vote_worker.stats()
 
 @api_router.post("/submissions/{submission_id}/vote")
 async def vote_on_submission(request: Request, submission_id: str, req: VoteRequest, current_user: User = Depends(get_current_user)):
     """Vote on a submission"""
-    submission = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+    submission = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "game_id": 1})
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
-    
-    if submission["user_id"] == current_user.user_id:
-        raise HTTPException(status_code=400, detail="Cannot vote on your own submission")
-    
-    if submission["status"] != "pending":
+    game_id = submission["game_id"]
+    return await game_actors.run(
+        game_id,
+        lambda: _vote_on_submission(request, game_id, submission_id, req, current_user)
+    )
+
+async def _vote_on_submission(request: Request, game_id: str, submission_id: str, req: VoteRequest, current_user: User):
+    # Count the vote first, conditional on everything that could refuse it:
+    # still pending, not the voter's own, not voted on yet (voter_ids). A
+    # refused vote costs this one write and a lookup to name the reason.
+    tally_field = "votes_approve" if req.vote_type == "approve" else "votes_reject"
+    submission = await db.submissions.find_one_and_update(
+        {
+            "submission_id": submission_id,
+            "game_id": game_id,
+            "status": "pending",
+            "user_id": {"$ne": current_user.user_id},
+            "voter_ids": {"$ne": current_user.user_id}
+        },
+        {"$inc": {tally_field: 1}, "$push": {"voter_ids": current_user.user_id}},
+        projection={"photo_base64": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not submission:
+        current = await db.submissions.find_one(
+            {"submission_id": submission_id, "game_id": game_id},
+            {"_id": 0, "user_id": 1, "voter_ids": 1}
+        )
+        if not current:
+            raise HTTPException(status_code=404, detail="Submission not found")
+        if current["user_id"] == current_user.user_id:
+            raise HTTPException(status_code=400, detail="Cannot vote on your own submission")
+        if current_user.user_id in current.get("voter_ids", []):
+            raise HTTPException(status_code=400, detail="Already voted")
         raise HTTPException(status_code=400, detail="Submission already processed")
-    
-    # Check if already voted
-    existing_vote = await db.votes.find_one({
-        "submission_id": submission_id,
-        "voter_id": current_user.user_id
-    })
-    if existing_vote:
-        raise HTTPException(status_code=400, detail="Already voted")
-    
-    # Create vote
+    submission.pop("_id", None)
+
+    # Only a counted vote takes a version; the bump also reads who may vote
+    game = await bump_game(game_id, notify=False, fields=("players",))
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    version = submission["version"] = game["version"]
     vote = {
         "vote_id": f"vote_{uuid.uuid4().hex[:12]}",
         "submission_id": submission_id,
+        "game_id": game_id,
         "voter_id": current_user.user_id,
         "vote_type": req.vote_type,
-        "created_at": datetime.now(timezone.utc)
+        "created_at": datetime.now(timezone.utc),
+        "version": version
     }
-    await db.votes.insert_one(vote)
-    
-    # Update vote counts
-    if req.vote_type == "approve":
-        await db.submissions.update_one(
-            {"submission_id": submission_id},
-            {"$inc": {"votes_approve": 1}}
-        )
-    else:
+    stamped, inserted = await asyncio.gather(
+        db.submissions.update_one({"submission_id": submission_id}, {"$max": {"version": version}}),
+        db.votes.insert_one(vote),
+        return_exceptions=True
+    )
+    if isinstance(inserted, DuplicateKeyError):
+        # A vote from before voter_ids existed: the unique index still catches it
         await db.submissions.update_one(
             {"submission_id": submission_id},
-            {"$inc": {"votes_reject": 1}}
+            {"$inc": {tally_field: -1}, "$pull": {"voter_ids": current_user.user_id}}
         )
-
-    updated = await resolve_submission(submission_id)
-    if updated and updated.get("status") == "approved":
+        raise HTTPException(status_code=400, detail="Already voted")
+    for result in (stamped, inserted):
+        if isinstance(result, BaseException):
+            raise result
+    publish_game_version(game_id, version)
+
+    eligible = game_eligible_voters(game) if "players" in game else await get_eligible_voters(game_id)
+    status = decide_submission(submission, eligible)
+    if not status:
+        publish_vote_result(submission)
+        return {"message": t("vote_recorded", request), "result": "pending"}
+
+    resolved, penalty_card = await apply_submission_resolution(submission, status)
+    if resolved and resolved.get("status") == "approved":
         return {"message": t("approved", request), "result": "approved"}
-    if updated and updated.get("status") == "rejected":
-        penalty_card = await get_random_penalty_card()
+    if resolved and resolved.get("status") == "rejected":
         return {"message": t("rejected", request), "result": "rejected", "penalty_card": penalty_card}
 
     return {"message": t("vote_recorded", request), "result": "pending"}
 
 # ==================== CHAT ENDPOINTS ====================
+# Messages are stored in buckets per game (chat_buckets.py).
+
+async def publish_chat_message(message: dict):
+    """Push a chat message to the game's open sockets, with its author resolved"""
+    if broker.has_subscribers(game_topic(message["game_id"]), "chat"):
+        user = await db.users.find_one({"user_id": message["user_id"]}, {"_id": 0, "name": 1, "picture": 1})
+        broker.publish(game_topic(message["game_id"]), "chat", {**message, "user": feed_user(user)})
 
 async def create_chat_message(game_id: str, user_id: str, content: str, message_type: str = "text", submission_id: str = None):
     """Create a chat message"""
+    version = await bump_game_version(game_id, notify=False)
     message = {
         "message_id": f"msg_{uuid.uuid4().hex[:12]}",
         "game_id": game_id,
@@ -1999,40 +3373,68 @@ async def create_chat_message(game_id: str, user_id: str, content: str, message_
         "content": content,
         "message_type": message_type,
         "submission_id": submission_id,
-        "created_at": datetime.now(timezone.utc)
+        "created_at": datetime.now(timezone.utc),
+        "version": version
     }
-    await db.chat_messages.insert_one(message)
-    
-    # Remove _id field before returning
-    message.pop("_id", None)
-    
+    await append_chat_message(message)
+    publish_game_version(game_id, version)
+    await publish_chat_message(message)
     return message
 
+CHAT_PAGE_SIZE = int(os.environ.get("CHAT_PAGE_SIZE", "100"))
+
 @api_router.get("/games/{game_id}/chat")
-async def get_chat_messages(game_id: str, current_user: User = Depends(get_current_user)):
-    """Get chat messages for a game"""
-    messages = await db.chat_messages.find(
-        {"game_id": game_id},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(100).to_list(100)
-    
-    # Reverse to get chronological order
-    messages.reverse()
-    
+async def get_chat_messages(
+    game_id: str,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = CHAT_PAGE_SIZE,
+    current_user: User = Depends(get_current_user)
+):
+    """Get chat messages for a game, oldest first.
+
+    Without a cursor: the latest page. ?after=<message_id> returns only newer
+    messages (polling), ?before=<message_id> the page before it (scrollback).
+    """
+    if after and before:
+        raise HTTPException(status_code=400, detail="Use either after or before")
+    limit = max(1, min(limit, CHAT_PAGE_SIZE))
+
+    rows = await load_chat(game_id, limit, after or before, newer=bool(after))
+    archive = None
+    if not rows:
+        # Finished games move to the archive; page through its copy
+        archive = await load_archived_game(game_id)
+        rows = archived_rows(archive, "chat_messages")
+    messages = page_chat_rows(rows, after, before, limit)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    archived_submissions = {s["submission_id"]: s for s in archived_rows(archive, "submissions")}
+
+    # Submission summaries for the messages that reference one
+    submission_ids = [m["submission_id"] for m in messages if m.get("submission_id")]
+    submissions = {sid: archived_submissions[sid] for sid in submission_ids if sid in archived_submissions}
+    missing = [sid for sid in submission_ids if sid not in submissions]
+    if missing:
+        rows = db.submissions.aggregate([
+            {"$match": {"submission_id": {"$in": missing}}},
+            {"$addFields": {"has_proof": HAS_PROOF_EXPR}},
+            {"$project": PROOF_PAYLOAD_EXCLUDED}
+        ])
+        async for s in rows:
+            submissions[s["submission_id"]] = s
+
     # Enrich with user info
+    users, cards = await load_feed_refs(
+        {m["user_id"] for m in messages} | {s["user_id"] for s in submissions.values()},
+        {s["card_id"] for s in submissions.values()}
+    )
+    archived_game = game_id if archive else None
     for msg in messages:
-        user = await db.users.find_one({"user_id": msg["user_id"]}, {"_id": 0})
-        msg["user"] = {"name": user["name"], "picture": user.get("picture")} if user else None
-        
-        # Add submission info if present
-        if msg.get("submission_id"):
-            submission = await db.submissions.find_one({"submission_id": msg["submission_id"]}, {"_id": 0})
-            if submission:
-                card = await db.cards.find_one({"card_id": submission["card_id"]}, {"_id": 0})
-                msg["submission"] = {
-                    **submission,
-                    "card": card
-                }
+        msg["user"] = feed_user(users.get(msg["user_id"]))
+        submission = submissions.get(msg.get("submission_id"))
+        if submission:
+            msg["submission"] = submission_summary(submission, users, cards, archived_game=archived_game)
     
     return messages
 
@@ -2068,6 +3470,8 @@ async def create_notification(user_id: str, type: str, title: str, message: str,
     
     # Remove _id field before returning
     notification.pop("_id", None)
+    local_writes.add("notification", notification["notification_id"])
+    broker.publish(user_topic(user_id), "notification", notification)
     
     return notification
 
@@ -2104,6 +3508,8 @@ async def mark_all_notifications_read(request: Request, current_user: User = Dep
 async def get_game_penalties(game_id: str, current_user: User = Depends(get_current_user)):
     """Get penalties for a game"""
     penalties = await db.penalties.find({"game_id": game_id}, {"_id": 0}).to_list(100)
+    if not penalties:
+        penalties = archived_rows(await load_archived_game(game_id), "penalties")[:100]
     
     for p in penalties:
         user = await db.users.find_one({"user_id": p["user_id"]}, {"_id": 0})
@@ -2113,6 +3519,649 @@ async def get_game_penalties(game_id: str, current_user: User = Depends(get_curr
     
     return penalties
 
+# ==================== GAME ARCHIVE ====================
+# Finished games are compacted into one zlib-compressed document per game
+# (or a file under ARCHIVE_DIR) and their rows removed from the hot collections.
+
+ARCHIVED_COLLECTIONS = ["hand_cards", "submissions", "votes", "penalties"]
+ARCHIVE_AFTER_SECONDS = int(os.environ.get("ARCHIVE_AFTER_SECONDS", "3600"))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "600"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "20"))
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR")  # unset = store in the game_archives collection
+ARCHIVE_CACHE_SIZE = 32
+ARCHIVE_MAX_BACKOFF_SECONDS = int(os.environ.get("ARCHIVE_MAX_BACKOFF_SECONDS", "86400"))
+
+# recently loaded archives (game_id -> rows by collection), oldest first
+_archive_cache: "OrderedDict[str, dict]" = OrderedDict()
+ARCHIVE_STATE_CACHE_SIZE = 4096
+# game_id -> time (epoch seconds) before which the game cannot be archived, oldest first
+_unarchived_until: "OrderedDict[str, float]" = OrderedDict()
+
+async def archive_game(game_id: str) -> Optional[dict]:
+    """Compact a finished game's rows into its archive and delete them; returns the archive stats"""
+    return await game_actors.run(game_id, lambda: _archive_game(game_id))
+
+async def _archive_game(game_id: str) -> Optional[dict]:
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0, "status": 1, "archived": 1, "group_id": 1, "finished_at": 1})
+    if not game or game.get("status") != "finished" or game.get("archived"):
+        return None
+
+    rows = {}
+    for name in ARCHIVED_COLLECTIONS:
+        rows[name] = await db[name].find({"game_id": game_id}, {"_id": 0}).to_list(None)
+    # Chat is archived as flat rows, whatever the live layout
+    rows["chat_messages"] = sorted(await load_chat(game_id), key=chat_key)
+    raw = json_util.dumps(rows).encode("utf-8")
+    compressed = zlib.compress(raw, 9)
+
+    archive = {
+        "game_id": game_id,
+        "group_id": game.get("group_id"),
+        "finished_at": game.get("finished_at"),
+        "archived_at": datetime.now(timezone.utc),
+        "row_counts": {name: len(items) for name, items in rows.items()},
+        "raw_bytes": len(raw),
+        "compressed_bytes": len(compressed)
+    }
+    if ARCHIVE_DIR:
+        path = Path(ARCHIVE_DIR) / f"{game_id}.json.z"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(path.write_bytes, compressed)
+        archive.update({"storage": "file", "path": str(path)})
+    else:
+        archive.update({"storage": "db", "data": Binary(compressed)})
+
+    # Archive first, then delete: a crash in between only leaves rows to re-archive
+    await db.game_archives.replace_one({"game_id": game_id}, archive, upsert=True)
+    await db.games.update_one(
+        {"game_id": game_id},
+        {"$set": {"archived": True, "archived_at": archive["archived_at"]}, "$unset": {"archive_error": "", "archive_retry_at": ""}}
+    )
+    for name in ARCHIVED_COLLECTIONS + ["chat_buckets"]:
+        await db[name].delete_many({"game_id": game_id})
+    _archive_cache.pop(game_id, None)
+    _unarchived_until.pop(game_id, None)
+    chat_bucket_heads.pop(game_id, None)
+
+    archive.pop("data", None)
+    archive.pop("_id", None)
+    return archive
+
+async def load_game_archive(game_id: str) -> Optional[dict]:
+    """Rows of an archived game by collection name, or None if it is not archived"""
+    if game_id in _archive_cache:
+        _archive_cache.move_to_end(game_id)
+        return _archive_cache[game_id]
+
+    archive = await db.game_archives.find_one({"game_id": game_id}, {"_id": 0})
+    if not archive:
+        return None
+    if archive.get("storage") == "file":
+        compressed = await asyncio.to_thread(Path(archive["path"]).read_bytes)
+    else:
+        compressed = archive["data"]
+    rows = json_util.loads(zlib.decompress(compressed).decode("utf-8"))
+
+    _archive_cache[game_id] = rows
+    if len(_archive_cache) > ARCHIVE_CACHE_SIZE:
+        _archive_cache.popitem(last=False)
+    return rows
+
+async def load_archived_game(game_id: str) -> Optional[dict]:
+    """load_game_archive, but only for a game whose document is marked archived.
+
+    Reads that come back empty fall back here. A game is archived no sooner
+    than ARCHIVE_AFTER_SECONDS after it finished, so a "not archived" answer
+    is remembered until then instead of re-read on every empty poll.
+    """
+    if game_id in _archive_cache:
+        return await load_game_archive(game_id)
+    now = datetime.now(timezone.utc)
+    if _unarchived_until.get(game_id, 0) > now.timestamp():
+        return None
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0, "archived": 1, "finished_at": 1})
+    if not game:
+        return None
+    if game.get("archived"):
+        _unarchived_until.pop(game_id, None)
+        return await load_game_archive(game_id)
+
+    finished_at = game.get("finished_at") or now
+    if finished_at.tzinfo is None:
+        finished_at = finished_at.replace(tzinfo=timezone.utc)
+    _unarchived_until[game_id] = finished_at.timestamp() + ARCHIVE_AFTER_SECONDS
+    _unarchived_until.move_to_end(game_id)
+    if len(_unarchived_until) > ARCHIVE_STATE_CACHE_SIZE:
+        _unarchived_until.popitem(last=False)
+    return None
+
+def archived_rows(archive: Optional[dict], collection: str, since: int = 0) -> List[dict]:
+    """Copies of an archive's rows, optionally only those changed after version `since`"""
+    rows = (archive or {}).get(collection, [])
+    return [dict(r) for r in rows if not since or int(r.get("version", 0) or 0) > since]
+
+async def archive_finished_games() -> int:
+    """Archive finished games older than ARCHIVE_AFTER_SECONDS; returns how many were archived"""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=ARCHIVE_AFTER_SECONDS)
+    games = await db.games.find(
+        {
+            "status": "finished", "archived": {"$ne": True}, "finished_at": {"$lte": cutoff},
+            # games that failed before wait out their backoff
+            "$or": [{"archive_retry_at": {"$exists": False}}, {"archive_retry_at": {"$lte": now}}]
+        },
+        {"_id": 0, "game_id": 1, "archive_attempts": 1}
+    ).sort("finished_at", 1).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+
+    archived = 0
+    for g in games:
+        try:
+            if await archive_game(g["game_id"]):
+                archived += 1
+        except Exception as e:
+            # e.g. an archive over the 16 MB document limit: one game must not stall the rest
+            attempts = int(g.get("archive_attempts", 0) or 0) + 1
+            backoff = min(ARCHIVE_INTERVAL_SECONDS * 2 ** attempts, ARCHIVE_MAX_BACKOFF_SECONDS)
+            logger.exception("Archiving game %s failed (attempt %s)", g["game_id"], attempts)
+            await db.games.update_one({"game_id": g["game_id"]}, {"$set": {
+                "archive_attempts": attempts,
+                "archive_error": repr(e)[:500],
+                "archive_retry_at": now + timedelta(seconds=backoff)
+            }})
+    return archived
+
+async def archive_finished_games_loop():
+    while True:
+        try:
+            archived = await archive_finished_games()
+            if archived:
+                logger.info("Archived %s finished games", archived)
+        except Exception:
+            logger.exception("Archiving finished games failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+@metrics_router.get("/archive")
+async def get_archive_metrics():
+    """Archive compression totals and the size of the hot collections"""
+    totals = await db.game_archives.aggregate([
+        {"$group": {
+            "_id": None,
+            "games": {"$sum": 1},
+            "raw_bytes": {"$sum": "$raw_bytes"},
+            "compressed_bytes": {"$sum": "$compressed_bytes"}
+        }}
+    ]).to_list(1)
+    totals = totals[0] if totals else {"games": 0, "raw_bytes": 0, "compressed_bytes": 0}
+    totals.pop("_id", None)
+    totals["compression_ratio"] = round(totals["raw_bytes"] / totals["compressed_bytes"], 2) if totals["compressed_bytes"] else None
+
+    hot = {}
+    for name in ARCHIVED_COLLECTIONS:
+        hot[name] = {"documents": await db[name].estimated_document_count()}
+        try:
+            stats = await db.command("collStats", name)
+            hot[name].update({"size_bytes": stats.get("size"), "index_bytes": stats.get("totalIndexSize")})
+        except Exception:
+            pass  # collStats is not available on every deployment
+
+    failed = await db.games.count_documents({"archived": {"$ne": True}, "archive_error": {"$exists": True}})
+    return {"archives": totals, "hot_collections": hot, "failed_games": failed}
+
+# ==================== PLAYER STATS ====================
+# One player_stats document per user, kept current with $inc by the game
+# actions. Rebuilding reads a user's whole history, so it is not exposed to
+# players: operators run rebuild_player_stats.py after a counter bug.
+
+PLAYER_STAT_FIELDS = [
+    "games_played", "wins", "cards_played", "submissions_approved", "submissions_rejected",
+    "penalties_received", "refusals", "passes_used", "swaps_used"
+]
+
+async def bump_player_stats(user_id: str, **counts: int):
+    """Increment counters on the user's player_stats document"""
+    await db.player_stats.update_one(
+        {"user_id": user_id},
+        {"$inc": counts, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+def player_stats_view(stats: Optional[dict], user_id: str) -> dict:
+    stats = stats or {}
+    view = {"user_id": user_id, **{field: int(stats.get(field, 0)) for field in PLAYER_STAT_FIELDS}}
+    resolved = view["submissions_approved"] + view["submissions_rejected"]
+    view["approval_rate"] = round(view["submissions_approved"] / resolved, 3) if resolved else None
+    view["updated_at"] = stats.get("updated_at")
+    return view
+
+async def rebuild_player_stats(user_id: str) -> dict:
+    """Recompute a user's stats from game_players, submissions and penalties (archives included)"""
+    counts = {field: 0 for field in PLAYER_STAT_FIELDS}
+    async for entry in db.game_players.find({"user_id": user_id}, {"_id": 0}):
+        game_id = entry["game_id"]
+        game = await db.games.find_one({"game_id": game_id}, {"_id": 0, "status": 1, "archived": 1})
+        if not game:
+            continue
+
+        counts["passes_used"] += 1 if entry.get("pass_used") else 0
+        counts["swaps_used"] += 1 if entry.get("swap_used") else 0
+
+        if game.get("status") == "finished":
+            counts["games_played"] += 1
+            rank = (entry.get("summary") or {}).get("rank")
+            if rank is not None:
+                won = rank == 1
+            else:
+                # finished before summaries were stored
+                top = await db.game_players.find({"game_id": game_id}, {"_id": 0, "score": 1}).sort("score", -1).limit(1).to_list(1)
+                won = bool(top) and entry.get("score", 0) >= top[0].get("score", 0)
+            counts["wins"] += 1 if won else 0
+
+        if game.get("archived"):
+            archive = await load_game_archive(game_id)
+            submissions = [s for s in archived_rows(archive, "submissions") if s["user_id"] == user_id]
+            penalties = [p for p in archived_rows(archive, "penalties") if p["user_id"] == user_id]
+        else:
+            submissions = await db.submissions.find({"game_id": game_id, "user_id": user_id}, {"_id": 0, "status": 1}).to_list(None)
+            penalties = await db.penalties.find({"game_id": game_id, "user_id": user_id}, {"_id": 0, "reason": 1}).to_list(None)
+
+        counts["cards_played"] += len(submissions)
+        counts["submissions_approved"] += sum(1 for s in submissions if s.get("status") == "approved")
+        counts["submissions_rejected"] += sum(1 for s in submissions if s.get("status") == "rejected")
+        counts["penalties_received"] += len(penalties)
+        counts["refusals"] += sum(1 for p in penalties if p.get("reason") == "refuse")
+
+    stats = {"user_id": user_id, **counts, "updated_at": datetime.now(timezone.utc)}
+    await db.player_stats.replace_one({"user_id": user_id}, stats, upsert=True)
+    return stats
+
+async def rebuild_all_player_stats() -> int:
+    """Rebuild stats for every user who has joined a game; returns the number of users"""
+    user_ids = await db.game_players.distinct("user_id")
+    for user_id in user_ids:
+        await rebuild_player_stats(user_id)
+    return len(user_ids)
+
+@api_router.get("/users/me/stats")
+async def get_my_stats(current_user: User = Depends(get_current_user)):
+    """Current user's game statistics"""
+    stats = await db.player_stats.find_one({"user_id": current_user.user_id}, {"_id": 0})
+    return player_stats_view(stats, current_user.user_id)
+
+@api_router.get("/users/{user_id}/stats")
+async def get_user_stats(user_id: str, current_user: User = Depends(get_current_user)):
+    """Another player's game statistics"""
+    stats = await db.player_stats.find_one({"user_id": user_id}, {"_id": 0})
+    return player_stats_view(stats, user_id)
+
+# ==================== BLOB STORE ====================
+# Images are stored by hash in blobs.py; this section holds the user-facing
+# pieces: avatar lookups, inline uploads and the public blob route.
+
+def avatar_url(picture: Optional[str]) -> Optional[str]:
+    """URL avatars only: an inline (data:) one would be re-sent with every list"""
+    if picture and picture.startswith("data:"):
+        return None
+    return picture
+
+async def load_users(user_ids, *fields) -> Dict[str, dict]:
+    """users by id with only the given fields, one query"""
+    users = {}
+    if user_ids:
+        projection = {"_id": 0, "user_id": 1, **{f: 1 for f in fields}}
+        async for u in db.users.find({"user_id": {"$in": list(user_ids)}}, projection):
+            users[u["user_id"]] = u
+    return users
+
+def decode_upload(data: str) -> bytes:
+    """Bytes of a base64 / data: URI upload; raises 400 if it does not decode"""
+    try:
+        media_type, content = decode_data_uri(data)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Image is not valid base64")
+    if media_type not in IMAGE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    if not content:
+        raise HTTPException(status_code=400, detail="No image provided")
+    return content
+
+async def migrate_inline_images() -> dict:
+    """Move inline base64 proofs and avatars into the blob store (safe to re-run).
+
+    Archived games keep their proofs inside the archive; the proof endpoint
+    still reads those.
+    """
+    moved = {"submissions": 0, "users": 0, "invalid": 0, "private_proofs": 0}
+    cursor = db.submissions.find(
+        {"photo_base64": {"$type": "string", "$ne": ""}},
+        {"_id": 0, "submission_id": 1, "photo_base64": 1}
+    )
+    async for s in cursor:
+        try:
+            variants = await ingest_data_uri(s["photo_base64"], "proof")
+        except HTTPException:
+            moved["invalid"] += 1
+            continue
+        await db.submissions.update_one(
+            {"submission_id": s["submission_id"]},
+            {"$set": {"proof_sha": variants["vote"], "proof_variants": variants, "has_proof": True}, "$unset": {"photo_base64": ""}}
+        )
+        moved["submissions"] += 1
+
+    # proof blobs stored before they were marked private
+    async for s in db.submissions.find({"proof_variants": {"$type": "object"}}, {"_id": 0, "proof_variants": 1}):
+        result = await db.blobs.update_many(
+            {"sha256": {"$in": list(s["proof_variants"].values())}, "private": {"$ne": True}},
+            {"$set": {"private": True}}
+        )
+        moved["private_proofs"] += result.modified_count
+
+    async for u in db.users.find({"picture": {"$regex": "^data:"}}, {"_id": 0, "user_id": 1, "picture": 1}):
+        try:
+            variants = await ingest_data_uri(u["picture"], "avatar")
+        except HTTPException:
+            moved["invalid"] += 1
+            continue
+        await db.users.update_one({"user_id": u["user_id"]}, {"$set": {"picture": blob_url(variants["avatar"])}})
+        moved["users"] += 1
+    return moved
+
+@api_router.get("/blobs/{sha}")
+async def get_blob(request: Request, sha: str):
+    """Raw bytes of a stored image (avatars); the hash in the URL is the
+    capability. Proofs are private and only served by the proof endpoint.
+
+    Content never changes under a hash, so the hash is the ETag and clients may
+    cache forever; a matching If-None-Match is answered without any lookup.
+    """
+    if not SHA256_RE.match(sha):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    headers = {"ETag": f'"{sha}"', "Cache-Control": BLOB_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return await blob_response(request, sha, headers, private=False)
+
+# ==================== PROOF DUPLICATES ====================
+# Every ingested image gets a 64-bit difference hash (dHash). A new proof is
+# compared against earlier proofs from the same group and the same player:
+# XOR + popcount over a packed uint64 array gives all Hamming distances in
+# one vectorized pass, and close matches are shown to voters. Each scope's
+# hashes are kept in memory and topped up with the rows added since the last
+# play, instead of re-reading the whole history every time.
+
+DHASH_MAX_DISTANCE = int(os.environ.get("DHASH_MAX_DISTANCE", "10"))  # of 64 bits
+PROOF_HASH_HISTORY_LIMIT = int(os.environ.get("PROOF_HASH_HISTORY_LIMIT", "50000"))
+NEAR_DUPLICATES_SHOWN = 5
+PROOF_HASH_CACHE_SCOPES = int(os.environ.get("PROOF_HASH_CACHE_SCOPES", "256"))
+# rows are picked up from a little before the newest one seen: another
+# process may insert with a slightly older created_at
+PROOF_HASH_SYNC_OVERLAP = timedelta(seconds=5)
+PROOF_HASH_FIELDS = {"_id": 0, "submission_id": 1, "user_id": 1, "game_id": 1, "dhash": 1, "created_at": 1}
+
+def dhash_to_int64(value: int) -> int:
+    """Mongo stores signed 64-bit ints; keep the same bits"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+class PerceptualHashIndex:
+    """dHashes packed into one uint64 array, queried by Hamming distance"""
+
+    def __init__(self, hashes=(), ids=()):
+        self.hashes = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+        self.ids = list(ids)
+
+    @classmethod
+    def from_rows(cls, rows: List[dict], key: str = "dhash") -> "PerceptualHashIndex":
+        return cls(np.fromiter((r[key] for r in rows), dtype=np.int64, count=len(rows)), range(len(rows)))
+
+    def distances(self, value: int) -> "np.ndarray":
+        query = np.array([dhash_to_int64(value)], dtype=np.int64).view(np.uint64)[0]
+        return np.bitwise_count(self.hashes ^ query)
+
+    def query(self, value: int, max_distance: int = DHASH_MAX_DISTANCE, limit: Optional[int] = None) -> List[tuple]:
+        """(id, distance) of every hash within max_distance, closest first"""
+        if not len(self.hashes):
+            return []
+        distances = self.distances(value)
+        hits = np.flatnonzero(distances <= max_distance)
+        hits = hits[np.argsort(distances[hits], kind="stable")]
+        if limit is not None:
+            hits = hits[:limit]
+        return [(self.ids[i], int(distances[i])) for i in hits]
+
+class ProofHashScope:
+    """The newest PROOF_HASH_HISTORY_LIMIT proof hashes of one group or player, indexed"""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self.seen = {r["submission_id"] for r in rows}
+        self.index = PerceptualHashIndex.from_rows(rows)
+        self.synced_at = max((r["created_at"] for r in rows), default=None)
+
+    def extend(self, rows: List[dict]):
+        rows = [r for r in rows if r["submission_id"] not in self.seen]
+        if not rows:
+            return
+        self.synced_at = max([self.synced_at, *(r["created_at"] for r in rows)])
+        self.rows.extend(rows)
+        self.seen.update(r["submission_id"] for r in rows)
+        if len(self.rows) > PROOF_HASH_HISTORY_LIMIT:
+            for r in self.rows[:-PROOF_HASH_HISTORY_LIMIT]:
+                self.seen.discard(r["submission_id"])
+            self.rows = self.rows[-PROOF_HASH_HISTORY_LIMIT:]
+            self.index = PerceptualHashIndex.from_rows(self.rows)
+        else:
+            added = np.fromiter((r["dhash"] for r in rows), dtype=np.int64, count=len(rows)).view(np.uint64)
+            self.index = PerceptualHashIndex(np.concatenate((self.index.hashes, added)).view(np.int64), range(len(self.rows)))
+
+_proof_hash_scopes: "OrderedDict[tuple, ProofHashScope]" = OrderedDict()
+
+async def proof_hash_scope(field: str, value: str) -> ProofHashScope:
+    """The cached scope, topped up with rows added since it was last read"""
+    key = (field, value)
+    scope = _proof_hash_scopes.get(key)
+    if scope is None or scope.synced_at is None:
+        rows = await db.proof_hashes.find({field: value}, PROOF_HASH_FIELDS).sort("created_at", -1) \
+            .limit(PROOF_HASH_HISTORY_LIMIT).to_list(PROOF_HASH_HISTORY_LIMIT)
+        rows.reverse()
+        scope = ProofHashScope(rows)
+    else:
+        since = scope.synced_at - PROOF_HASH_SYNC_OVERLAP
+        scope.extend(await db.proof_hashes.find(
+            {field: value, "created_at": {"$gte": since}}, PROOF_HASH_FIELDS
+        ).sort("created_at", 1).to_list(None))
+    _proof_hash_scopes[key] = scope
+    _proof_hash_scopes.move_to_end(key)
+    if len(_proof_hash_scopes) > PROOF_HASH_CACHE_SCOPES:
+        _proof_hash_scopes.popitem(last=False)
+    return scope
+
+async def find_near_duplicate_proofs(dhash: int, group_id: Optional[str], user_id: str) -> List[dict]:
+    """Earlier proofs in this group or by this player that look like the same photo"""
+    scopes = [await proof_hash_scope("user_id", user_id)]
+    if group_id:
+        scopes.append(await proof_hash_scope("group_id", group_id))
+    found = {}
+    for scope in scopes:
+        for i, distance in scope.index.query(dhash, limit=NEAR_DUPLICATES_SHOWN):
+            row = scope.rows[i]
+            found.setdefault(row["submission_id"], (distance, row))
+    matches = sorted(found.values(), key=lambda hit: hit[0])[:NEAR_DUPLICATES_SHOWN]
+    return [{
+        "submission_id": row["submission_id"],
+        "game_id": row["game_id"],
+        "same_user": row["user_id"] == user_id,
+        "distance": distance
+    } for distance, row in matches]
+
+async def record_proof_hash(submission: dict):
+    """Keep the proof's hash outside submissions so it outlives game archiving"""
+    await db.proof_hashes.insert_one({
+        "submission_id": submission["submission_id"],
+        "game_id": submission["game_id"],
+        "group_id": submission.get("group_id"),
+        "user_id": submission["user_id"],
+        "dhash": submission["proof_dhash"],
+        "created_at": submission["created_at"]
+    })
+
+# ==================== IMAGE INGEST ====================
+# Uploads are decoded, EXIF-rotated, resized and re-encoded (WebP, or AVIF
+# with IMAGE_FORMAT=avif where Pillow has the codec) in a process pool (off
+# the event loop); only these fixed-size variants are stored.
+# The work itself lives in imaging.py, which imports nothing from here, so
+# the workers are spawned fresh instead of forked from this process and its
+# Mongo client threads.
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(os.cpu_count() or 1)))  # 0 = a thread instead
+IMAGE_SIZES = {"avatar": 256, "chat": 480, "vote": 1280}  # longest side per view
+IMAGE_VARIANTS = {"avatar": ("avatar",), "proof": ("chat", "vote")}
+
+image_executor = None
+image_stats = {"images": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0, "transcode_ms": 0.0}
+
+def get_image_executor() -> Optional[ProcessPoolExecutor]:
+    global image_executor
+    if image_executor is None and IMAGE_WORKERS > 0:
+        image_executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return image_executor
+
+async def ingest_image(data, kind: str) -> Dict[str, str]:
+    """Transcode an upload into the views of `kind` and store them; returns {view: sha}"""
+    global image_executor
+    sizes = {name: IMAGE_SIZES[name] for name in IMAGE_VARIANTS[kind]}
+    started = datetime.now(timezone.utc)
+    try:
+        executor = get_image_executor()
+        if executor is None:
+            variants = await asyncio.to_thread(transcode_image, data, sizes)
+        else:
+            variants = await asyncio.get_running_loop().run_in_executor(executor, transcode_image, data, sizes)
+    except BrokenProcessPool:
+        image_executor = None
+        raise HTTPException(status_code=503, detail="Image processing unavailable, try again")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        image_stats["failed"] += 1
+        raise HTTPException(status_code=400, detail="Unsupported or corrupt image")
+    image_stats["images"] += 1
+    image_stats["bytes_in"] += len(data) if isinstance(data, bytes) else os.path.getsize(data)
+    image_stats["transcode_ms"] += (datetime.now(timezone.utc) - started).total_seconds() * 1000
+
+    shas = {}
+    for name, variant in variants.items():
+        image_stats["bytes_out"] += len(variant["data"])
+        shas[name] = await store_blob(
+            variant["data"], variant["content_type"], private=kind == "proof",
+            width=variant["width"], height=variant["height"], dhash=dhash_to_int64(variant["dhash"])
+        )
+    return shas
+
+async def ingest_data_uri(data: str, kind: str) -> Dict[str, str]:
+    return await ingest_image(decode_upload(data), kind)
+
+@metrics_router.get("/images")
+async def get_image_metrics():
+    """Image ingest counters: volume in and out and average transcode time"""
+    images = image_stats["images"]
+    return {
+        **image_stats,
+        "workers": IMAGE_WORKERS,
+        "format": IMAGE_FORMAT,
+        "avg_transcode_ms": round(image_stats["transcode_ms"] / images, 2) if images else None,
+        "compression_ratio": round(image_stats["bytes_in"] / image_stats["bytes_out"], 2) if image_stats["bytes_out"] else None
+    }
+
+# ==================== UPLOADS ====================
+# Staging and chunk storage are in uploads.py; finished uploads go through the
+# image ingest above and the upload id becomes the proof_id for /play.
+
+class ResumableUploadRequest(BaseModel):
+    size: int
+
+async def finish_upload(upload: dict) -> dict:
+    """Ingest a fully written upload; the staging file is removed either way"""
+    path = upload_path(upload["upload_id"])
+    try:
+        variants = await ingest_image(str(path), "proof")
+    except HTTPException:
+        await db.uploads.update_one({"upload_id": upload["upload_id"]}, {"$set": {"status": "failed"}})
+        raise
+    finally:
+        await asyncio.to_thread(path.unlink, True)
+    upload = await db.uploads.find_one_and_update(
+        {"upload_id": upload["upload_id"]},
+        {"$set": {"status": "ready", "variants": variants, "completed_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    return upload
+
+@api_router.post("/uploads")
+async def upload_proof(request: Request, current_user: User = Depends(get_current_user)):
+    """Streaming multipart upload of a proof photo (field "file"); returns its proof_id"""
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > UPLOAD_MAX_BYTES + 64 * 1024:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+    feed, state = multipart_file_parser(request)
+
+    upload = await new_upload(current_user.user_id, None)
+    path = upload_path(upload["upload_id"])
+    try:
+        size = await append_stream(path, 0, request.stream(), UPLOAD_MAX_BYTES, parse=feed)
+        if not state["found"] or not size:
+            raise HTTPException(status_code=400, detail="No file in the upload")
+    except BaseException:
+        await asyncio.to_thread(path.unlink, True)
+        await db.uploads.delete_one({"upload_id": upload["upload_id"]})
+        raise
+    await db.uploads.update_one({"upload_id": upload["upload_id"]}, {"$set": {"size": size, "offset": size}})
+    return upload_view(await finish_upload(upload))
+
+@api_router.post("/uploads/resumable")
+async def create_resumable_upload(req: ResumableUploadRequest, current_user: User = Depends(get_current_user)):
+    """Start a resumable upload of `size` bytes; send them with PATCH /uploads/{proof_id}"""
+    if req.size <= 0 or req.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload must be 1..{UPLOAD_MAX_BYTES} bytes")
+    return upload_view(await new_upload(current_user.user_id, req.size))
+
+async def get_own_upload(upload_id: str, user_id: str) -> dict:
+    upload = await db.uploads.find_one({"upload_id": upload_id, "user_id": user_id}, {"_id": 0})
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Status and current offset, to resume after a dropped connection"""
+    return upload_view(await get_own_upload(upload_id, current_user.user_id))
+
+@api_router.get("/uploads/{upload_id}/thumbnail")
+async def get_upload_thumbnail(request: Request, upload_id: str, current_user: User = Depends(get_current_user)):
+    """Preview of the uploader's own proof before it is played"""
+    upload = await get_own_upload(upload_id, current_user.user_id)
+    if not upload.get("variants"):
+        raise HTTPException(status_code=404, detail="Upload not processed yet")
+    sha = upload["variants"]["chat"]
+    return await blob_response(request, sha, {"ETag": f'"{sha}"', "Cache-Control": PROOF_CACHE_CONTROL})
+
+@api_router.patch("/uploads/{upload_id}")
+async def append_upload(request: Request, upload_id: str, current_user: User = Depends(get_current_user)):
+    """Append the raw request body at the Upload-Offset header; completes the upload at its size"""
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header required")
+
+    upload = await get_own_upload(upload_id, current_user.user_id)
+    check_appendable(upload, offset)
+    upload["offset"] = await append_chunks(upload, offset, request.stream())
+    if upload["offset"] < upload["size"]:
+        return upload_view(upload)
+
+    try:
+        await assemble_upload(upload)
+        return upload_view(await finish_upload(upload))
+    finally:
+        await db.upload_chunks.delete_many({"upload_id": upload_id})
+
 # ==================== PROFILE ENDPOINTS ====================
 
 @api_router.put("/users/profile")
@@ -2134,7 +4183,11 @@ async def update_profile(request: Request, current_user: User = Depends(get_curr
         update_fields["bio"] = bio
     
     if "picture" in body:
-        update_fields["picture"] = body["picture"]
+        picture = body["picture"]
+        # Inline images become an avatar-size blob; the user document keeps the URL
+        if picture and picture.startswith("data:"):
+            picture = blob_url((await ingest_data_uri(picture, "avatar"))["avatar"])
+        update_fields["picture"] = picture
     
     if not update_fields:
         raise HTTPException(status_code=400, detail="No fields to update")
@@ -2156,13 +4209,14 @@ async def upload_profile_image(request: Request, current_user: User = Depends(ge
     if not image_data:
         raise HTTPException(status_code=400, detail="No image provided")
     
-    # Store base64 image directly in user document
+    # Transcode to the avatar size and store it as a blob; the user document keeps only its URL
+    image_url = blob_url((await ingest_data_uri(image_data, "avatar"))["avatar"])
     await db.users.update_one(
         {"user_id": current_user.user_id},
-        {"$set": {"picture": image_data}}
+        {"$set": {"picture": image_url}}
     )
     
-    return {"imageUrl": image_data}
+    return {"imageUrl": image_url}
 
 # ==================== DM ENDPOINTS ====================
 
@@ -2174,11 +4228,12 @@ async def get_dm_conversations(current_user: User = Depends(get_current_user)):
         {"_id": 0}
     ).sort("last_activity", -1).to_list(100)
     
+    users = await load_users({p for conv in convs for p in conv["participants"]}, "name", "picture")
     result = []
     for conv in convs:
         other_id = [p for p in conv["participants"] if p != current_user.user_id]
         other_user_id = other_id[0] if other_id else current_user.user_id
-        other_user = await db.users.find_one({"user_id": other_user_id}, {"_id": 0})
+        other_user = users.get(other_user_id)
         
         last_msg_cursor = db.dm_messages.find(
             {"conversation_id": conv["conversation_id"]},
@@ -2198,7 +4253,7 @@ async def get_dm_conversations(current_user: User = Depends(get_current_user)):
             "participant": {
                 "userId": other_user_id,
                 "name": other_user["name"] if other_user else "Unknown",
-                "avatar": other_user.get("picture") if other_user else None,
+                "avatar": avatar_url(other_user.get("picture")) if other_user else None,
                 "isOnline": False,
                 "lastSeen": None,
                 "isTyping": False,
@@ -2233,11 +4288,12 @@ async def search_dm_conversations(q: str, current_user: User = Depends(get_curre
         {"_id": 0}
     ).to_list(100)
     
+    users = await load_users({p for conv in convs for p in conv["participants"]}, "name", "picture")
     result = []
     for conv in convs:
         other_id = [p for p in conv["participants"] if p != current_user.user_id]
         other_user_id = other_id[0] if other_id else current_user.user_id
-        other_user = await db.users.find_one({"user_id": other_user_id}, {"_id": 0})
+        other_user = users.get(other_user_id)
         
         if other_user and q.lower() in other_user["name"].lower():
             result.append({
@@ -2245,7 +4301,7 @@ async def search_dm_conversations(q: str, current_user: User = Depends(get_curre
                 "participant": {
                     "userId": other_user_id,
                     "name": other_user["name"],
-                    "avatar": other_user.get("picture"),
+                    "avatar": avatar_url(other_user.get("picture")),
                     "isOnline": False,
                     "lastSeen": None,
                     "isTyping": False,
@@ -2317,7 +4373,7 @@ async def create_dm_conversation(req: CreateDMConversationRequest, current_user:
         "participant": {
             "userId": target_user["user_id"],
             "name": target_user["name"],
-            "avatar": target_user.get("picture"),
+            "avatar": avatar_url(target_user.get("picture")),
             "isOnline": False,
             "lastSeen": None,
             "isTyping": False,
@@ -2346,6 +4402,8 @@ async def get_dm_messages(conversation_id: str, current_user: User = Depends(get
         {"_id": 0}
     ).sort("timestamp", 1).to_list(200)
     
+    # Current avatar of each sender, not the (possibly inline) copy stored with the message
+    users = await load_users(conv["participants"], "picture")
     result = []
     for m in msgs:
         result.append({
@@ -2353,7 +4411,7 @@ async def get_dm_messages(conversation_id: str, current_user: User = Depends(get
             "conversationId": m["conversation_id"],
             "fromUserId": m["from_user_id"],
             "fromUserName": m.get("from_user_name", ""),
-            "fromUserAvatar": m.get("from_user_avatar"),
+            "fromUserAvatar": avatar_url(users.get(m["from_user_id"], {}).get("picture", m.get("from_user_avatar"))),
             "content": m["content"],
             "type": m.get("type", "text"),
             "timestamp": m["timestamp"].isoformat() if isinstance(m["timestamp"], datetime) else m["timestamp"],
@@ -2381,7 +4439,7 @@ async def send_dm_message(conversation_id: str, req: SendDMMessageRequest, curre
         "conversation_id": conversation_id,
         "from_user_id": current_user.user_id,
         "from_user_name": current_user.name,
-        "from_user_avatar": current_user.picture,
+        "from_user_avatar": avatar_url(current_user.picture),
         "content": req.content,
         "type": req.type,
         "timestamp": now,
@@ -2396,12 +4454,12 @@ async def send_dm_message(conversation_id: str, req: SendDMMessageRequest, curre
         {"$set": {"last_activity": now}}
     )
     
-    return {
+    response = {
         "id": msg_id,
         "conversationId": conversation_id,
         "fromUserId": current_user.user_id,
         "fromUserName": current_user.name,
-        "fromUserAvatar": current_user.picture,
+        "fromUserAvatar": avatar_url(current_user.picture),
         "content": req.content,
         "type": req.type,
         "timestamp": now.isoformat(),
@@ -2410,6 +4468,10 @@ async def send_dm_message(conversation_id: str, req: SendDMMessageRequest, curre
         "isEdited": False,
         "replyTo": req.replyTo,
     }
+    for participant in conv["participants"]:
+        if participant != current_user.user_id:
+            broker.publish(user_topic(participant), "dm_message", response)
+    return response
 
 @api_router.post("/dm/conversations/{conversation_id}/read")
 async def mark_dm_read(conversation_id: str, current_user: User = Depends(get_current_user)):
@@ -2432,14 +4494,15 @@ async def get_dm_requests(current_user: User = Depends(get_current_user)):
         {"_id": 0}
     ).to_list(50)
     
+    users = await load_users({r["from_user_id"] for r in reqs}, "name", "picture")
     result = []
     for r in reqs:
-        from_user = await db.users.find_one({"user_id": r["from_user_id"]}, {"_id": 0})
+        from_user = users.get(r["from_user_id"])
         result.append({
             "id": r["request_id"],
             "fromUserId": r["from_user_id"],
             "fromUserName": from_user["name"] if from_user else "Unknown",
-            "fromUserAvatar": from_user.get("picture") if from_user else None,
+            "fromUserAvatar": avatar_url(from_user.get("picture")) if from_user else None,
             "message": r.get("message"),
             "status": r["status"],
             "createdAt": r["created_at"].isoformat() if isinstance(r["created_at"], datetime) else r["created_at"],
@@ -2482,7 +4545,7 @@ async def accept_dm_request(request_id: str, current_user: User = Depends(get_cu
         "participant": {
             "userId": req["from_user_id"],
             "name": from_user["name"] if from_user else "Unknown",
-            "avatar": from_user.get("picture") if from_user else None,
+            "avatar": avatar_url(from_user.get("picture")) if from_user else None,
             "isOnline": False,
             "lastSeen": None,
             "isTyping": False,
@@ -2512,6 +4575,418 @@ async def decline_dm_request(request_id: str, current_user: User = Depends(get_c
     )
     return {"status": "ok"}
 
+# ==================== REALTIME (WEBSOCKET) ====================
+# Socket connections and their sender tasks are in realtime.py; this section
+# publishes the game events and authenticates the sockets.
+
+# Events a game socket is sent; "version" bumps are for long-polls only
+GAME_SOCKET_EVENTS = ("game", "chat", "submission", "vote")
+
+async def publish_game_state(game_id: str):
+    """Push the current game view to everyone watching the game"""
+    if not broker.has_subscribers(game_topic(game_id), "game"):
+        return
+    game = await build_game_view(game_id)
+    if game:
+        broker.publish(game_topic(game_id), "game", game)
+
+def publish_vote_result(submission: Optional[dict]):
+    """Push the current tally and status of a submission"""
+    if not submission:
+        return
+    broker.publish(game_topic(submission["game_id"]), "vote", {
+        "submission_id": submission["submission_id"],
+        "status": submission.get("status"),
+        "votes_approve": submission.get("votes_approve", 0),
+        "votes_reject": submission.get("votes_reject", 0)
+    })
+
+def publish_submission(submission: dict):
+    """Push a submission (new or re-tallied) without its inline proof"""
+    summary = strip_inline_proof({k: v for k, v in submission.items() if k != "_id"})
+    broker.publish(game_topic(submission["game_id"]), "submission", summary)
+
+async def get_websocket_user(websocket: WebSocket) -> Optional[User]:
+    token = websocket.query_params.get("token") or await get_session_token(websocket)
+    if not token:
+        return None
+    try:
+        return await get_user_for_session_token(token)
+    except HTTPException:
+        return None
+
+@app.websocket("/ws/games/{game_id}")
+async def game_socket(websocket: WebSocket, game_id: str):
+    """Live game channel: pushes game state, submissions, votes and chat"""
+    user = await get_websocket_user(websocket)
+    if not user:
+        await websocket.close(code=4401, reason="Not authenticated")
+        return
+
+    game = await build_game_view(game_id)
+    if not game:
+        await websocket.close(code=4404, reason="Game not found")
+        return
+
+    membership = await db.group_members.find_one({
+        "group_id": game["group_id"],
+        "user_id": user.user_id
+    })
+    is_player = any(p["user_id"] == user.user_id for p in game.get("players", []))
+    if not membership and not is_player:
+        await websocket.close(code=4403, reason="Not a member")
+        return
+
+    await websocket.accept()
+    connection = GameConnection(websocket, user.user_id, socket_subscription(game_topic(game_id), types=GAME_SOCKET_EVENTS))
+    connection.send("game", game)
+    try:
+        await serve_connection(connection, game_id)
+    finally:
+        connection.subscription.close()
+
+# ==================== SPECTATORS ====================
+# Read-only game view for friends and group members. Each game version is
+# serialized once into a shared frame; HTTP viewers get its bytes (with an
+# ETag) and socket viewers get the same string queued to their connection.
+
+SPECTATOR_CHAT_LIMIT = 30
+SPECTATOR_CACHE_SIZE = 256
+
+async def build_spectator_view(game_id: str) -> Optional[dict]:
+    """Public game state: no hands, no proofs; users and cards resolved in batched queries"""
+    game = await db.games.find_one({"game_id": game_id}, {"_id": 0, "hand_counters": 0, "ready_players": 0})
+    if not game:
+        return None
+
+    players = await db.game_players.find({"game_id": game_id}, {"_id": 0, "user_id": 1, "score": 1}).to_list(100)
+    if game.get("archived"):
+        archive = await load_game_archive(game_id)
+        submissions = [s for s in archived_rows(archive, "submissions") if s.get("status") == "pending"]
+        for s in submissions:
+            strip_inline_proof(s)
+        chat = sorted(archived_rows(archive, "chat_messages"), key=lambda m: m["created_at"])[-SPECTATOR_CHAT_LIMIT:]
+    else:
+        submissions = await db.submissions.aggregate([
+            {"$match": {"game_id": game_id, "status": "pending"}},
+            {"$addFields": {"has_proof": HAS_PROOF_EXPR}},
+            {"$project": PROOF_PAYLOAD_EXCLUDED}
+        ]).to_list(100)
+        chat = page_chat_rows(await load_chat(game_id, SPECTATOR_CHAT_LIMIT), None, None, SPECTATOR_CHAT_LIMIT)
+
+    # Frames are cached and fanned out: URL avatars and the rendered card fields only
+    users, cards = await load_feed_refs(
+        {p["user_id"] for p in players} | {m["user_id"] for m in chat} | {s["user_id"] for s in submissions},
+        {s["card_id"] for s in submissions}
+    )
+    game["players"] = [{**p, "user": feed_user(users.get(p["user_id"]))} for p in players]
+    game["submissions"] = [{**s, "user": feed_user(users.get(s["user_id"])), "card": cards.get(s["card_id"])} for s in submissions]
+    game["chat"] = [{**m, "user": feed_user(users.get(m["user_id"]))} for m in chat]
+    return game
+
+class SpectatorFeed:
+    """Serialize-once cache of spectator frames; sockets watch spectate:<game_id>"""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.dirty: set = set()
+        self.refreshing: Dict[str, asyncio.Task] = {}
+        self.serializations = 0
+
+    def watched(self, game_id: str) -> bool:
+        return broker.has_subscribers(spectate_topic(game_id))
+
+    def user_changed(self, user_id: str):
+        """A player's name or avatar changed: frames showing them are stale"""
+        for game_id, entry in list(self.entries.items()):
+            if user_id in entry["player_ids"]:
+                self.changed(game_id)
+
+    def changed(self, game_id: str):
+        """On every version bump; refreshes eagerly only while sockets are watching"""
+        if game_id in self.entries:
+            self.dirty.add(game_id)
+        if self.watched(game_id):
+            self._schedule(game_id)
+
+    async def run(self):
+        """Follow version bumps of every game on the broker"""
+        subscription = broker.subscribe("game:*", maxsize=BROKER_QUEUE_SIZE * 16, types=("version",))
+        dropped = 0
+        try:
+            while True:
+                message = await subscription.get()
+                if message is None:
+                    return
+                if subscription.dropped != dropped:
+                    # Fell behind: any cached frame may be stale
+                    dropped = subscription.dropped
+                    self.dirty.update(self.entries)
+                self.changed(message.data["game_id"])
+        finally:
+            subscription.close()
+
+    def _schedule(self, game_id: str) -> asyncio.Task:
+        task = self.refreshing.get(game_id)
+        if task is None or task.done():
+            task = self.refreshing[game_id] = asyncio.create_task(self._refresh(game_id))
+        return task
+
+    async def _refresh(self, game_id: str) -> Optional[dict]:
+        # Changes that land while a build is running mark the game dirty again
+        # and are picked up by the next pass of this same task
+        try:
+            while game_id in self.dirty or game_id not in self.entries:
+                self.dirty.discard(game_id)
+                view = await build_spectator_view(game_id)
+                if view is None:
+                    self.entries.pop(game_id, None)
+                    return None
+                frame = encode_event("spectate", view)
+                self.serializations += 1
+                self.entries[game_id] = {
+                    "version": view.get("version", 0),
+                    "frame": frame,
+                    "body": frame.encode("utf-8"),
+                    "etag": f'"{game_id}-{view.get("version", 0)}"',
+                    "group_id": view.get("group_id"),
+                    "player_ids": [p["user_id"] for p in view["players"]]
+                }
+                self.entries.move_to_end(game_id)
+                broker.publish(spectate_topic(game_id), "spectate", frame=frame)
+                self._evict()
+            return self.entries.get(game_id)
+        finally:
+            if self.refreshing.get(game_id) is asyncio.current_task():
+                del self.refreshing[game_id]
+
+    def _evict(self):
+        for game_id in list(self.entries):
+            if len(self.entries) <= SPECTATOR_CACHE_SIZE:
+                break
+            if not self.watched(game_id):
+                self.entries.pop(game_id)
+                self.dirty.discard(game_id)
+
+    async def get(self, game_id: str) -> Optional[dict]:
+        """Current frame for a game, built at most once per version across all callers"""
+        entry = self.entries.get(game_id)
+        if entry is not None and game_id not in self.dirty:
+            self.entries.move_to_end(game_id)
+            return entry
+        return await asyncio.shield(self._schedule(game_id))
+
+spectator_feed = SpectatorFeed()
+
+async def can_spectate(user_id: str, entry: dict) -> bool:
+    """Players, members of the game's group and friends of any player may watch"""
+    player_ids = entry["player_ids"]
+    if user_id in player_ids:
+        return True
+    if await db.group_members.find_one({"group_id": entry["group_id"], "user_id": user_id}, {"_id": 1}):
+        return True
+    friend = await db.friends.find_one({
+        "$or": [
+            {"user1_id": user_id, "user2_id": {"$in": player_ids}},
+            {"user2_id": user_id, "user1_id": {"$in": player_ids}}
+        ]
+    }, {"_id": 1})
+    return friend is not None
+
+@api_router.get("/games/{game_id}/spectate")
+async def spectate_game(request: Request, game_id: str, current_user: User = Depends(get_current_user)):
+    """Read-only live view of a game ({"type": "spectate", "data": ...}), ETag'd by version"""
+    entry = await spectator_feed.get(game_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if not await can_spectate(current_user.user_id, entry):
+        raise HTTPException(status_code=403, detail="Only friends and group members can watch this game")
+
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == entry["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+@app.websocket("/ws/games/{game_id}/spectate")
+async def spectate_socket(websocket: WebSocket, game_id: str):
+    """Spectator stream: one shared "spectate" frame per game version"""
+    user = await get_websocket_user(websocket)
+    if not user:
+        await websocket.close(code=4401, reason="Not authenticated")
+        return
+
+    entry = await spectator_feed.get(game_id)
+    if entry is None:
+        await websocket.close(code=4404, reason="Game not found")
+        return
+    if not await can_spectate(user.user_id, entry):
+        await websocket.close(code=4403, reason="Not allowed to watch")
+        return
+
+    await websocket.accept()
+    connection = GameConnection(websocket, user.user_id, socket_subscription(spectate_topic(game_id)))
+    # Re-read after subscribing so a change in between is not missed
+    entry = await spectator_feed.get(game_id)
+    if entry:
+        connection.send("spectate", frame=entry["frame"])
+    try:
+        await serve_connection(connection, game_id)
+    finally:
+        connection.subscription.close()
+
+@app.websocket("/ws/users/me")
+async def user_socket(websocket: WebSocket):
+    """The signed-in user's own stream: notifications and direct messages"""
+    user = await get_websocket_user(websocket)
+    if not user:
+        await websocket.close(code=4401, reason="Not authenticated")
+        return
+
+    await websocket.accept()
+    connection = GameConnection(websocket, user.user_id, socket_subscription(user_topic(user.user_id)))
+    try:
+        await serve_connection(connection, user_topic(user.user_id))
+    finally:
+        connection.subscription.close()
+
+@metrics_router.get("/broker")
+async def get_broker_metrics():
+    """Topics, subscriptions and per-subscriber queue drops of the event broker"""
+    return broker.stats()
+
+@metrics_router.get("/spectators")
+async def get_spectator_metrics():
+    """Spectator sockets per game and how many frames have been serialized"""
+    prefix = spectate_topic("")
+    return {
+        "viewers": {topic[len(prefix):]: len(group) for topic, group in broker.topics.items() if topic.startswith(prefix)},
+        "cached_games": len(spectator_feed.entries),
+        "serializations": spectator_feed.serializations
+    }
+
+# ==================== CHANGE FEED ====================
+# change_feed.py follows the other processes' writes (change stream or
+# polling, checkpoints, consumer slots); GameChangeFeed republishes them on
+# this process's broker and drops the cache entries they invalidate.
+
+LIVE_GAME_STATUSES = ["waiting", "ready", "started"]
+
+class GameChangeFeed(ChangeFeed):
+    """The change feed for this app: republishes game, chat, notification and profile changes"""
+
+    async def apply(self, collection: str, operation: str, doc: Optional[dict], updated: Optional[dict] = None):
+        self.events += 1
+        updated = updated or {}
+        if not doc:
+            return
+
+        if collection == "chat_buckets":
+            # A bucket change carries its own messages; each has its game version
+            for message in appended_chat_messages(operation, doc, updated):
+                if ("game", message["game_id"], message.get("version")) in local_writes:
+                    self.skipped_local += 1
+                    continue
+                self.published += 1
+                await publish_chat_message(message)
+            return
+
+        if collection == "users":
+            user_id = doc["user_id"]
+            # Scores and other fields change often and are not shown from here
+            if operation != "insert" and {"name", "picture"} & set(updated):
+                spectator_feed.user_changed(user_id)
+                self.published += 1
+                broker.publish(user_topic(user_id), "profile", {"name": doc.get("name"), "picture": avatar_url(doc.get("picture"))})
+            return
+
+        if collection == "notifications":
+            if operation != "insert":
+                return
+            if ("notification", doc["notification_id"]) in local_writes:
+                self.skipped_local += 1
+                return
+            self.published += 1
+            broker.publish(user_topic(doc["user_id"]), "notification", doc)
+            return
+
+        game_id = doc.get("game_id")
+        if not game_id:
+            return
+        version = int(updated.get("version", doc.get("version", 0)) or 0)
+        if collection == "games" and updated.get("archived"):
+            _archive_cache.pop(game_id, None)
+        if ("game", game_id, version) in local_writes:
+            self.skipped_local += 1
+            return
+
+        self.published += 1
+        if collection == "games":
+            broker.publish(game_topic(game_id), "version", {"game_id": game_id, "version": version})
+            if operation != "update" or {"state_revision", "status"} & set(updated):
+                await publish_game_state(game_id)
+        elif collection == "submissions":
+            if operation == "insert":
+                publish_submission(doc)
+            else:
+                publish_vote_result(doc)
+
+    async def poll_once(self, versions: Dict[str, tuple], since: datetime, until: datetime):
+        """Republish what changed in live games and notifications created in (since, until]
+
+        `versions` maps each live game to the (version, state_revision) seen last.
+        Rows are re-read from delta_floor(known) so a late stamped write is
+        caught by the next poll that sees the version move; each republished
+        row is added to local_writes so the overlap does not publish it twice.
+        """
+        live = set()
+        async for game in db.games.find(
+            {"status": {"$in": LIVE_GAME_STATUSES}},
+            {"_id": 0, "game_id": 1, "version": 1, "state_revision": 1, "status": 1}
+        ):
+            game_id = game["game_id"]
+            version, revision = int(game.get("version", 0) or 0), int(game.get("state_revision", 0) or 0)
+            live.add(game_id)
+            known, known_revision = versions.get(game_id, (None, None))
+            versions[game_id] = (version, revision)
+            if known is None or version <= known:
+                continue
+            # Only versions another process wrote need republishing
+            remote = [v for v in range(known + 1, version + 1) if ("game", game_id, v) not in local_writes]
+            if not remote:
+                self.skipped_local += 1
+                continue
+            updated = {"version": remote[-1]}
+            if revision != known_revision:
+                updated["state_revision"] = revision
+            await self.apply("games", "update", game, updated)
+            floor = delta_floor(known)
+            async for sub in db.submissions.find({"game_id": game_id, "version": {"$gt": floor, "$lte": version}}, {"_id": 0, "photo_base64": 0}):
+                created_at = sub.get("created_at")
+                if created_at is not None and created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                await self.apply("submissions", "insert" if created_at and created_at > since else "update", sub)
+                local_writes.add("game", game_id, sub["version"])
+            chat = sorted(await load_chat(game_id, since=floor, until=version), key=chat_key)
+            await self.apply("chat_buckets", "insert", {"game_id": game_id, "messages": chat})
+            for message in chat:
+                local_writes.add("game", game_id, message.get("version"))
+        for game_id in set(versions) - live:
+            del versions[game_id]
+
+        async for notification in db.notifications.find({"created_at": {"$gt": since, "$lte": until}}, {"_id": 0}):
+            await self.apply("notifications", "insert", notification)
+
+    def invalidate_all(self):
+        _archive_cache.clear()
+        spectator_feed.dirty.update(spectator_feed.entries)
+
+change_feed = GameChangeFeed()
+
+@metrics_router.get("/change-feed")
+async def get_change_feed_metrics():
+    """Mode (stream / poll / off) and counters of the cross-process change feed"""
+    return change_feed.stats()
+
 # ==================== MAIN ROUTES ====================
 
 @api_router.get("/")
@@ -2532,6 +5007,7 @@ async def app_health():
 
 # Include router
 app.include_router(api_router)
+app.include_router(metrics_router)
 
 # Coins router
 try:
@@ -2550,19 +5026,90 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
+# (collection, keys, options); unique ones back DuplicateKeyError checks in
+# votes and chat buckets
+INDEXES = [
+    ("game_players", [("user_id", 1), ("joined_at", -1), ("player_entry_id", -1)]),
+    ("game_players", [("game_id", 1), ("user_id", 1)]),
+    ("games", "game_id", {"unique": True}),
+    ("games", [("group_id", 1), ("status", 1)]),
+    ("games", [("status", 1), ("finished_at", 1)]),
+    ("hand_cards", [("game_id", 1), ("hand_number", 1), ("user_id", 1), ("status", 1)]),
+    ("submissions", "submission_id"),
+    ("submissions", [("game_id", 1), ("status", 1)]),
+    ("submissions", [("status", 1), ("created_at", 1)]),
+    ("votes", [("submission_id", 1), ("voter_id", 1)], {"unique": True}),
+    ("chat_buckets", [("game_id", 1), ("bucket", 1)], {"unique": True}),
+    ("notifications", "created_at"),
+    ("notifications", [("user_id", 1), ("created_at", -1)]),
+    ("penalties", "game_id"),
+    ("game_archives", "game_id", {"unique": True}),
+    ("player_stats", "user_id", {"unique": True}),
+    ("blobs", "sha256", {"unique": True}),
+    ("uploads", "upload_id", {"unique": True}),
+    ("proof_hashes", [("group_id", 1), ("created_at", -1)]),
+    ("proof_hashes", [("user_id", 1), ("created_at", -1)]),
+    ("uploads", [("status", 1), ("expires_at", 1)]),
+    ("upload_chunks", [("upload_id", 1), ("offset", 1)], {"unique": True}),
+]
+
+async def ensure_indexes() -> int:
+    """Indexes for the hot query paths (create_index is a no-op when they exist).
+
+    Each index is created on its own, so one failure (e.g. duplicates in
+    legacy data blocking a unique index) does not skip the rest. Returns the
+    number that failed.
+    """
+    failed = 0
+    for spec in INDEXES:
+        name, keys = spec[0], spec[1]
+        options = spec[2] if len(spec) > 2 else {}
+        try:
+            await db[name].create_index(keys, **options)
+        except Exception:
+            failed += 1
+            logger.exception("Creating index %s on %s failed", keys, name)
+    return failed
+
+def start_workers() -> List[asyncio.Task]:
+    """The background loops, one task each; the lifespan cancels them on shutdown"""
+    workers = [matchmaking_loop(), vote_worker.run(), spectator_feed.run(), change_feed.run(), upload_cleanup_loop()]
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        workers.insert(0, archive_finished_games_loop())
+    return [asyncio.create_task(worker) for worker in workers]
+
+async def startup() -> List[asyncio.Task]:
+    """Check the database, load the decks and indexes, then start the background workers"""
     try:
         if db is None:
             raise RuntimeError("Missing required env vars: MONGO_URL and/or DB_NAME")
         await db.command("ping")
         await initialize_decks()
+        await reload_card_sampler()
+        if await ensure_indexes():
+            # the API runs without them, only slower and without the unique guards
+            logger.error("Some indexes are missing, see the errors above")
+        workers = start_workers()
         logger.info("Application started, decks initialized")
+        return workers
     except Exception:
         logger.exception("Startup failed")
         raise
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+async def shutdown(workers: List[asyncio.Task]):
+    """Cancel the workers and wait for them to stop, then release the image pool, feed slot and client"""
+    for task in workers:
+        task.cancel()
+    # awaited so each loop's own cleanup (e.g. the change feed's last checkpoint) runs before the client closes
+    results = await asyncio.gather(*workers, return_exceptions=True)
+    for task, result in zip(workers, results):
+        if isinstance(result, Exception):
+            logger.error("Background task %s failed", task.get_coro().__qualname__, exc_info=result)
+    if image_executor is not None:
+        image_executor.shutdown(wait=False, cancel_futures=True)
     if client is not None:
+        try:
+            await change_feed.release()
+        except PyMongoError:
+            pass
         client.close()
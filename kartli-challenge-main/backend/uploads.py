@@ -0,0 +1,261 @@
+"""Proof photo uploads, staged until the image ingest takes them.
+
+Proof photos are uploaded on their own, before the card is played: either a
+streaming multipart POST or a resumable upload (create, then PATCH chunks at
+Upload-Offset). A POST is one request, so its bytes go to a local staging
+file. A resumable upload spans requests that may reach any process: its
+bytes are stored in upload_chunks (UPLOAD_CHUNK_BYTES per document), the
+offset recorded on the upload is the only truth about how much arrived, and
+a write lease on the upload lets one request append at a time. Memory per
+upload stays at one chunk; when complete the bytes go through the image
+ingest and the upload id becomes the proof_id for /play.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from bson import Binary
+from fastapi import HTTPException, Request
+from pymongo.errors import PyMongoError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+import database
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", str(Path(__file__).parent / "uploads"))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_TTL_SECONDS = int(os.environ.get("UPLOAD_TTL_SECONDS", "86400"))
+UPLOAD_CLEANUP_INTERVAL_SECONDS = int(os.environ.get("UPLOAD_CLEANUP_INTERVAL_SECONDS", "3600"))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(256 * 1024)))
+# a PATCH that dies without releasing its lease blocks the upload this long
+UPLOAD_WRITE_LEASE_SECONDS = int(os.environ.get("UPLOAD_WRITE_LEASE_SECONDS", "120"))
+
+logger = logging.getLogger(__name__)
+
+
+def upload_path(upload_id: str) -> Path:
+    return Path(UPLOAD_DIR) / f"{upload_id}.part"
+
+
+def upload_view(upload: dict) -> dict:
+    view = {
+        "proof_id": upload["upload_id"],
+        "status": upload["status"],
+        "size": upload.get("size"),
+        "offset": upload.get("offset", 0),
+        "expires_at": upload.get("expires_at")
+    }
+    if upload.get("variants"):
+        view["thumbnail_url"] = f"/api/uploads/{upload['upload_id']}/thumbnail"
+    return view
+
+
+async def new_upload(user_id: str, size: Optional[int]) -> dict:
+    now = datetime.now(timezone.utc)
+    upload = {
+        "upload_id": f"upl_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "size": size,
+        "offset": 0,
+        "status": "uploading",
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=UPLOAD_TTL_SECONDS)
+    }
+    await database.db.uploads.insert_one(upload)
+    upload.pop("_id", None)
+    return upload
+
+
+async def append_stream(path: Path, offset: int, chunks, limit: int, parse=None) -> int:
+    """Append an async byte stream to path at offset; returns the new offset.
+
+    `parse` turns raw request chunks into file bytes (for multipart bodies).
+    Raises 413 as soon as the file would grow past `limit`.
+    """
+    def open_at():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, "r+b" if path.exists() else "wb")
+        # drop whatever a broken earlier request wrote past the recorded offset
+        f.truncate(offset)
+        f.seek(offset)
+        return f
+
+    f = await asyncio.to_thread(open_at)
+    try:
+        async for chunk in chunks:
+            data = parse(chunk) if parse else chunk
+            if not data:
+                continue
+            if offset + len(data) > limit:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+            await asyncio.to_thread(f.write, data)
+            offset += len(data)
+    finally:
+        await asyncio.to_thread(f.close)
+    return offset
+
+
+def multipart_file_parser(request: Request, field: str = "file"):
+    """(feed, state): feed(chunk) returns the bytes of the `field` part found in chunk"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    state = {"header_field": b"", "header_value": b"", "in_file": False, "found": False}
+    out: List[bytes] = []
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            _, options = parse_options_header(state["header_value"])
+            state["in_file"] = options.get(b"name") == field.encode() and not state["found"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            out.append(data[start:end])
+
+    def on_part_end():
+        if state["in_file"]:
+            state["found"] = True
+        state["in_file"] = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: state.update(in_file=False),
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+
+    def feed(chunk: bytes) -> bytes:
+        parser.write(chunk)
+        data = b"".join(out)
+        out.clear()
+        return data
+
+    return feed, state
+
+
+def check_appendable(upload: dict, offset: int):
+    """409 unless the upload takes bytes at `offset`; 410 once it has expired"""
+    if upload["status"] != "uploading":
+        raise HTTPException(status_code=409, detail=f"Upload is {upload['status']}")
+    expires_at = upload["expires_at"]
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Upload expired")
+    if offset != upload["offset"]:
+        raise HTTPException(status_code=409, detail=f"Upload is at offset {upload['offset']}")
+
+
+async def assemble_upload(upload: dict) -> Path:
+    """Write an upload's stored chunks to its staging file, checking they cover it exactly"""
+    upload_id = upload["upload_id"]
+    path = upload_path(upload_id)
+    await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+    f = await asyncio.to_thread(open, path, "wb")
+    written = 0
+    try:
+        async for chunk in database.db.upload_chunks.find({"upload_id": upload_id}, {"_id": 0}).sort("offset", 1):
+            if chunk["offset"] != written:
+                break
+            await asyncio.to_thread(f.write, chunk["data"])
+            written += len(chunk["data"])
+    finally:
+        await asyncio.to_thread(f.close)
+    if written != upload["size"]:
+        await asyncio.to_thread(path.unlink, True)
+        await database.db.uploads.update_one({"upload_id": upload_id}, {"$set": {"status": "failed"}})
+        raise HTTPException(status_code=422, detail="Upload chunks do not add up, start a new upload")
+    return path
+
+
+async def append_chunks(upload: dict, offset: int, chunks) -> int:
+    """Store a resumable upload's bytes at `offset` in upload_chunks; returns the new offset.
+
+    Holds the upload's write lease meanwhile (409 if another request has it
+    or the offset moved). Bytes received before the stream breaks are kept
+    and counted, so the client resumes after them.
+    """
+    upload_id = upload["upload_id"]
+    # Take the write lease, conditional on the offset recorded in Mongo
+    writer = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    claimed = await database.db.uploads.find_one_and_update(
+        {
+            "upload_id": upload_id, "status": "uploading", "offset": offset,
+            "$or": [{"writer": None}, {"writer_until": {"$lte": now}}]
+        },
+        {"$set": {"writer": writer, "writer_until": now + timedelta(seconds=UPLOAD_WRITE_LEASE_SECONDS)}},
+        projection={"size": 1}
+    )
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Upload is being written by another request")
+
+    size = upload["size"]
+    stored = offset
+    buffer = bytearray()
+
+    async def flush():
+        nonlocal stored
+        if buffer:
+            await database.db.upload_chunks.insert_one({"upload_id": upload_id, "offset": stored, "data": Binary(bytes(buffer))})
+            stored += len(buffer)
+            buffer.clear()
+
+    try:
+        # whatever a broken earlier request stored past the recorded offset
+        await database.db.upload_chunks.delete_many({"upload_id": upload_id, "offset": {"$gte": offset}})
+        async for chunk in chunks:
+            if stored + len(buffer) + len(chunk) > size:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {size} bytes")
+            buffer += chunk
+            if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                await flush()
+    finally:
+        try:
+            await flush()
+        except PyMongoError:
+            logger.warning("Storing the last chunk of upload %s failed", upload_id)
+        await database.db.uploads.update_one(
+            {"upload_id": upload_id, "writer": writer},
+            {"$set": {"offset": stored}, "$unset": {"writer": "", "writer_until": ""}}
+        )
+    return stored
+
+
+async def cleanup_stale_uploads() -> int:
+    """Delete unfinished uploads past their expiry, with their staging files and chunks"""
+    stale = await database.db.uploads.find(
+        {"status": {"$in": ["uploading", "failed"]}, "expires_at": {"$lt": datetime.now(timezone.utc)}},
+        {"_id": 0, "upload_id": 1}
+    ).to_list(1000)
+    for upload in stale:
+        await asyncio.to_thread(upload_path(upload["upload_id"]).unlink, True)
+    if stale:
+        upload_ids = [u["upload_id"] for u in stale]
+        await database.db.upload_chunks.delete_many({"upload_id": {"$in": upload_ids}})
+        await database.db.uploads.delete_many({"upload_id": {"$in": upload_ids}})
+    return len(stale)
+
+
+async def upload_cleanup_loop():
+    while True:
+        try:
+            removed = await cleanup_stale_uploads()
+            if removed:
+                logger.info("Removed %s stale uploads", removed)
+        except Exception:
+            logger.exception("Upload cleanup failed")
+        await asyncio.sleep(UPLOAD_CLEANUP_INTERVAL_SECONDS)
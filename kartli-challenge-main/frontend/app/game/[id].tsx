@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import {
   View,
   Text,
@@ -12,6 +12,7 @@ import {
   Image,
   RefreshControl,
   Dimensions,
+  Platform,
 } from 'react-native';
 import { LinearGradient } from 'expo-linear-gradient';
 import { Ionicons } from '@expo/vector-icons';
@@ -56,6 +57,11 @@ export default function GameScreen() {
   const [actionLoading, setActionLoading] = useState(false);
   const [chatMessage, setChatMessage] = useState('');
 
+  // Live channel
+  const [socketOpen, setSocketOpen] = useState(false);
+  const [submissionsStamp, setSubmissionsStamp] = useState(0);
+  const [authToken, setAuthToken] = useState<string | null>(null);
+
   const getToken = async () => {
     return await AsyncStorage.getItem('session_token');
   };
@@ -119,18 +125,37 @@ export default function GameScreen() {
     }
   }, [game, gameId]);
 
+  // Newest message we have; polls only ask for what came after it
+  const lastChatId = useRef<string | null>(null);
+  useEffect(() => {
+    lastChatId.current = chatMessages.length ? chatMessages[chatMessages.length - 1].message_id : null;
+  }, [chatMessages]);
+
   const fetchChat = useCallback(async () => {
     try {
       const token = await getToken();
       if (!token) return;
 
-      const response = await fetch(`${API_URL}/api/games/${gameId}/chat`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
+      const after = lastChatId.current;
+      const response = await fetch(
+        `${API_URL}/api/games/${gameId}/chat${after ? `?after=${encodeURIComponent(after)}` : ''}`,
+        { headers: { 'Authorization': `Bearer ${token}` } }
+      );
 
       if (response.ok) {
-        const data = await response.json();
-        setChatMessages(data);
+        const data: ChatMessage[] = await response.json();
+        if (!after) {
+          setChatMessages(data);
+        } else if (data.length) {
+          setChatMessages(prev => [
+            ...prev,
+            ...data.filter(m => !prev.some(p => p.message_id === m.message_id)),
+          ]);
+        }
+      } else if (response.status === 404 && after) {
+        // Cursor is gone (e.g. the game was archived); reload the latest page
+        lastChatId.current = null;
+        setChatMessages([]);
       }
     } catch (error) {
       console.error('Fetch chat error:', error);
@@ -147,6 +172,11 @@ export default function GameScreen() {
     loadAll();
   }, [loadAll]);
 
+  // Proof images are fetched from their own (cacheable) endpoint with the session token
+  useEffect(() => {
+    getToken().then(setAuthToken);
+  }, []);
+
   useEffect(() => {
     if (game) {
       fetchMyCards();
@@ -155,8 +185,64 @@ export default function GameScreen() {
     }
   }, [fetchChat, fetchMyCards, fetchSubmissions, game]);
 
-  // Refresh periodically when game is in waiting or ready state
   useEffect(() => {
+    if (submissionsStamp > 0) {
+      fetchSubmissions();
+    }
+  }, [fetchSubmissions, submissionsStamp]);
+
+  // Live updates over the game socket; reconnects and resyncs on drop
+  useEffect(() => {
+    let ws: WebSocket | null = null;
+    let closed = false;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+
+    const connect = async () => {
+      const token = await getToken();
+      if (!token || closed) return;
+
+      ws = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/ws/games/${gameId}?token=${encodeURIComponent(token)}`);
+      ws.onopen = () => setSocketOpen(true);
+      ws.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        switch (msg.type) {
+          case 'ping':
+            ws?.send(JSON.stringify({ type: 'pong' }));
+            break;
+          case 'game':
+            setGame(msg.data);
+            break;
+          case 'chat':
+            setChatMessages(prev =>
+              prev.some(m => m.message_id === msg.data.message_id) ? prev : [...prev, msg.data]
+            );
+            break;
+          case 'submission':
+          case 'vote':
+            setSubmissionsStamp(Date.now());
+            break;
+        }
+      };
+      ws.onclose = () => {
+        setSocketOpen(false);
+        if (!closed) {
+          retry = setTimeout(connect, 3000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      if (retry) clearTimeout(retry);
+      ws?.close();
+    };
+  }, [gameId]);
+
+  // Poll only while the socket is down
+  useEffect(() => {
+    if (socketOpen) return;
+
     const interval = setInterval(() => {
       if (game?.status === 'waiting' || game?.status === 'ready') {
         fetchGame();
@@ -168,7 +254,7 @@ export default function GameScreen() {
     }, 2000);
 
     return () => clearInterval(interval);
-  }, [fetchChat, fetchGame, fetchSubmissions, game?.status]);
+  }, [fetchChat, fetchGame, fetchSubmissions, game?.status, socketOpen]);
 
   const onRefresh = async () => {
     setRefreshing(true);
@@ -270,11 +356,10 @@ export default function GameScreen() {
       mediaTypes: ImagePicker.MediaTypeOptions.Images,
       allowsEditing: true,
       quality: 0.5,
-      base64: true,
     });
 
-    if (!result.canceled && result.assets[0].base64) {
-      setProofPhoto(`data:image/jpeg;base64,${result.assets[0].base64}`);
+    if (!result.canceled && result.assets[0].uri) {
+      setProofPhoto(result.assets[0].uri);
     }
   };
 
@@ -288,12 +373,32 @@ export default function GameScreen() {
     const result = await ImagePicker.launchCameraAsync({
       allowsEditing: true,
       quality: 0.5,
-      base64: true,
     });
 
-    if (!result.canceled && result.assets[0].base64) {
-      setProofPhoto(`data:image/jpeg;base64,${result.assets[0].base64}`);
+    if (!result.canceled && result.assets[0].uri) {
+      setProofPhoto(result.assets[0].uri);
+    }
+  };
+
+  // Proof photos go up as a multipart file first; /play then only carries the proof_id
+  const uploadProof = async (token: string, uri: string): Promise<string> => {
+    const form = new FormData();
+    if (Platform.OS === 'web') {
+      const blob = await (await fetch(uri)).blob();
+      form.append('file', blob, 'proof.jpg');
+    } else {
+      form.append('file', { uri, name: 'proof.jpg', type: 'image/jpeg' } as any);
+    }
+    const response = await fetch(`${API_URL}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${token}` },
+      body: form,
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.detail || 'Fotoğraf yüklenemedi');
     }
+    return data.proof_id;
   };
 
   const handlePlayCard = async (action: 'play' | 'pass' | 'refuse') => {
@@ -309,6 +414,17 @@ export default function GameScreen() {
       const token = await getToken();
       if (!token) return;
 
+      let proofId: string | null = null;
+      if (action === 'play' && proofPhoto) {
+        try {
+          proofId = await uploadProof(token, proofPhoto);
+        } catch (error: any) {
+          Alert.alert('Hata', error.message || 'Fotoğraf yüklenemedi');
+          setActionLoading(false);
+          return;
+        }
+      }
+
       const response = await fetch(`${API_URL}/api/games/${gameId}/play`, {
         method: 'POST',
         headers: { 
@@ -318,7 +434,7 @@ export default function GameScreen() {
         body: JSON.stringify({
           card_id: selectedCard.card.card_id,
           action,
-          photo_base64: action === 'play' ? proofPhoto : null,
+          proof_id: proofId,
           note: action === 'play' ? proofNote : null,
         })
       });
@@ -775,13 +891,27 @@ export default function GameScreen() {
                   <Text style={styles.submissionDesc}>{selectedSubmission.card?.description}</Text>
                 </View>
 
-                {selectedSubmission.photo_base64 && (
+                {selectedSubmission.proof_url && (
                   <Image 
-                    source={{ uri: selectedSubmission.photo_base64 }} 
+                    source={{
+                      uri: `${API_URL}${selectedSubmission.proof_url}`,
+                      headers: authToken ? { 'Authorization': `Bearer ${authToken}` } : undefined,
+                    }} 
                     style={styles.submissionPhoto} 
                   />
                 )}
 
+                {!!selectedSubmission.near_duplicates?.length && (
+                  <View style={styles.duplicateWarning}>
+                    <Ionicons name="copy-outline" size={18} color={COLORS.warning} />
+                    <Text style={styles.duplicateWarningText}>
+                      {selectedSubmission.near_duplicates.some((d) => d.same_user)
+                        ? 'Bu fotoğraf oyuncunun daha önceki bir kanıtına çok benziyor'
+                        : 'Bu fotoğraf grupta daha önce gönderilen bir kanıta çok benziyor'}
+                    </Text>
+                  </View>
+                )}
+
                 {selectedSubmission.note && (
                   <Text style={styles.submissionNote}>{`"${selectedSubmission.note}"`}</Text>
                 )}
@@ -1209,6 +1339,20 @@ const styles = StyleSheet.create({
     borderRadius: 12,
     marginBottom: 12,
   },
+  duplicateWarning: {
+    flexDirection: 'row',
+    alignItems: 'center',
+    gap: 8,
+    padding: 10,
+    borderRadius: 8,
+    backgroundColor: COLORS.warning + '20',
+    marginBottom: 12,
+  },
+  duplicateWarningText: {
+    flex: 1,
+    fontSize: 13,
+    color: COLORS.warning,
+  },
   submissionNote: {
     fontSize: 14,
     fontStyle: 'italic',
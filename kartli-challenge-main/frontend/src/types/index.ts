@@ -98,14 +98,16 @@ export interface Submission {
   hand_number: number;
   user_id: string;
   card_id: string;
-  photo_base64?: string;
   note?: string;
   status: 'pending' | 'approved' | 'rejected';
   created_at: string;
   votes_approve: number;
   votes_reject: number;
+  has_proof?: boolean;
+  proof_url?: string | null;
+  near_duplicates?: { submission_id: string; game_id: string; same_user: boolean; distance: number }[];
   user?: { name: string; picture?: string };
-  card?: Card;
+  card?: Pick<Card, 'card_id' | 'title' | 'description' | 'deck_type' | 'points'>;
   my_vote?: string;
 }
 
@@ -0,0 +1,74 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from starlette.requests import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import database as shared  # noqa: E402
+import server  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """server.db (and database.db, read by the other modules) on a fresh in-memory database (mongomock)"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["kartli_test"]
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(shared, "db", database)
+    return database
+
+
+def player(user_id: str) -> server.User:
+    return server.User(
+        user_id=user_id, email=f"{user_id}@example.com", name=user_id, player_id=user_id,
+        created_at=datetime.now(timezone.utc)
+    )
+
+
+def request() -> Request:
+    return Request({"type": "http", "headers": [], "query_string": b""})
+
+
+async def hand_card_ids(game_id: str, user_id: str) -> list:
+    cards = await server.get_my_cards(game_id=game_id, current_user=player(user_id))
+    return [entry["card"]["card_id"] for entry in cards["cards"]]
+
+
+async def act(game_id: str, user_id: str, action: str):
+    card_id = (await hand_card_ids(game_id, user_id))[0]
+    req = server.PlayCardRequest(card_id=card_id, action=action)
+    return await server.play_card(request(), game_id=game_id, req=req, current_user=player(user_id))
+
+
+async def vote(submission_id: str, user_id: str, vote_type: str):
+    req = server.VoteRequest(vote_type=vote_type)
+    await server.vote_on_submission(request(), submission_id, req, current_user=player(user_id))
+
+
+@pytest.fixture
+def started_game(mongo, monkeypatch):
+    """Factory: a started game between the given users (turns in that order), first hand dealt"""
+    monkeypatch.setattr(server, "card_sampler", None)
+    monkeypatch.setattr(server, "game_actors", server.GameActorRegistry())
+
+    async def start(*user_ids: str, max_hands: int = 1) -> str:
+        await server.initialize_decks()
+        game_id = f"game_{user_ids[0]}"
+        now = datetime.now(timezone.utc)
+        await mongo.games.insert_one({
+            "game_id": game_id, "group_id": "grp", "status": "waiting", "created_by": user_ids[0],
+            "created_at": now, "finished_at": None, "hand_time_limit_seconds": 300, "max_hands": max_hands,
+            "difficulty_level": 3, "players": list(user_ids), "turn_order": list(user_ids),
+            "current_turn_index": 0, "version": 0, "state_revision": 0
+        })
+        await mongo.game_players.insert_many([{
+            "player_entry_id": f"pe_{user_id}", "game_id": game_id, "user_id": user_id,
+            "pass_used": False, "swap_used": False, "score": 0, "joined_at": now, "version": 0
+        } for user_id in user_ids])
+        await server.start_game(request(), game_id=game_id, current_user=player(user_ids[0]))
+        return game_id
+
+    return start
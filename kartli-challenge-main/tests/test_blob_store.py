@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from fastapi import HTTPException  # noqa: E402
+from blobs import LocalBlobStore, blob_sha_from_url, blob_url, decode_data_uri, parse_byte_range, served_media_type  # noqa: E402
+from server import decode_upload  # noqa: E402
+
+
+def test_local_store_round_trip_and_dedupe(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    data = b"\x89PNG proof bytes"
+    sha = hashlib.sha256(data).hexdigest()
+
+    async def go():
+        assert await store.get(sha) is None
+        await store.put(sha, data)
+        await store.put(sha, data)
+        assert await store.exists(sha)
+        assert await store.get(sha) == data
+        await store.delete(sha)
+        assert not await store.exists(sha)
+
+    asyncio.run(go())
+    assert store.path(sha).parent.parent.name == sha[:2]
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_blob_urls_and_data_uris():
+    sha = "ab" * 32
+    assert blob_sha_from_url(blob_url(sha)) == sha
+    assert blob_sha_from_url("https://example.com/a.png") is None
+
+    payload = base64.b64encode(b"img").decode()
+    assert decode_data_uri(f"data:image/png;base64,{payload}") == ("image/png", b"img")
+    assert decode_data_uri(payload) == ("image/jpeg", b"img")
+
+
+def test_only_image_types_are_accepted_or_served():
+    payload = base64.b64encode(b"<script>alert(1)</script>").decode()
+    with pytest.raises(HTTPException) as e:
+        decode_upload(f"data:text/html;base64,{payload}")
+    assert e.value.status_code == 400
+    assert served_media_type("image/webp") == "image/webp"
+    assert served_media_type("text/html") == "application/octet-stream"
+    assert served_media_type("image/svg+xml") == "application/octet-stream"
+
+
+def test_local_store_streams_byte_ranges(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    data = bytes(range(256)) * 4000
+    sha = hashlib.sha256(data).hexdigest()
+
+    async def read(start, end):
+        chunks = await store.stream(sha, start, end)
+        return b"".join([chunk async for chunk in chunks])
+
+    async def go():
+        assert await store.stream(sha, 0, 0) is None
+        await store.put(sha, data)
+        assert await read(0, len(data) - 1) == data
+        assert await read(1000, 300_000) == data[1000:300_001]
+
+    asyncio.run(go())
+
+
+def test_byte_ranges():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=-500", 100) == (0, 99)
+    assert parse_byte_range("bytes=50-1000", 100) == (50, 99)
+    # ignored: whole body is sent
+    assert parse_byte_range("bytes=0-1,5-6", 100) is None
+    assert parse_byte_range("bytes=9-3", 100) is None
+    assert parse_byte_range("items=0-9", 100) is None
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=100-", 100)
@@ -0,0 +1,100 @@
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from server import NORMAL_DECKS, PENALTY_DECKS, SAMPLE_CARDS, AliasTable, CardSampler, RecentCards  # noqa: E402
+
+
+def catalog():
+    cards = []
+    for deck_type, deck in SAMPLE_CARDS.items():
+        for i, card in enumerate(deck):
+            cards.append({"card_id": f"{deck_type}_{i}", "deck_type": deck_type, **card})
+    return cards
+
+
+def test_alias_table_matches_weights():
+    random.seed(7)
+    weights = [1, 2, 3, 4, 0]
+    table = AliasTable(list(range(len(weights))), weights)
+    draws = 200_000
+    counts = Counter(table.draw() for _ in range(draws))
+
+    total = sum(weights)
+    for index, weight in enumerate(weights):
+        expected = draws * weight / total
+        assert abs(counts[index] - expected) <= 5 * expected ** 0.5 + 1
+    assert counts[4] == 0
+
+
+def test_uniform_catalog_draws_are_uniform():
+    random.seed(11)
+    sampler = CardSampler(catalog())
+    draws = 100_000
+    counts = Counter(card["card_id"] for _ in range(draws) for card in sampler.draw(None, PENALTY_DECKS))
+
+    expected = draws / len(SAMPLE_CARDS["ceza"])
+    assert len(counts) == len(SAMPLE_CARDS["ceza"])
+    # chi-square with 7 degrees of freedom; 24.3 is the 0.001 critical value
+    chi2 = sum((c - expected) ** 2 / expected for c in counts.values())
+    assert chi2 < 24.3
+
+
+def test_difficulty_and_decks_are_respected():
+    sampler = CardSampler(catalog())
+    for _ in range(500):
+        for card in sampler.draw("p", NORMAL_DECKS, max_difficulty=1, count=2):
+            assert card["deck_type"] in NORMAL_DECKS
+            assert card["difficulty"] <= 1
+
+
+def test_hand_has_two_normal_and_one_penalty_card():
+    sampler = CardSampler(catalog())
+    for hand_number in (1, 2):
+        cards = sampler.draw_hand("p", hand_number, difficulty_level=2)
+        assert len({c["card_id"] for c in cards}) == 3
+        assert sorted(c["deck_type"] == "ceza" for c in cards) == [False, False, True]
+    assert all(c["deck_type"] == "ceza" for c in sampler.draw_hand("p", 3, difficulty_level=2))
+
+
+def test_recent_cards_are_not_repeated():
+    sampler = CardSampler(catalog(), recent_size=12)
+    seen = []
+    for _ in range(6):
+        seen.extend(c["card_id"] for c in sampler.draw("p", NORMAL_DECKS, max_difficulty=3, count=2))
+        window = seen[-12:]
+        assert len(window) == len(set(window))
+
+
+def test_exclude_and_small_pools():
+    sampler = CardSampler(catalog(), recent_size=12)
+    # the penalty pool (8 cards) is smaller than the memory; draws still succeed
+    for _ in range(20):
+        assert len(sampler.draw("p", PENALTY_DECKS, count=3)) == 3
+    excluded = tuple(f"ceza_{i}" for i in range(7))
+    assert [c["card_id"] for c in sampler.draw("p", PENALTY_DECKS, count=3, exclude=excluded)] == ["ceza_7"]
+
+
+def test_recent_bitset_forgets_oldest():
+    recent = RecentCards(2)
+    for index in (5, 9, 5, 70):
+        recent.add(index)
+    assert 5 not in recent
+    assert 9 in recent and 70 in recent
+
+
+
+def test_fallback_redraws_by_weight_and_skips_zero_weight():
+    random.seed(3)
+    cards = [{"card_id": f"c{i}", "deck_type": "ceza", "weight": w} for i, w in enumerate((0, 1, 3, 0))]
+    sampler = CardSampler(cards)
+    table = sampler.table(PENALTY_DECKS)
+    counts = Counter(sampler.redraw(table, set(), None) for _ in range(20_000))
+    assert set(counts) == {1, 2}
+    assert 2.6 < counts[2] / counts[1] < 3.4
+    # only the two weighted cards can be dealt, however many are asked for
+    assert {c["card_id"] for c in sampler.draw(None, PENALTY_DECKS, count=4)} == {"c1", "c2"}
+    assert sampler.draw(None, PENALTY_DECKS, exclude=("c1", "c2")) == []
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import change_feed  # noqa: E402
+import database as shared  # noqa: E402
+import server  # noqa: E402
+from realtime import LocalWrites, broker, local_writes  # noqa: E402
+from server import GameChangeFeed  # noqa: E402
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeChangeStream:
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.resume_token = None
+        self.alive = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if not self.changes:
+            self.alive = False
+            return None
+        change = self.changes.pop(0)
+        self.resume_token = change["_id"]
+        return change
+
+
+class FakeStateCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+
+class FakeDatabase:
+    """Just enough of a database for ChangeFeed.stream()"""
+
+    def __init__(self, changes):
+        self.change_feed_state = FakeStateCollection()
+        self.changes = changes
+        self.resumed_after = []
+
+    def watch(self, pipeline, resume_after=None, **kwargs):
+        self.pipeline = pipeline
+        self.resumed_after.append(resume_after)
+        return FakeChangeStream(self.changes)
+
+
+def change(token, collection, operation, doc, updated=None):
+    return {
+        "_id": {"_data": token},
+        "ns": {"db": "test", "coll": collection},
+        "operationType": operation,
+        "fullDocument": doc,
+        "updateDescription": {"updatedFields": updated or {}}
+    }
+
+
+def test_local_writes_forget_oldest():
+    writes = LocalWrites(size=2)
+    writes.add("game", "g", 1)
+    writes.add("game", "g", 2)
+    writes.add("game", "g", 3)
+    assert ("game", "g", 1) not in writes
+    assert ("game", "g", 3) in writes
+
+
+def test_only_other_processes_writes_are_republished():
+    async def go():
+        game_id = f"game_{uuid.uuid4().hex[:8]}"
+        subscription = broker.subscribe(server.game_topic(game_id), types=("version", "submission", "vote"))
+        local_writes.add("game", game_id, 5)
+        feed = GameChangeFeed("test")
+
+        await feed.apply("games", "update", {"game_id": game_id}, {"version": 5})
+        await feed.apply("games", "update", {"game_id": game_id}, {"version": 6})
+        await feed.apply("submissions", "insert", {
+            "submission_id": "sub_1", "game_id": game_id, "user_id": "u", "status": "pending",
+            "created_at": NOW, "version": 7
+        })
+        await feed.apply("submissions", "update", {
+            "submission_id": "sub_1", "game_id": game_id, "status": "approved", "votes_approve": 2
+        }, {"version": 8, "status": "approved"})
+
+        messages = [await subscription.get(0) for _ in range(3)]
+        assert [(m.type, m.data.get("version"), m.data.get("status")) for m in messages] == [
+            ("version", 6, None), ("submission", 7, "pending"), ("vote", None, "approved")
+        ]
+        assert await subscription.get(0) is None
+        assert feed.skipped_local == 1
+        subscription.close()
+
+    asyncio.run(go())
+
+
+def test_notifications():
+    async def go():
+        subscription = broker.subscribe(server.user_topic("user_cf"))
+        local_writes.add("notification", "notif_local")
+        feed = GameChangeFeed("test")
+        await feed.apply("notifications", "insert", {"notification_id": "notif_local", "user_id": "user_cf"})
+        await feed.apply("notifications", "insert", {"notification_id": "notif_remote", "user_id": "user_cf"})
+        message = await subscription.get(0)
+        assert message.data["notification_id"] == "notif_remote"
+        assert await subscription.get(0) is None
+        subscription.close()
+
+    asyncio.run(go())
+
+
+def test_only_profile_changes_refresh_spectators(monkeypatch):
+    changed = []
+    monkeypatch.setattr(server.spectator_feed, "user_changed", changed.append)
+    feed = GameChangeFeed("test")
+    asyncio.run(feed.apply("users", "update", {"user_id": "u1", "weekly_score": 9}, {"weekly_score": 9}))
+    asyncio.run(feed.apply("users", "update", {"user_id": "u2", "name": "Ada"}, {"name": "Ada"}))
+    assert changed == ["u2"]
+
+
+def test_stream_checkpoints_and_resumes(monkeypatch):
+    async def go():
+        game_id = f"game_{uuid.uuid4().hex[:8]}"
+        subscription = broker.subscribe(server.game_topic(game_id), types=("version",))
+        database = FakeDatabase([
+            change("t1", "games", "update", {"game_id": game_id}, {"version": 1}),
+            change("t2", "games", "update", {"game_id": game_id}, {"version": 2}),
+        ])
+        monkeypatch.setattr(shared, "db", database)
+        monkeypatch.setattr(change_feed, "CHANGE_FEED_CHECKPOINT_SECONDS", 0)
+
+        feed = GameChangeFeed("worker-a")
+        await feed.load_token()
+        await feed.stream()
+        assert [(await subscription.get(0)).data["version"] for _ in range(2)] == [1, 2]
+        assert database.change_feed_state.docs["worker-a"]["resume_token"] == {"_data": "t2"}
+
+        # A restarted consumer with the same name resumes after the checkpoint
+        restarted = GameChangeFeed("worker-a")
+        await restarted.load_token()
+        await restarted.stream()
+        assert database.resumed_after == [None, {"_data": "t2"}]
+        # chat bucket updates travel without the looked-up bucket's messages
+        assert "fullDocument.messages" in database.pipeline[-1]["$set"]
+        subscription.close()
+
+    asyncio.run(go())
+
+
+@pytest.mark.skipif(not os.environ.get("MONGO_REPLSET_URL"), reason="needs a replica set (MONGO_REPLSET_URL)")
+def test_change_stream_against_replica_set(monkeypatch):
+    """e.g. mongod --replSet rs0 --port 27018 && mongosh --port 27018 --eval 'rs.initiate()'"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def go():
+        client = AsyncIOMotorClient(os.environ["MONGO_REPLSET_URL"])
+        database = client[f"kartli_change_feed_{uuid.uuid4().hex[:8]}"]
+        monkeypatch.setattr(server, "db", database)
+        monkeypatch.setattr(shared, "db", database)
+        game_id = f"game_{uuid.uuid4().hex[:8]}"
+        subscription = broker.subscribe(server.game_topic(game_id), types=("version", "submission"))
+        feed = GameChangeFeed("integration")
+        task = asyncio.create_task(feed.stream())
+        try:
+            while feed.mode != "stream":
+                await asyncio.sleep(0.05)
+            # Written "by another process": nothing in local_writes
+            await database.games.insert_one({"game_id": game_id, "status": "started", "version": 1})
+            await database.submissions.insert_one({
+                "submission_id": "sub_rs", "game_id": game_id, "user_id": "u", "status": "pending",
+                "created_at": datetime.now(timezone.utc), "version": 2, "photo_base64": "x" * 1000
+            })
+            first = await subscription.get(timeout=10)
+            second = await subscription.get(timeout=10)
+            assert (first.type, second.type) == ("version", "submission")
+            assert "photo_base64" not in second.data
+        finally:
+            task.cancel()
+            subscription.close()
+            await feed.checkpoint()
+            assert await database.change_feed_state.find_one({"_id": "integration"})
+            await client.drop_database(database.name)
+            client.close()
+
+    asyncio.run(go())
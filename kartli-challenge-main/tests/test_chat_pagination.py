@@ -0,0 +1,121 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import chat_buckets  # noqa: E402
+import database  # noqa: E402
+from chat_buckets import appended_chat_messages, chat_bucket_docs, load_chat, page_chat_rows  # noqa: E402
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def messages(count):
+    # pairs share a timestamp, so message_id has to break ties
+    return [
+        {"message_id": f"msg_{i:03d}", "created_at": START + timedelta(seconds=i // 2)}
+        for i in range(count)
+    ]
+
+
+def ids(rows):
+    return [m["message_id"] for m in rows]
+
+
+def test_latest_page_is_chronological():
+    rows = messages(10)
+    assert ids(page_chat_rows(list(reversed(rows)), None, None, 3)) == ["msg_007", "msg_008", "msg_009"]
+
+
+def test_after_returns_only_newer_messages():
+    rows = messages(10)
+    assert ids(page_chat_rows(rows, "msg_004", None, 3)) == ["msg_005", "msg_006", "msg_007"]
+    assert page_chat_rows(rows, "msg_009", None, 3) == []
+
+
+def test_before_walks_back_without_gaps():
+    rows = messages(10)
+    seen, cursor = [], "msg_009"
+    while True:
+        page = page_chat_rows(rows, None, cursor, 4)
+        if not page:
+            break
+        seen = ids(page) + seen
+        cursor = page[0]["message_id"]
+    assert seen == ids(rows[:9])
+
+
+def test_unknown_cursor():
+    assert page_chat_rows(messages(3), "msg_999", None, 3) is None
+
+
+class FakeBuckets:
+    """chat_buckets for one game: newest-first iteration, counting the buckets read"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.read = 0
+
+    def find(self, query, projection):
+        self.read = 0
+        self.since = query.get("version", {}).get("$gt", 0)
+        return self
+
+    def sort(self, key, direction):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def __aiter__(self):
+        for doc in sorted(self.docs, key=lambda d: -d["bucket"]):
+            if doc["version"] > self.since:
+                self.read += 1
+                yield doc
+
+
+def bucketed(count, size, monkeypatch):
+    rows = [{**m, "game_id": "g", "version": i + 1} for i, m in enumerate(messages(count))]
+    monkeypatch.setattr(chat_buckets, "CHAT_BUCKET_SIZE", size)
+    buckets = FakeBuckets(chat_bucket_docs("g", rows))
+    monkeypatch.setattr(database, "db", type("FakeDatabase", (), {"chat_buckets": buckets})())
+    return rows, buckets
+
+
+def test_buckets_hold_messages_without_game_id(monkeypatch):
+    rows, buckets = bucketed(25, 10, monkeypatch)
+    assert [(d["bucket"], d["count"], d["version"]) for d in buckets.docs] == [(0, 10, 10), (1, 10, 20), (2, 5, 25)]
+    assert "game_id" not in buckets.docs[0]["messages"][0]
+    assert chat_buckets.chat_bucket_messages(buckets.docs[2])[-1] == rows[-1]
+
+
+def test_pages_read_only_the_buckets_they_need(monkeypatch):
+    rows, buckets = bucketed(25, 10, monkeypatch)
+
+    latest = asyncio.run(load_chat("g", 3))
+    assert ids(page_chat_rows(latest, None, None, 3)) == ids(rows[-3:])
+    assert buckets.read == 1
+
+    polled = asyncio.run(load_chat("g", 10, "msg_021", newer=True))
+    assert ids(page_chat_rows(polled, "msg_021", None, 10)) == ["msg_022", "msg_023", "msg_024"]
+    assert buckets.read == 1
+
+    older = asyncio.run(load_chat("g", 10, "msg_021"))
+    assert ids(page_chat_rows(older, None, "msg_021", 10)) == ids(rows[11:21])
+    assert buckets.read == 2
+
+    changed = asyncio.run(load_chat("g", 100, since=18))
+    assert ids(page_chat_rows(changed, None, None, 100)) == ids(rows[18:])
+    assert asyncio.run(load_chat("g", 10, "msg_999")) is None
+
+
+def test_appended_messages_from_bucket_changes():
+    bucket = {"game_id": "g", "messages": [{"message_id": "a"}, {"message_id": "b"}]}
+    assert [m["message_id"] for m in appended_chat_messages("insert", bucket, {})] == ["a", "b"]
+    pushed = appended_chat_messages("update", bucket, {
+        "messages.10": {"message_id": "k"}, "messages.9": {"message_id": "j"}, "count": 11, "version": 40
+    })
+    assert pushed == [{"message_id": "j", "game_id": "g"}, {"message_id": "k", "game_id": "g"}]
+    assert appended_chat_messages("delete", bucket, {}) == []
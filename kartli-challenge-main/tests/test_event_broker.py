@@ -0,0 +1,93 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from realtime import EventBroker  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_topics_wildcards_and_types():
+    async def go():
+        broker = EventBroker()
+        game = broker.subscribe("game:g1")
+        everything = broker.subscribe("game:*", types=("version",))
+        user = broker.subscribe("user:u1")
+
+        assert broker.publish("game:g1", "chat", {"content": "hi"}) == 1
+        assert broker.publish("game:g2", "version", {"version": 3}) == 1
+        assert broker.publish("game:g1", "version", {"version": 4}) == 2
+        assert broker.publish("user:u2", "notification", {}) == 0
+
+        assert [(await game.get(0)).type for _ in range(2)] == ["chat", "version"]
+        assert [(await everything.get(0)).topic for _ in range(2)] == ["game:g2", "game:g1"]
+        assert user.queue.empty()
+        # wildcards do not count: nobody needs the payload built for them
+        assert broker.has_subscribers("game:g1", "chat")
+        assert not broker.has_subscribers("game:g2")
+        broker.subscribe("game:g3", types=("version",))
+        assert broker.has_subscribers("game:g3", "version")
+        assert not broker.has_subscribers("game:g3", "game")
+
+    run(go())
+
+
+def test_message_is_serialized_once():
+    async def go():
+        broker = EventBroker()
+        first, second = broker.subscribe("t"), broker.subscribe("t")
+        broker.publish("t", "chat", {"n": 1})
+        a, b = await first.get(0), await second.get(0)
+        assert a is b
+        assert a.frame is b.frame
+        assert json.loads(a.frame) == {"type": "chat", "data": {"n": 1}}
+
+    run(go())
+
+
+def test_full_queue_policies():
+    async def go():
+        broker = EventBroker()
+        oldest = broker.subscribe("t", maxsize=2, policy="drop_oldest")
+        newest = broker.subscribe("t", maxsize=2, policy="drop_newest")
+        slow = broker.subscribe("t", maxsize=2, policy="disconnect")
+        for n in range(3):
+            broker.publish("t", "n", n)
+
+        assert [(await oldest.get(0)).data for _ in range(2)] == [1, 2]
+        assert [(await newest.get(0)).data for _ in range(2)] == [0, 1]
+        assert oldest.dropped == newest.dropped == 1
+        assert slow.closed and slow.overflowed
+        assert await slow.get(0) is None
+        assert broker.stats()["disconnected"] == 1
+        assert broker.stats()["subscriptions"] == 2
+
+    run(go())
+
+
+def test_close_wakes_a_waiting_consumer():
+    async def go():
+        broker = EventBroker()
+        subscription = broker.subscribe("t")
+        waiter = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0)
+        subscription.close()
+        assert await asyncio.wait_for(waiter, 1) is None
+        assert not broker.topics
+        assert broker.publish("t", "x") == 0
+
+    run(go())
+
+
+def test_get_times_out():
+    async def go():
+        subscription = EventBroker().subscribe("t")
+        assert await subscription.get(timeout=0.01) is None
+        assert not subscription.closed
+
+    run(go())
@@ -0,0 +1,83 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from .conftest import act, vote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from server import GameActorRegistry  # noqa: E402
+
+
+def test_jobs_of_one_game_run_in_order_and_games_in_parallel(monkeypatch):
+    monkeypatch.setattr(server, "GAME_ACTOR_IDLE_SECONDS", 0.05)
+    registry = GameActorRegistry()
+    running = {"g1": 0, "g2": 0}
+    overlap = {"g1": 0, "g2": 0}
+    log = []
+
+    def job(game_id, n):
+        async def run():
+            running[game_id] += 1
+            overlap[game_id] = max(overlap[game_id], running[game_id])
+            log.append((game_id, n, len([g for g, c in running.items() if c])))
+            await asyncio.sleep(0.01)
+            running[game_id] -= 1
+            if n == 2:
+                raise HTTPException(status_code=409, detail="conflict")
+            # nested mutations of the same game run inline instead of waiting on themselves
+            return await registry.run(game_id, lambda: asyncio.sleep(0, result=n))
+        return run
+
+    async def run():
+        results = await asyncio.gather(
+            *(registry.run(game_id, job(game_id, n)) for n in range(4) for game_id in ("g1", "g2")),
+            return_exceptions=True
+        )
+        assert [r if not isinstance(r, HTTPException) else "409" for r in results] == [0, 0, 1, 1, "409", "409", 3, 3]
+        assert [n for game_id, n, _ in log if game_id == "g1"] == [0, 1, 2, 3]
+        assert overlap == {"g1": 1, "g2": 1}
+        assert max(active for _, _, active in log) == 2
+        assert registry.stats()["jobs_total"] == 8
+        await asyncio.sleep(0.1)
+        assert registry.stats()["active_actors"] == 0 and registry.reaped == 2
+    asyncio.run(run())
+
+
+def test_cancelled_actor_fails_queued_jobs():
+    registry = GameActorRegistry()
+
+    async def run():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        first = asyncio.ensure_future(registry.run("g", slow))
+        second = asyncio.ensure_future(registry.run("g", lambda: asyncio.sleep(0)))
+        await started.wait()
+        registry.actors["g"].task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        with pytest.raises(HTTPException) as exc:
+            await second
+        assert exc.value.status_code == 503
+        assert "g" not in registry.actors
+    asyncio.run(run())
+
+
+def test_votes_resolving_together_advance_the_hand_once(mongo, started_game):
+    async def run():
+        game_id = await started_game("a", "b", "c", max_hands=2)
+        submissions = [(await act(game_id, user_id, "play"))["submission_id"] for user_id in "abc"]
+        await asyncio.gather(*(vote(s, voter, "approve") for s, voter in zip(submissions, "bca")))
+
+        game = await mongo.games.find_one({"game_id": game_id})
+        assert (game["current_hand"], game["status"]) == (2, "started")
+        assert await mongo.hand_cards.count_documents({"game_id": game_id, "hand_number": 2}) == 9
+    asyncio.run(run())
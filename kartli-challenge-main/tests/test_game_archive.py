@@ -0,0 +1,109 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .conftest import act, vote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from server import User, _archive_game, create_chat_message, get_chat_messages, get_game_penalties, get_game_submissions  # noqa: E402
+
+NOW = datetime.now(timezone.utc)
+PLAYER = User(user_id="a", email="a@example.com", name="A", player_id="PA", created_at=NOW)
+
+
+async def reads(game_id):
+    chat = await get_chat_messages(game_id, after=None, before=None, limit=50, current_user=PLAYER)
+    submissions = await get_game_submissions(game_id, current_user=PLAYER)
+    penalties = await get_game_penalties(game_id, current_user=PLAYER)
+    return chat, submissions, penalties
+
+
+def test_empty_reads_of_a_live_game_skip_the_archive(mongo, monkeypatch):
+    loaded = []
+
+    async def load_game_archive(game_id):
+        loaded.append(game_id)
+
+    monkeypatch.setattr(server, "load_game_archive", load_game_archive)
+    monkeypatch.setattr(server, "_unarchived_until", server.OrderedDict())
+
+    async def run():
+        await mongo.games.insert_one({"game_id": "g", "status": "started", "version": 0, "finished_at": None})
+        assert await reads("g") == ([], [], [])
+        # the "not archived" answer is kept: the second poll reads no game either
+        await mongo.games.delete_one({"game_id": "g"})
+        assert await reads("g") == ([], [], [])
+    asyncio.run(run())
+    assert loaded == []
+    assert server._unarchived_until["g"] > NOW.timestamp() + server.ARCHIVE_AFTER_SECONDS - 60
+
+
+def test_archived_game_reads_fall_back_to_the_archive(mongo, monkeypatch):
+    monkeypatch.setattr(server, "ARCHIVE_DIR", None)
+    monkeypatch.setattr(server, "_archive_cache", server.OrderedDict())
+    monkeypatch.setattr(server, "_unarchived_until", server.OrderedDict())
+
+    async def run():
+        finished = NOW - timedelta(seconds=server.ARCHIVE_AFTER_SECONDS + 1)
+        await mongo.games.insert_one({"game_id": "g", "group_id": "grp", "status": "finished", "version": 0, "finished_at": finished})
+        await mongo.users.insert_one({"user_id": "a", "name": "A", "player_id": "PA"})
+        await mongo.cards.insert_one({"card_id": "c1", "title": "Dans et", "points": 2})
+        await mongo.submissions.insert_one({
+            "submission_id": "s1", "game_id": "g", "user_id": "a", "card_id": "c1", "hand_number": 1,
+            "status": "pending", "votes_approve": 0, "votes_reject": 0, "created_at": finished
+        })
+        await mongo.penalties.insert_one({"penalty_id": "p1", "game_id": "g", "user_id": "a", "card_id": "c1"})
+        await create_chat_message("g", "a", "merhaba")
+        live = await reads("g")
+
+        assert await _archive_game("g")
+        assert await mongo.submissions.count_documents({"game_id": "g"}) == 0
+        archived = await reads("g")
+        assert [m["content"] for m in archived[0]] == [m["content"] for m in live[0]] == ["merhaba"]
+        assert [s["submission_id"] for s in archived[1]] == ["s1"]
+        assert [(p["penalty_id"], p["user"]) for p in archived[2]] == [("p1", {"name": "A"})]
+    asyncio.run(run())
+
+
+def test_due_games_are_archived_to_files_and_failures_back_off(mongo, monkeypatch, tmp_path, started_game):
+    monkeypatch.setattr(server, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "_archive_cache", server.OrderedDict())
+
+    async def run():
+        game_id = await started_game("a", "b")
+        played = await act(game_id, "a", "play")
+        await act(game_id, "b", "refuse")
+        await vote(played["submission_id"], "b", "approve")
+        hot = {name: await mongo[name].count_documents({"game_id": game_id}) for name in server.ARCHIVED_COLLECTIONS}
+        assert all(hot.values())
+        submissions = await get_game_submissions(game_id, current_user=PLAYER)
+
+        # finished just now: not due yet
+        assert await server.archive_finished_games() == 0
+        due = NOW - timedelta(seconds=server.ARCHIVE_AFTER_SECONDS + 1)
+        await mongo.games.update_one({"game_id": game_id}, {"$set": {"finished_at": due}})
+        await mongo.games.insert_one({"game_id": "broken", "status": "finished", "finished_at": due})
+        real_archive_game = server._archive_game
+
+        async def archive_game(game_id):
+            if game_id == "broken":
+                raise ValueError("too big")
+            return await real_archive_game(game_id)
+
+        monkeypatch.setattr(server, "_archive_game", archive_game)
+        assert await server.archive_finished_games() == 1
+
+        assert (tmp_path / f"{game_id}.json.z").exists()
+        assert [await mongo[name].count_documents({"game_id": game_id}) for name in hot] == [0] * len(hot)
+        rows = await server.load_game_archive(game_id)
+        assert {name: len(rows[name]) for name in hot} == hot
+        assert await get_game_submissions(game_id, current_user=PLAYER) == submissions
+
+        broken = await mongo.games.find_one({"game_id": "broken"})
+        assert broken["archive_attempts"] == 1 and "too big" in broken["archive_error"]
+        # waiting out the backoff, nothing is retried
+        assert await server.archive_finished_games() == 0
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from .conftest import player
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+FINISHED = datetime.now(timezone.utc) - timedelta(days=1)
+
+
+async def lines(response) -> list:
+    assert response.media_type == "application/x-ndjson"
+    return [json.loads(line) async for line in response.body_iterator]
+
+
+async def seed(mongo):
+    for game_id, user_ids in [("g1", "ab"), ("g2", "b"), ("g3", "ab")]:
+        await mongo.games.insert_one({"game_id": game_id, "group_id": "grp", "status": "finished", "finished_at": FINISHED})
+        await mongo.game_players.insert_many([
+            {"player_entry_id": f"pe_{game_id}_{u}", "game_id": game_id, "user_id": u, "score": 1} for u in user_ids
+        ])
+        await mongo.submissions.insert_one({
+            "submission_id": f"s_{game_id}", "game_id": game_id, "user_id": "a", "card_id": "c", "status": "approved",
+            "photo_base64": "aGVsbG8=", "created_at": FINISHED
+        })
+        await mongo.penalties.insert_one({"penalty_id": f"p_{game_id}", "game_id": game_id, "user_id": "b", "card_id": "c"})
+    await mongo.group_members.insert_one({"group_id": "grp", "user_id": "a"})
+
+
+def test_user_export_streams_each_game_and_resumes_after_a_cursor(mongo, monkeypatch):
+    monkeypatch.setattr(server, "ARCHIVE_DIR", None)
+    monkeypatch.setattr(server, "_archive_cache", server.OrderedDict())
+
+    async def run():
+        await seed(mongo)
+        # archived games export the same rows, read from the archive
+        assert await server._archive_game("g3")
+        exported = await lines(await server.export_my_games(current_user=player("a")))
+
+        assert [(line["type"], line["data"].get("game_id")) for line in exported] == [
+            ("game", "g1"), ("player", "g1"), ("player", "g1"), ("submission", "g1"), ("penalty", "g1"), ("cursor", None),
+            ("game", "g3"), ("player", "g3"), ("player", "g3"), ("submission", "g3"), ("penalty", "g3"), ("cursor", None),
+        ]
+        for line in exported:
+            if line["type"] == "submission":
+                assert line["data"]["has_proof"] is True
+                assert "photo_base64" not in line["data"]
+
+        cursor = exported[5]["data"]["cursor"]
+        resumed = await lines(await server.export_my_games(cursor=cursor, current_user=player("a")))
+        assert resumed == exported[6:]
+    asyncio.run(run())
+
+
+def test_group_export_needs_membership(mongo):
+    async def run():
+        await seed(mongo)
+        exported = await lines(await server.export_group_games("grp", current_user=player("a")))
+        assert [line["data"]["game_id"] for line in exported if line["type"] == "game"] == ["g1", "g2", "g3"]
+        with pytest.raises(HTTPException) as exc:
+            await server.export_group_games("grp", current_user=player("b"))
+        assert exc.value.status_code == 403
+        with pytest.raises(HTTPException) as exc:
+            await server.export_my_games(cursor="not a cursor", current_user=player("a"))
+        assert exc.value.status_code == 400
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .conftest import act, player, vote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def join(mongo, game_id: str, joined_at: datetime):
+    await mongo.games.insert_one({"game_id": game_id, "group_id": "grp", "status": "started"})
+    await mongo.game_players.insert_one({
+        "player_entry_id": f"pe_{game_id}", "game_id": game_id, "user_id": "a", "score": 0, "joined_at": joined_at
+    })
+
+
+async def all_pages(limit: int, between=None) -> list:
+    seen, cursor = [], None
+    while True:
+        page = await server.get_my_games(cursor=cursor, limit=limit, current_user=player("a"))
+        seen += [game["game_id"] for game in page["games"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+        if between:
+            await between()
+
+
+def test_pages_are_stable_under_ties_and_new_games(mongo):
+    async def run():
+        await mongo.groups.insert_one({"group_id": "grp", "name": "Ekip"})
+        # g2..g4 joined in the same instant: the entry id breaks the tie
+        for game_id, minutes in [("g1", 0), ("g2", 5), ("g3", 5), ("g4", 5), ("g5", 9)]:
+            await join(mongo, game_id, START + timedelta(minutes=minutes))
+        newest_first = ["g5", "g4", "g3", "g2", "g1"]
+        assert await all_pages(limit=2) == newest_first
+
+        joined = iter(range(10, 20))
+
+        async def join_another():
+            minutes = next(joined)
+            await join(mongo, f"new{minutes}", START + timedelta(minutes=minutes))
+
+        # games joined while paging land before the cursor: no row repeats or goes missing
+        assert await all_pages(limit=2, between=join_another) == newest_first
+        page = await server.get_my_games(limit=1, current_user=player("a"))
+        assert page["games"][0]["group_name"] == "Ekip"
+    asyncio.run(run())
+
+
+def test_finished_games_carry_their_summary(mongo, started_game):
+    async def run():
+        game_id = await started_game("a", "b")
+        played = await act(game_id, "a", "play")
+        await act(game_id, "b", "pass")
+        await vote(played["submission_id"], "b", "approve")
+        # the page needs no game lookup once the summary is stored
+        await mongo.games.delete_one({"game_id": game_id})
+
+        page = await server.get_my_games(limit=5, current_user=player("a"))
+        summary = page["games"][0]
+        assert (summary["game_id"], summary["status"], summary["rank"], summary["player_count"]) == (game_id, "finished", 1, 2)
+        entry = await mongo.game_players.find_one({"game_id": game_id, "user_id": "a"})
+        assert summary["final_score"] == entry["score"]
+    asyncio.run(run())
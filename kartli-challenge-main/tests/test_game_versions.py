@@ -0,0 +1,73 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from server import GAME_DELTA_LOOKBACK, bump_game_version, build_game_delta, delta_floor, set_player_fields, update_game_if  # noqa: E402
+
+
+async def new_game(db, **fields):
+    await db.games.insert_one({"game_id": "g", "status": "started", "version": 0, "state_revision": 0, **fields})
+    await db.game_players.insert_one({"player_entry_id": "pe_a", "game_id": "g", "user_id": "a", "score": 0, "version": 0})
+
+
+def test_delta_floor_reaches_back_by_the_lookback():
+    assert delta_floor(0) == 0
+    assert delta_floor(3) == 0
+    assert delta_floor(GAME_DELTA_LOOKBACK + 5) == 5
+
+
+def test_version_is_allocated_in_one_write(mongo):
+    async def run():
+        await new_game(mongo)
+        assert await bump_game_version("g", {"$set": {"status": "finished"}}) == 1
+        game = await mongo.games.find_one({"game_id": "g"})
+        assert (game["version"], game["state_revision"], game["status"]) == (1, 1, "finished")
+        assert not {"open_writes", "stable_version", "writes_opened_at", "state_version"} & set(game)
+        assert await set_player_fields("g", "pe_a", {"score": 3}) == 2
+        assert await set_player_fields("g", "pe_a", {"score": 4}, condition={"score": 0}) == 0
+    asyncio.run(run())
+
+
+def test_late_stamped_write_reaches_the_next_delta(mongo):
+    async def run():
+        await new_game(mongo)
+        # version 1 is allocated for a chat row that has not landed yet ...
+        late = await bump_game_version("g", notify=False)
+        # ... while version 2 is written and read
+        await set_player_fields("g", "pe_a", {"score": 1})
+        first = await build_game_delta("g", 0)
+        assert first["version"] == 2 and [p["score"] for p in first["players"]] == [1]
+
+        await mongo.votes.insert_one({"vote_id": "v1", "game_id": "g", "voter_id": "a", "version": late})
+        # the long-poll re-reads below `since` when that write is announced
+        again = await build_game_delta("g", first["version"], recheck=True)
+        assert [v["vote_id"] for v in again["votes"]] == ["v1"]
+        # without a recheck an unchanged version answers at once
+        assert await build_game_delta("g", first["version"]) == {**again, "game": None, "players": [], "votes": []}
+    asyncio.run(run())
+
+
+def test_a_writer_that_never_finishes_only_leaves_a_gap(mongo):
+    async def run():
+        await new_game(mongo)
+        await bump_game_version("g", notify=False)  # allocated, never written
+        await set_player_fields("g", "pe_a", {"score": 1})
+        delta = await build_game_delta("g", 0)
+        assert delta["version"] == 2
+        assert [p["version"] for p in delta["players"]] == [2]
+    asyncio.run(run())
+
+
+def test_conditional_update_stamps_game_fields_in_the_same_write(mongo):
+    async def run():
+        await new_game(mongo, current_turn_index=0)
+        await bump_game_version("g")  # a chat bump does not break the CAS
+        _, version = await update_game_if("g", lambda game: {"$set": {"current_turn_index": 1}})
+        assert version == 2
+        game = await mongo.games.find_one({"game_id": "g"})
+        assert (game["current_turn_index"], game["state_revision"]) == (1, 1)
+        delta = await build_game_delta("g", 1)
+        assert delta["game"]["current_turn_index"] == 1
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from .conftest import act, hand_card_ids, player, request, vote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+async def counters(mongo, game_id: str) -> tuple:
+    """(hand, outstanding, pending) as kept on the game and as counted from the rows"""
+    game = await mongo.games.find_one({"game_id": game_id})
+    hand = game["current_hand"]
+    kept = game["hand_counters"]
+    counted = (
+        await mongo.hand_cards.count_documents({"game_id": game_id, "hand_number": hand, "status": "in_hand"}),
+        await mongo.submissions.count_documents({"game_id": game_id, "hand_number": hand, "status": "pending"}),
+    )
+    assert kept["hand"] == hand
+    assert (kept["outstanding"], kept["pending"]) == counted
+    return (hand, *counted)
+
+
+def test_counters_follow_every_action(mongo, started_game):
+    async def run():
+        game_id = await started_game("a", "b", max_hands=2)
+        assert await counters(mongo, game_id) == (1, 6, 0)
+
+        swap = server.SwapCardRequest(card_id=(await hand_card_ids(game_id, "a"))[0])
+        await server.swap_card(request(), game_id=game_id, req=swap, current_user=player("a"))
+        assert await counters(mongo, game_id) == (1, 6, 0)
+        await act(game_id, "a", "refuse")
+        assert await counters(mongo, game_id) == (1, 3, 0)
+        # the last outstanding card advances the hand, which is dealt afresh
+        await act(game_id, "b", "pass")
+        assert await counters(mongo, game_id) == (2, 6, 0)
+
+        played = await act(game_id, "a", "play")
+        assert await counters(mongo, game_id) == (2, 3, 1)
+        await act(game_id, "b", "refuse")
+        assert await counters(mongo, game_id) == (2, 0, 1)
+        assert (await mongo.games.find_one({"game_id": game_id}))["status"] == "started"
+        await vote(played["submission_id"], "b", "approve")
+        game = await mongo.games.find_one({"game_id": game_id})
+        assert (game["status"], game["hand_counters"]["pending"]) == ("finished", 0)
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, features
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from server import IMAGE_SIZES, IMAGE_VARIANTS, transcode_image  # noqa: E402
+
+
+def jpeg(width, height, orientation=None):
+    image = Image.new("RGB", (width, height), (180, 40, 40))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    out = io.BytesIO()
+    image.save(out, "JPEG", exif=exif.tobytes())
+    return out.getvalue()
+
+
+def proof_sizes():
+    return {name: IMAGE_SIZES[name] for name in IMAGE_VARIANTS["proof"]}
+
+
+def test_proof_variants_are_webp_and_bounded():
+    variants = transcode_image(jpeg(4000, 3000), proof_sizes())
+
+    assert set(variants) == {"chat", "vote"}
+    for name, variant in variants.items():
+        assert variant["content_type"] == "image/webp"
+        assert max(variant["width"], variant["height"]) == IMAGE_SIZES[name]
+        with Image.open(io.BytesIO(variant["data"])) as image:
+            assert image.format == "WEBP"
+            assert image.size == (variant["width"], variant["height"])
+
+
+def test_exif_orientation_is_applied():
+    # orientation 6 = rotate 90 degrees clockwise on display
+    variants = transcode_image(jpeg(800, 400, orientation=6), {"avatar": 256})
+    assert (variants["avatar"]["width"], variants["avatar"]["height"]) == (128, 256)
+
+
+def test_small_images_are_not_upscaled():
+    variants = transcode_image(jpeg(100, 50), proof_sizes())
+    assert {(v["width"], v["height"]) for v in variants.values()} == {(100, 50)}
+
+
+def test_alpha_is_kept():
+    out = io.BytesIO()
+    Image.new("RGBA", (300, 300), (0, 0, 0, 0)).save(out, "PNG")
+    variant = transcode_image(out.getvalue(), {"avatar": 256})["avatar"]
+    with Image.open(io.BytesIO(variant["data"])) as image:
+        assert image.mode == "RGBA"
+
+
+def test_corrupt_input_raises():
+    with pytest.raises(OSError):
+        transcode_image(b"not an image", {"avatar": 256})
+
+
+@pytest.mark.skipif(not features.check("avif"), reason="Pillow built without AVIF")
+def test_avif_variants():
+    variant = transcode_image(jpeg(800, 600), {"chat": 480}, image_format="avif")["chat"]
+    assert variant["content_type"] == "image/avif"
+    with Image.open(io.BytesIO(variant["data"])) as image:
+        assert image.format == "AVIF"
+        assert image.size == (480, 360)
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+def test_workers_run_for_the_app_lifetime_and_stop_with_it(mongo, monkeypatch):
+    monkeypatch.setattr(server, "client", None)
+    monkeypatch.setattr(server, "card_sampler", None)
+    monkeypatch.setattr(server, "ARCHIVE_INTERVAL_SECONDS", 60)
+    started = []
+
+    def start_workers():
+        started.extend(real_start_workers())
+        return started
+
+    real_start_workers = server.start_workers
+    monkeypatch.setattr(server, "start_workers", start_workers)
+
+    with TestClient(server.app):
+        assert len(started) == 6
+        assert not any(task.done() for task in started)
+    # cancelled and awaited before the lifespan returned
+    assert all(task.cancelled() for task in started)
@@ -0,0 +1,152 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from matchmaking import MatchmakingQueue  # noqa: E402
+from server import PyMongoError  # noqa: E402
+
+
+def test_forms_full_games_oldest_first():
+    queue = MatchmakingQueue(game_size=3, min_players=2, max_wait_seconds=30)
+    for i in range(7):
+        queue.enqueue(f"user_{i}", 2, now=float(i))
+
+    batches = queue.form_matches(now=7.0)
+
+    assert [[t.user_id for t in b] for b in batches] == [
+        ["user_0", "user_1", "user_2"],
+        ["user_3", "user_4", "user_5"],
+    ]
+    assert queue.live[2] == 1
+
+
+def test_levels_are_matched_separately():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    queue.enqueue("a", 1, now=0.0)
+    queue.enqueue("b", 2, now=0.0)
+
+    assert queue.form_matches(now=1.0) == []
+
+    queue.enqueue("c", 1, now=1.0)
+    batches = queue.form_matches(now=2.0)
+    assert [[t.user_id for t in b] for b in batches] == [["a", "c"]]
+
+
+def test_short_game_after_max_wait():
+    queue = MatchmakingQueue(game_size=4, min_players=2, max_wait_seconds=10)
+    queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=5.0)
+
+    assert queue.form_matches(now=9.0) == []
+    batches = queue.form_matches(now=10.0)
+    assert [[t.user_id for t in b] for b in batches] == [["a", "b"]]
+
+
+def test_cancelled_tickets_are_skipped():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=1.0)
+    queue.cancel("a")
+    queue.enqueue("c", 2, now=2.0)
+
+    batches = queue.form_matches(now=3.0)
+    assert [[t.user_id for t in b] for b in batches] == [["b", "c"]]
+
+
+def test_requeued_batch_keeps_its_place():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=1.0)
+    batch = queue.form_matches(now=2.0)[0]
+    queue.enqueue("c", 2, now=3.0)
+
+    queue.requeue(batch)
+    batches = queue.form_matches(now=4.0)
+    assert [[t.user_id for t in b] for b in batches] == [["a", "b"]]
+
+
+
+def test_zero_min_players_with_an_empty_queue():
+    queue = MatchmakingQueue(game_size=2, min_players=0, max_wait_seconds=0)
+    queue.enqueue("a", 2, now=0.0)
+    queue.cancel("a")
+
+    assert queue.form_matches(now=1.0) == []
+    queue.enqueue("b", 2, now=1.0)
+    assert [[t.user_id for t in b] for b in queue.form_matches(now=2.0)] == [["b"]]
+
+
+def test_dropped_ticket_is_cancelled_and_rest_requeued():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=1.0)
+    a, b = queue.form_matches(now=2.0)[0]
+
+    queue.drop(a)
+    queue.requeue([b])
+    assert a.view(3.0)["status"] == "cancelled"
+    queue.enqueue("c", 2, now=3.0)
+    assert [[t.user_id for t in b] for b in queue.form_matches(now=4.0)] == [["b", "c"]]
+
+
+def test_player_requeueing_during_creation_keeps_one_ticket():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    first = queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=1.0)
+    batch = queue.form_matches(now=2.0)[0]
+
+    # queued again while the game is being created: same ticket
+    assert queue.enqueue("a", 2, now=3.0) is first
+    queue.requeue(batch)
+    assert queue.live[2] == 2
+    assert queue.cancel("a") is first
+    assert queue.live[2] == 1
+    assert queue.form_matches(now=4.0) == []
+
+
+def test_ticket_cancelled_during_creation_is_not_requeued():
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    queue.enqueue("a", 2, now=0.0)
+    queue.enqueue("b", 2, now=1.0)
+    batch = queue.form_matches(now=2.0)[0]
+
+    cancelled = queue.cancel("a")
+    assert cancelled is batch[0] and cancelled.view(3.0)["status"] == "cancelled"
+    again = queue.enqueue("a", 2, now=3.0)
+    queue.requeue(batch)
+
+    # "a" has only the ticket taken after cancelling; "b" kept its place
+    assert queue.live[2] == 2
+    assert [[t for t in b] for b in queue.form_matches(now=4.0)] == [[batch[1], again]]
+
+
+def test_failed_creation_is_undone_and_requeued(mongo, monkeypatch):
+    queue = MatchmakingQueue(game_size=2, min_players=2, max_wait_seconds=30)
+    monkeypatch.setattr(server, "quickplay_queue", queue)
+    collection = type(mongo.notifications)
+    insert_many = collection.insert_many
+
+    def failing_insert_many(self, *args, **kwargs):
+        if self.name == "notifications":
+            raise PyMongoError("notifications unavailable")
+        return insert_many(self, *args, **kwargs)
+
+    async def run():
+        await server.initialize_decks()
+        await server.reload_card_sampler()
+        queue.enqueue("a", 2, now=0.0)
+        queue.enqueue("b", 2, now=1.0)
+        monkeypatch.setattr(collection, "insert_many", failing_insert_many)
+        assert await server.run_matchmaking_round() == 0
+        assert [await mongo[name].count_documents({}) for name in ("games", "game_players", "hand_cards", "groups")] == [0, 0, 0, 0]
+        assert queue.live[2] == 2
+
+        monkeypatch.setattr(collection, "insert_many", insert_many)
+        assert await server.run_matchmaking_round() == 1
+        game = await mongo.games.find_one({})
+        assert (game["group_id"], game["players"]) == (None, ["a", "b"])
+        assert await mongo.groups.count_documents({}) == 0
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+import io
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from imaging import image_dhash, transcode_image  # noqa: E402
+from server import DHASH_MAX_DISTANCE, PerceptualHashIndex, ProofHashScope, dhash_to_int64  # noqa: E402
+
+
+def photo(seed, size=(1600, 1200)):
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (size[1] // 40, size[0] // 40, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.BILINEAR)
+
+
+def encoded(image, fmt="JPEG", **params):
+    out = io.BytesIO()
+    image.save(out, fmt, **params)
+    return out.getvalue()
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_resized_and_recompressed_copy_is_near():
+    original = photo(1)
+    copy = original.resize((640, 480)).crop((2, 2, 638, 478))
+
+    first = transcode_image(encoded(original, quality=95), {"chat": 480})["chat"]["dhash"]
+    second = transcode_image(encoded(copy, quality=40), {"chat": 480})["chat"]["dhash"]
+
+    assert hamming(first, second) <= DHASH_MAX_DISTANCE
+    assert hamming(first, image_dhash(photo(2))) > DHASH_MAX_DISTANCE
+
+
+def test_every_view_carries_the_same_hash():
+    variants = transcode_image(encoded(photo(3)), {"chat": 480, "vote": 1280})
+    assert variants["chat"]["dhash"] == variants["vote"]["dhash"]
+
+
+def test_signed_storage_keeps_the_bits():
+    value = (1 << 64) - 3
+    stored = dhash_to_int64(value)
+    assert stored == -3
+    index = PerceptualHashIndex([stored], ["a"])
+    assert index.query(value, max_distance=0) == [("a", 0)]
+
+
+def test_query_matches_brute_force():
+    random.seed(5)
+    hashes = [random.getrandbits(64) for _ in range(5000)]
+    # a few planted neighbours of the query
+    query = random.getrandbits(64)
+    for flips in (0, 3, 7, 12):
+        value = query
+        for bit in random.sample(range(64), flips):
+            value ^= 1 << bit
+        hashes.append(value)
+    index = PerceptualHashIndex([dhash_to_int64(h) for h in hashes], range(len(hashes)))
+
+    expected = sorted(
+        ((i, hamming(h, query)) for i, h in enumerate(hashes) if hamming(h, query) <= DHASH_MAX_DISTANCE),
+        key=lambda hit: hit[1]
+    )
+    assert index.query(query) == expected
+    assert [d for _, d in index.query(query, limit=2)] == [0, 3]
+    assert PerceptualHashIndex().query(query) == []
+
+
+
+def test_scope_extends_and_keeps_the_newest(monkeypatch):
+    monkeypatch.setattr(server, "PROOF_HASH_HISTORY_LIMIT", 3)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def row(n, dhash):
+        return {"submission_id": f"sub_{n}", "user_id": "u", "game_id": "g", "dhash": dhash, "created_at": start + timedelta(seconds=n)}
+
+    scope = ProofHashScope([row(0, 1), row(1, 2)])
+    # overlapping re-reads are ignored
+    scope.extend([row(1, 2), row(2, 4)])
+    assert [r["submission_id"] for r in scope.rows] == ["sub_0", "sub_1", "sub_2"]
+    assert [scope.rows[i]["submission_id"] for i, _ in scope.index.query(4, max_distance=0)] == ["sub_2"]
+
+    scope.extend([row(3, 8)])
+    assert [r["submission_id"] for r in scope.rows] == ["sub_1", "sub_2", "sub_3"]
+    assert scope.index.query(1, max_distance=0) == []
+    assert [scope.rows[i]["submission_id"] for i, _ in scope.index.query(8, max_distance=0)] == ["sub_3"]
+    assert scope.synced_at == start + timedelta(seconds=3)
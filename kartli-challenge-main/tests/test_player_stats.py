@@ -0,0 +1,46 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from .conftest import act, hand_card_ids, player, request, vote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+def test_bump_player_stats_increments_and_creates(mongo):
+    async def run():
+        await server.bump_player_stats("a", cards_played=1)
+        await server.bump_player_stats("a", cards_played=1, passes_used=1)
+        view = await server.get_user_stats("a", current_user=player("b"))
+        assert (view["cards_played"], view["passes_used"], view["wins"]) == (2, 1, 0)
+        assert view["approval_rate"] is None
+    asyncio.run(run())
+
+
+def test_rebuild_matches_the_counters_kept_by_the_game(mongo, started_game):
+    async def run():
+        game_id = await started_game("a", "b", max_hands=2)
+        # hand 1: a plays (approved), b swaps then passes
+        played = await act(game_id, "a", "play")
+        swap = server.SwapCardRequest(card_id=(await hand_card_ids(game_id, "b"))[0])
+        await server.swap_card(request(), game_id=game_id, req=swap, current_user=player("b"))
+        await act(game_id, "b", "pass")
+        await vote(played["submission_id"], "b", "approve")
+        # hand 2: a refuses, b plays (rejected)
+        await act(game_id, "a", "refuse")
+        played = await act(game_id, "b", "play")
+        await vote(played["submission_id"], "a", "reject")
+        assert (await mongo.games.find_one({"game_id": game_id}))["status"] == "finished"
+
+        kept = {user_id: await mongo.player_stats.find_one({"user_id": user_id}, {"_id": 0}) for user_id in "ab"}
+        assert kept["a"]["submissions_approved"] == 1 and kept["a"]["refusals"] == 1
+        assert kept["b"]["swaps_used"] == 1 and kept["b"]["passes_used"] == 1
+        await mongo.player_stats.delete_many({})
+        assert await server.rebuild_all_player_stats() == 2
+        for user_id in "ab":
+            rebuilt = await mongo.player_stats.find_one({"user_id": user_id}, {"_id": 0})
+            assert server.player_stats_view(rebuilt, user_id) | {"updated_at": None} == \
+                server.player_stats_view(kept[user_id], user_id) | {"updated_at": None}
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from server import FEED_CARD_FIELDS, build_spectator_view  # noqa: E402
+
+
+def test_frames_carry_url_avatars_and_rendered_card_fields_only(mongo):
+    async def run():
+        await mongo.games.insert_one({"game_id": "g", "status": "started", "version": 3})
+        await mongo.game_players.insert_many([
+            {"game_id": "g", "user_id": "a", "score": 1},
+            {"game_id": "g", "user_id": "b", "score": 0},
+        ])
+        await mongo.users.insert_many([
+            {"user_id": "a", "name": "A", "picture": "data:image/png;base64," + "A" * 4096, "email": "a@example.com"},
+            {"user_id": "b", "name": "B", "picture": "https://example.com/b.webp"},
+        ])
+        await mongo.cards.insert_one({"card_id": "c1", "title": "Dans et", "points": 2, "deck_type": "normal", "weight": 3, "difficulty_level": 1})
+        await mongo.submissions.insert_one({
+            "submission_id": "s1", "game_id": "g", "user_id": "a", "card_id": "c1", "status": "pending",
+            "proof_sha": "f" * 64, "proof_variants": {"chat": "e" * 64}, "has_proof": True
+        })
+        return await build_spectator_view("g")
+
+    view = asyncio.run(run())
+    assert [p["user"] for p in view["players"]] == [
+        {"name": "A", "picture": None},
+        {"name": "B", "picture": "https://example.com/b.webp"},
+    ]
+    submission = view["submissions"][0]
+    assert set(submission["card"]) <= set(FEED_CARD_FIELDS)
+    assert not {"proof_sha", "proof_variants", "photo_base64"} & set(submission)
@@ -0,0 +1,88 @@
+import asyncio
+import base64
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from .conftest import player
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import blobs  # noqa: E402
+import server  # noqa: E402
+
+NOW = datetime.now(timezone.utc)
+LEGACY_PHOTO = b"\xff\xd8legacy jpeg"
+
+
+def get(*headers) -> Request:
+    return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers], "query_string": b""})
+
+
+async def seed(mongo):
+    vote_sha = await blobs.store_blob(b"vote view", "image/webp", private=True)
+    chat_sha = await blobs.store_blob(b"chat view", "image/webp", private=True)
+    await mongo.users.insert_many([
+        {"user_id": "a", "name": "A", "picture": "data:image/png;base64," + "A" * 5000},
+        {"user_id": "b", "name": "B", "picture": None},
+    ])
+    await mongo.cards.insert_one({"card_id": "c1", "title": "Dans et", "description": "uzun", "points": 2, "deck_type": "komik", "weight": 3})
+    await mongo.submissions.insert_many([
+        {
+            "submission_id": "blob", "game_id": "g", "user_id": "a", "card_id": "c1", "status": "pending",
+            "proof_sha": vote_sha, "proof_variants": {"vote": vote_sha, "chat": chat_sha}, "has_proof": True,
+            "votes_approve": 0, "votes_reject": 1, "created_at": NOW
+        },
+        {
+            "submission_id": "legacy", "game_id": "g", "user_id": "a", "card_id": "c1", "status": "pending",
+            "photo_base64": "data:image/jpeg;base64," + base64.b64encode(LEGACY_PHOTO).decode(),
+            "votes_approve": 0, "votes_reject": 0, "created_at": NOW
+        },
+    ])
+    await mongo.votes.insert_one({"submission_id": "blob", "voter_id": "b", "vote_type": "reject"})
+    await server.create_chat_message("g", "a", "görevi tamamladı", "submission", "legacy")
+
+
+def test_feed_rows_carry_references_not_payloads(mongo, monkeypatch, tmp_path):
+    monkeypatch.setattr(blobs, "blob_store", blobs.LocalBlobStore(tmp_path))
+
+    async def run():
+        await seed(mongo)
+        feed = await server.get_game_submissions("g", current_user=player("b"))
+        chat = await server.get_chat_messages("g", current_user=player("b"))
+        rows = {row["submission_id"]: row for row in feed}
+
+        assert rows["blob"]["my_vote"] == "reject" and rows["legacy"]["my_vote"] is None
+        assert rows["blob"]["proof_thumbnail_url"] == "/api/submissions/blob/proof?variant=chat"
+        assert rows["legacy"]["has_proof"] and rows["legacy"]["proof_url"] == "/api/submissions/legacy/proof"
+        assert rows["blob"]["user"] == {"name": "A", "picture": None}
+        assert rows["blob"]["card"]["title"] == "Dans et" and set(rows["blob"]["card"]) == set(server.FEED_CARD_FIELDS)
+        assert chat[0]["submission"]["proof_url"] == "/api/submissions/legacy/proof"
+        for payload in (json.dumps(feed, default=str), json.dumps(chat, default=str)):
+            assert "base64" not in payload and "AAAA" not in payload
+            assert all(sha not in payload for sha in await mongo.blobs.distinct("sha256"))
+    asyncio.run(run())
+
+
+def test_proofs_are_served_separately_and_revalidate(mongo, monkeypatch, tmp_path):
+    monkeypatch.setattr(blobs, "blob_store", blobs.LocalBlobStore(tmp_path))
+
+    async def run():
+        await seed(mongo)
+        thumbnail = await server.get_submission_proof(get(), "blob", variant="chat", current_user=player("b"))
+        assert Path(thumbnail.path).read_bytes() == b"chat view"
+        assert thumbnail.headers["etag"] == '"blob-chat"'
+        cached = await server.get_submission_proof(get(("if-none-match", '"blob-chat"')), "blob", variant="chat", current_user=player("b"))
+        assert cached.status_code == 304
+
+        legacy = await server.get_submission_proof(get(), "legacy", current_user=player("b"))
+        assert (legacy.body, legacy.media_type) == (LEGACY_PHOTO, "image/jpeg")
+        with pytest.raises(HTTPException) as exc:
+            await server.get_submission_proof(get(), "missing", current_user=player("b"))
+        assert exc.value.status_code == 404
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+import asyncio
+import io
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from starlette.requests import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import blobs  # noqa: E402
+import server  # noqa: E402
+import uploads  # noqa: E402
+from server import User  # noqa: E402
+from uploads import append_stream  # noqa: E402
+
+OWNER = User(user_id="user_a", email="a@example.com", name="A", player_id="PA", created_at=datetime.now(timezone.utc))
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_append_resumes_at_offset_and_drops_stale_tail(tmp_path):
+    path = tmp_path / "u.part"
+    assert asyncio.run(append_stream(path, 0, chunks(b"abc", b"def"), limit=10)) == 6
+    # a broken request wrote "def" but only "abc" was recorded; resuming at 3 overwrites it
+    assert asyncio.run(append_stream(path, 3, chunks(b"XY"), limit=10)) == 5
+    assert path.read_bytes() == b"abcXY"
+
+
+def test_append_enforces_size_cap(tmp_path):
+    path = tmp_path / "u.part"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(append_stream(path, 0, chunks(b"1234", b"5678"), limit=6))
+    assert exc.value.status_code == 413
+    assert path.read_bytes() == b"1234"
+
+
+def test_parse_hook_filters_bytes(tmp_path):
+    path = tmp_path / "u.part"
+    asyncio.run(append_stream(path, 0, chunks(b"a-b", b"-c"), limit=10, parse=lambda c: c.replace(b"-", b"")))
+    assert path.read_bytes() == b"abc"
+
+
+@pytest.fixture
+def upload_db(mongo, monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_BYTES", 64)
+    monkeypatch.setattr(server, "IMAGE_WORKERS", 0)
+    monkeypatch.setattr(blobs, "blob_store", blobs.LocalBlobStore(tmp_path / "blobs"))
+    return mongo
+
+
+def png() -> bytes:
+    out = io.BytesIO()
+    Image.effect_noise((64, 48), 60).convert("RGB").save(out, "PNG")
+    return out.getvalue()
+
+
+def patch(upload_id, offset, *parts):
+    """PATCH /uploads/{upload_id} with the body sent as `parts`"""
+    body = list(parts)
+
+    async def receive():
+        chunk = body.pop(0) if body else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(body)}
+
+    scope = {"type": "http", "headers": [(b"upload-offset", str(offset).encode())]}
+    return server.append_upload(Request(scope, receive), upload_id, current_user=OWNER)
+
+
+def test_resumable_upload_resumes_at_stored_offset(upload_db):
+    async def run():
+        data = png()
+        upload = await uploads.new_upload(OWNER.user_id, len(data))
+        half = await patch(upload["upload_id"], 0, data[:100], data[100:150])
+        assert half["offset"] == 150 and half["status"] == "uploading"
+        # the offset comes from the database, not from the process that took the bytes
+        assert (await server.get_upload(upload["upload_id"], current_user=OWNER))["offset"] == 150
+        done = await patch(upload["upload_id"], 150, data[150:])
+        assert done["status"] == "ready"
+        assert await upload_db.upload_chunks.count_documents({}) == 0
+        assert not any((uploads.UPLOAD_DIR).glob("*.part"))
+    asyncio.run(run())
+
+
+def test_offset_mismatch_and_held_lease_are_conflicts(upload_db):
+    async def run():
+        upload = await uploads.new_upload(OWNER.user_id, 1000)
+        await patch(upload["upload_id"], 0, b"x" * 100)
+        with pytest.raises(HTTPException) as exc:
+            await patch(upload["upload_id"], 40, b"y")
+        assert exc.value.status_code == 409
+        await upload_db.uploads.update_one(
+            {"upload_id": upload["upload_id"]},
+            {"$set": {"writer": "other", "writer_until": datetime.now(timezone.utc) + timedelta(minutes=1)}}
+        )
+        with pytest.raises(HTTPException) as exc:
+            await patch(upload["upload_id"], 100, b"y")
+        assert exc.value.status_code == 409
+        assert (await server.get_upload(upload["upload_id"], current_user=OWNER))["offset"] == 100
+    asyncio.run(run())
+
+
+def test_expired_upload_is_gone_and_cleaned_up(upload_db):
+    async def run():
+        upload = await uploads.new_upload(OWNER.user_id, 1000)
+        await patch(upload["upload_id"], 0, b"x" * 100)
+        await upload_db.uploads.update_one(
+            {"upload_id": upload["upload_id"]},
+            {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        with pytest.raises(HTTPException) as exc:
+            await patch(upload["upload_id"], 100, b"y")
+        assert exc.value.status_code == 410
+        assert await uploads.cleanup_stale_uploads() == 1
+        assert await upload_db.uploads.count_documents({}) == 0
+        assert await upload_db.upload_chunks.count_documents({}) == 0
+    asyncio.run(run())
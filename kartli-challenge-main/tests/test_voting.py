@@ -0,0 +1,124 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from realtime import BrokerMessage  # noqa: E402
+from server import (  # noqa: E402
+    VOTE_SWEEP_INTERVAL_SECONDS, VOTE_TIMEOUT_SECONDS, User, VoteRequest, VoteResolutionWorker, _vote_on_submission,
+    decide_submission
+)
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def submission(approve=0, reject=0, has_proof=False, age=0):
+    return {
+        "votes_approve": approve,
+        "votes_reject": reject,
+        "has_proof": has_proof,
+        "created_at": NOW - timedelta(seconds=age),
+    }
+
+
+def test_single_vote_decides():
+    assert decide_submission(submission(approve=1), 3, NOW) == "approved"
+    assert decide_submission(submission(reject=1), 3, NOW) == "rejected"
+    assert decide_submission(submission(), 3, NOW) is None
+
+
+def test_split_vote_waits_for_everyone():
+    assert decide_submission(submission(approve=1, reject=1), 3, NOW) is None
+    assert decide_submission(submission(approve=2, reject=1), 3, NOW) == "approved"
+    assert decide_submission(submission(approve=1, reject=2), 3, NOW) == "rejected"
+    assert decide_submission(submission(approve=1, reject=1, has_proof=True), 3, NOW) == "approved"
+
+
+def test_timeout_rules():
+    late = VOTE_TIMEOUT_SECONDS
+    assert decide_submission(submission(age=late), 3, NOW) == "rejected"
+    assert decide_submission(submission(has_proof=True, age=late), 3, NOW) == "approved"
+    assert decide_submission(submission(approve=1, reject=1, age=late), 4, NOW) == "approved"
+
+
+def test_legacy_inline_photo_counts_as_proof():
+    legacy = {"votes_approve": 1, "votes_reject": 1, "photo_base64": "abc", "created_at": NOW.replace(tzinfo=None)}
+    assert decide_submission(legacy, 3, NOW) == "approved"
+
+
+def test_worker_pops_deadlines_in_order():
+    worker = VoteResolutionWorker()
+    worker.schedule("late", NOW + timedelta(seconds=5))
+    worker.schedule("early", NOW)
+    worker.schedule("voted", NOW)
+    worker.discard("voted")
+
+    due = NOW.timestamp() + VOTE_TIMEOUT_SECONDS
+    assert worker.pop_due(due - 1) == []
+    assert worker.pop_due(due) == ["early"]
+    assert worker.next_delay(due) == min(5, VOTE_SWEEP_INTERVAL_SECONDS)
+    assert worker.pop_due(due + 5) == ["late"]
+    assert worker.next_delay(due) == VOTE_SWEEP_INTERVAL_SECONDS
+
+
+def test_worker_reschedule_replaces_deadline():
+    worker = VoteResolutionWorker()
+    worker.push("sub", 10.0)
+    worker.push("sub", 20.0)
+    assert worker.pop_due(15.0) == []
+    assert worker.pop_due(20.0) == ["sub"]
+
+
+def test_worker_follows_broker_events():
+    worker = VoteResolutionWorker()
+    worker.handle(BrokerMessage("game:g", "submission", {"submission_id": "a", "status": "pending", "created_at": NOW}))
+    worker.handle(BrokerMessage("game:g", "submission", {"submission_id": "b", "status": "pending", "created_at": NOW}))
+    # a tally update leaves the deadline alone, a settled vote drops it
+    worker.handle(BrokerMessage("game:g", "vote", {"submission_id": "a", "status": "pending"}))
+    worker.handle(BrokerMessage("game:g", "vote", {"submission_id": "b", "status": "approved"}))
+
+    assert worker.pop_due(NOW.timestamp() + VOTE_TIMEOUT_SECONDS) == ["a"]
+
+
+def voter(user_id):
+    return User(user_id=user_id, email=f"{user_id}@example.com", name=user_id, player_id=user_id, created_at=NOW)
+
+
+def test_refused_votes_take_no_version(mongo):
+    async def run():
+        await mongo.games.insert_one({"game_id": "g", "version": 5, "players": ["a", "b", "c"]})
+        await mongo.submissions.insert_many([
+            {"submission_id": "own", "game_id": "g", "user_id": "b", "status": "pending", "votes_approve": 0, "votes_reject": 0},
+            {"submission_id": "done", "game_id": "g", "user_id": "a", "status": "approved", "votes_approve": 1, "votes_reject": 0},
+            {"submission_id": "voted", "game_id": "g", "user_id": "a", "status": "pending", "votes_approve": 1, "votes_reject": 0, "voter_ids": ["b"]},
+            # voted before voter_ids was kept: only the votes index knows
+            {"submission_id": "legacy", "game_id": "g", "user_id": "a", "status": "pending", "votes_approve": 1, "votes_reject": 0},
+        ])
+        await mongo.votes.create_index([("submission_id", 1), ("voter_id", 1)], unique=True)
+        await mongo.votes.insert_one({"vote_id": "old", "submission_id": "legacy", "game_id": "g", "voter_id": "b", "vote_type": "approve"})
+        request = Request({"type": "http", "headers": []})
+
+        for submission_id, detail in [
+            ("own", "Cannot vote on your own submission"),
+            ("done", "Submission already processed"),
+            ("voted", "Already voted"),
+            ("missing", "Submission not found"),
+        ]:
+            with pytest.raises(HTTPException) as refused:
+                await _vote_on_submission(request, "g", submission_id, VoteRequest(vote_type="reject"), voter("b"))
+            assert refused.value.detail == detail
+        assert (await mongo.games.find_one({"game_id": "g"}))["version"] == 5
+
+        with pytest.raises(HTTPException) as refused:
+            await _vote_on_submission(request, "g", "legacy", VoteRequest(vote_type="reject"), voter("b"))
+        assert refused.value.detail == "Already voted"
+        legacy = await mongo.submissions.find_one({"submission_id": "legacy"})
+        assert (legacy["votes_reject"], legacy["voter_ids"]) == (0, [])
+        assert await mongo.votes.count_documents({}) == 1
+    asyncio.run(run())
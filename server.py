@@ -10,6 +10,9 @@ spec = importlib.util.spec_from_file_location("backend_server", _backend_server_
 if spec is None or spec.loader is None:
     raise RuntimeError(f"Could not load backend server module from: {_backend_server_path}")
 
+# server.py imports its sibling modules (imaging) by name
+sys.path.insert(0, str(_backend_server_path.parent))
+
 backend_server = importlib.util.module_from_spec(spec)
 sys.modules["backend_server"] = backend_server
 spec.loader.exec_module(backend_server)